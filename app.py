@@ -9,16 +9,30 @@ from flask import (
     redirect,
     url_for,
 )
-import cv2
 from src.detectors.cheating_detector import CheatingDetector
+from src.detectors.episode_recorder import EpisodeRecorder
+from src.detectors.session_manager import SessionManager
 from src.database.db_manager import DBManager
+from src.database.detection_writer import DetectionWriter
+from src.jobs.job_manager import JobManager, JobQueueFull
+from src.jobs.video_job import make_episode_aggregator, process_video_job
+from src.utils.drawing import annotate_frame
+from src.utils.event_hub import EventHub
+from src.utils.evidence_store import EvidenceStore
+from src.utils.evidence_writer import EvidenceWriter
+from src.utils.frame_broadcaster import FrameBroadcaster
+from src.utils.inference_scheduler import InferenceScheduler
+from src.utils.metrics import REGISTRY
+from src.utils.object_detector import ObjectDetector
 import os
-from datetime import datetime, timedelta
+import re
+from datetime import timedelta
 from werkzeug.utils import secure_filename
 import threading
-import time
-import queue
+import uuid
 import secrets
+import atexit
+from functools import wraps
 
 app = Flask(__name__)
 # Session configuration
@@ -28,12 +42,119 @@ app.config["PERMANENT_SESSION_LIFETIME"] = timedelta(
     hours=5
 )  # Session expires after 5 hours
 
-detector = CheatingDetector()
-db_manager = DBManager()
+# Shared services, created by create_app() in the serving process only.
+# Upload workers are spawned processes that re-import this module, so
+# importing it must not load models, open a pool or start threads
+object_detector = None
+db_manager = None
+detection_writer = None
+event_hub = None
+evidence_writer = None
+evidence_store = None
+episode_recorder = None
+inference_scheduler = None
+session_manager = None
+setup_lock = threading.Lock()
+
+# Evidence file names are unique and never rewritten, so browsers may keep
+# them for long and revalidate with the ETag / Last-Modified headers
+EVIDENCE_CACHE_SECONDS = int(os.getenv("EVIDENCE_CACHE_SECONDS", 31536000))
+
+
+def make_source_detector(session_id):
+    return CheatingDetector(
+        object_detector=object_detector,
+        scheduler=inference_scheduler,
+        source_id=session_id,
+    )
+
+
+def create_app():
+    """Load the models and start the shared services once; returns the app"""
+    global object_detector, db_manager, detection_writer, event_hub
+    global evidence_writer, evidence_store, episode_recorder
+    global inference_scheduler, session_manager
+    with setup_lock:
+        if session_manager is not None:
+            return app
+
+        # The YOLO models are loaded once and shared by every source's
+        # detector
+        object_detector = ObjectDetector()
+        db_manager = DBManager()
+        # Detections are written in batches from a background thread so
+        # frame loops never wait on the database
+        detection_writer = DetectionWriter(
+            db_manager,
+            batch_size=int(os.getenv("DETECTION_WRITER_BATCH_SIZE", 100)),
+            flush_interval=float(
+                os.getenv("DETECTION_WRITER_FLUSH_INTERVAL", 1.0)
+            ),
+            max_buffer=int(os.getenv("DETECTION_WRITER_MAX_BUFFER", 10000)),
+            overflow_policy=os.getenv("DETECTION_WRITER_OVERFLOW", "drop_oldest"),
+        )
+        atexit.register(detection_writer.shutdown)
+        # Pushes new detections and processing progress to dashboards over SSE
+        event_hub = EventHub()
+        # Encodes and writes evidence frames off the stream loop
+        evidence_writer = EvidenceWriter(
+            os.getenv("SAVE_FRAMES_DIR", "detected_frames")
+        )
+        atexit.register(evidence_writer.shutdown)
+        # Keeps the evidence directory within its disk budget; rows of evicted
+        # frames are cleared first, so alerts never link to missing images
+        evidence_store = EvidenceStore(
+            evidence_writer.directory,
+            max_bytes=int(
+                float(os.getenv("EVIDENCE_MAX_MB", 2048)) * 1024 * 1024
+            ),
+            max_age=float(os.getenv("EVIDENCE_MAX_AGE_DAYS", 0)) * 86400,
+            min_age=float(os.getenv("EVIDENCE_MIN_AGE", 300)),
+            sweep_interval=float(os.getenv("EVIDENCE_SWEEP_INTERVAL", 300)),
+            thumbnail_width=int(os.getenv("EVIDENCE_THUMBNAIL_WIDTH", 160)),
+            on_evict=db_manager.clear_frame_paths,
+        )
+        atexit.register(evidence_store.shutdown)
+        episode_recorder = EpisodeRecorder(
+            evidence_writer, detection_writer, publish=event_hub.publish
+        )
+
+        # Every watched source gets its own pose analyzer, motion gate and
+        # episode state on top of the shared YOLO models, scheduled fairly
+        inference_scheduler = InferenceScheduler(
+            object_detector, max_batch=int(os.getenv("SCHEDULER_MAX_BATCH", 4))
+        )
+        atexit.register(inference_scheduler.shutdown)
+
+        session_manager = SessionManager(
+            make_source_detector,
+            make_episode_aggregator,
+            annotate=annotate_frame,
+            on_episode=lambda session, episode: episode_recorder.record(
+                episode, session.id
+            ),
+            evidence_threshold=float(os.getenv("DETECTION_CONFIDENCE", 0.6)),
+        )
+        atexit.register(session_manager.shutdown)
+
+        register_metrics()
+    return app
+
+
+@app.before_request
+def ensure_services():
+    # Servers that import `app` directly, e.g. `flask run`, set up on the
+    # first request instead
+    create_app()
+
+
+# Session id of the legacy single-camera feed served at /video_feed
+CAMERA_SESSION_ID = "camera"
+# Source ids end up in URLs and in detections.source_id VARCHAR(64)
+SOURCE_ID_PATTERN = re.compile(r"[A-Za-z0-9_.-]{1,64}")
 
 # Global state variables
 video_source = {"type": "camera", "active": False}
-camera = None  # Global camera object
 
 # Hardcoded credentials (in a real application, these should be stored securely)
 ADMIN_USERNAME = "admin"
@@ -41,6 +162,7 @@ ADMIN_PASSWORD = "password"
 
 
 def login_required(f):
+    @wraps(f)
     def decorated_function(*args, **kwargs):
         if "logged_in" not in session:
             return redirect(url_for("login"))
@@ -80,10 +202,11 @@ UPLOAD_FOLDER = "uploads"
 ALLOWED_EXTENSIONS = {"mp4", "avi", "mov", "mkv"}
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
 
-# Global variables for video processing
-current_video_path = None
-frame_queue = queue.Queue(maxsize=30)  # Buffer for processed frames
-processing_complete = threading.Event()
+# Uploaded videos are processed as jobs on worker processes; each job's
+# preview frames are published once and shared by every viewer
+job_feeds = {}
+job_manager = None
+job_manager_lock = threading.Lock()
 
 # Ensure directories exist
 for directory in [UPLOAD_FOLDER, "detected_frames"]:
@@ -95,8 +218,14 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-# Store processing status
-video_processing = {"active": False, "progress": 0, "status": ""}
+# Store processing status of the most recent upload
+video_processing = {
+    "active": False,
+    "progress": 0,
+    "status": "",
+    "stages": [],
+    "job_id": None,
+}
 
 
 # Home page route
@@ -107,101 +236,26 @@ def index():
 
 
 def generate_frames():
-    global camera, video_source
-
+    """Stream the live camera feed, starting its shared producer if needed"""
     # If we're processing an uploaded video, don't start the camera
     if video_source["type"] == "video":
         return
 
+    session = session_manager.ensure_source(
+        CAMERA_SESSION_ID,
+        [0, 1],
+        name="Camera",
+        idle_timeout=float(os.getenv("CAMERA_IDLE_TIMEOUT", 5.0)),
+    )
     video_source["type"] = "camera"
     video_source["active"] = True
+    yield from session.feed.stream()
 
-    camera_indices = [0, 1]
-
-    # Create detected_frames directory if it doesn't exist
-    if not os.path.exists("detected_frames"):
-        os.makedirs("detected_frames")
-
-    for index in camera_indices:
-        try:
-            camera = cv2.VideoCapture(index)
-            if camera is not None and camera.isOpened():
-                # Set resolution to standard dimensions
-                camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-                print(f"Successfully opened camera at index {index}")
-                break
-        except Exception as e:
-            print(f"Error with camera index {index}: {str(e)}")
-            continue
-
-    if camera is None or not camera.isOpened():
-        print("Error: Could not open webcam")
-        return
-
-    try:
-        while True:
-            if not video_source["active"] or video_source["type"] != "camera":
-                break
-
-            success, frame = camera.read()
-            if not success:
-                print("Error: Could not read frame")
-                break
-
-            try:
-                # Ensure frame dimensions are consistent
-                frame = cv2.resize(frame, (640, 480))
-
-                # Process frame and detect cheating behaviors
-                detections = detector.process_frame(frame)
-
-                # Draw detection boxes on frame and store detections
-                if detections:
-                    draw_detection_boxes(frame, detections)
-                    # Store each detection in the database
-                    for detection in detections:
-                        if detection["confidence"] > float(
-                            os.getenv("DETECTION_CONFIDENCE", 0.6)
-                        ):
-                            timestamp = datetime.now()
-                            frame_path = os.path.join(
-                                "detected_frames",
-                                f"frame_{timestamp.strftime('%Y%m%d_%H%M%S')}.jpg",
-                            )
-                            # Save the frame
-                            cv2.imwrite(frame_path, frame)
-                            # Store in database with all required fields
-                            db_manager.store_detection(
-                                timestamp=timestamp,
-                                behavior_type=detection["behavior_type"],
-                                confidence=detection["confidence"],
-                                frame_path=frame_path,
-                            )
-
-                # Encode the frame for streaming
-                ret, buffer = cv2.imencode(".jpg", frame)
-                if not ret:
-                    print("Error: Could not encode frame")
-                    continue
-
-                frame_bytes = buffer.tobytes()
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n" + frame_bytes + b"\r\n"
-                )
-
-            except Exception as e:
-                print(f"Error processing frame: {str(e)}")
-                continue
 
-    except Exception as e:
-        print(f"Error in generate_frames: {str(e)}")
-
-    finally:
-        if camera is not None:
-            camera.release()
-            video_source["active"] = False
+def stop_camera_producer():
+    """Stop the camera session and wait for it to release the device"""
+    video_source["active"] = False
+    session_manager.stop(CAMERA_SESSION_ID)
 
 
 # Single video feed route that handles both camera and processed video
@@ -212,7 +266,7 @@ def video_feed():
 
     if video_source["type"] == "video":
         return Response(
-            generate_processed_frames(),
+            generate_processed_frames(video_processing["job_id"]),
             mimetype="multipart/x-mixed-replace; boundary=frame",
         )
     else:
@@ -222,8 +276,124 @@ def video_feed():
         )
 
 
+def paginated_alerts(behavior_type=None):
+    """
+    Serve the incremental form of the alerts endpoints:
+    ?since_id=N returns only rows added after N, oldest first, and may
+    repeat the newest ones until they are surely committed; with
+    &updated_after=U it also returns rows up to N that changed since, like
+    episodes that grew or closed, ahead of the new ones
+    ?cursor=C pages backwards through older rows, newest first
+    """
+    try:
+        limit = max(1, min(int(request.args.get("limit", 100)), 1000))
+
+        if "since_id" in request.args:
+            since_id = int(request.args["since_id"])
+            alerts, last_id, has_more = db_manager.get_alerts_since(
+                since_id, behavior_type=behavior_type, limit=limit
+            )
+            page = {"alerts": alerts, "last_id": last_id, "has_more": has_more}
+            if "updated_after" in request.args:
+                updated, updated_after, more_updates = db_manager.get_updates_since(
+                    since_id,
+                    request.args["updated_after"],
+                    behavior_type=behavior_type,
+                    limit=limit,
+                )
+                page["alerts"] = updated + alerts
+                page["updated_after"] = updated_after
+                page["has_more"] = has_more or more_updates
+            return jsonify(page)
+
+        alerts, next_cursor = db_manager.get_alerts_page(
+            cursor=request.args.get("cursor"),
+            behavior_type=behavior_type,
+            limit=limit,
+        )
+        page = {"alerts": alerts, "next_cursor": next_cursor}
+        if "cursor" in request.args:
+            page["last_id"] = max([a["id"] for a in alerts], default=None)
+        else:
+            # Where live polling continues from the newest page; rows not
+            # yet committed are fetched again by the next since_id call
+            page["last_id"] = db_manager.get_settled_id()
+            page["updated_after"] = db_manager.get_update_cursor()
+        return jsonify(page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def wants_pagination():
+    return any(key in request.args for key in ("since_id", "cursor", "limit"))
+
+
+@app.route("/sources", methods=["GET"])
+def list_sources():
+    return jsonify([session.to_dict() for session in session_manager.list()])
+
+
+@app.route("/sources", methods=["POST"])
+@login_required
+def add_source():
+    """Start watching another camera (by index) or video file/stream URL"""
+    data = request.get_json(silent=True) or request.form
+    source = data.get("source")
+    if source is None or source == "":
+        return jsonify({"error": "No source provided"}), 400
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    session_id = data.get("id") or None
+    if session_id is not None and (
+        not isinstance(session_id, str) or not SOURCE_ID_PATTERN.fullmatch(session_id)
+    ):
+        error = "Source id must be 1-64 letters, digits, '.', '_' or '-'"
+        return jsonify({"error": error}), 400
+
+    try:
+        session = session_manager.add_source(
+            source,
+            name=data.get("name"),
+            session_id=session_id,
+            realtime=str(data.get("realtime", "true")).lower() != "false",
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify(session.to_dict()), 201
+
+
+@app.route("/sources/<source_id>", methods=["GET"])
+def get_source(source_id):
+    session = session_manager.get(source_id)
+    if session is None:
+        return jsonify({"error": "Unknown source"}), 404
+    return jsonify(session.to_dict())
+
+
+@app.route("/sources/<source_id>", methods=["DELETE"])
+@login_required
+def remove_source(source_id):
+    session = session_manager.remove(source_id)
+    if session is None:
+        return jsonify({"error": "Unknown source"}), 404
+    return jsonify(session.to_dict())
+
+
+@app.route("/sources/<source_id>/video_feed")
+def source_video_feed(source_id):
+    session = session_manager.get(source_id)
+    if session is None:
+        return jsonify({"error": "Unknown source"}), 404
+    return Response(
+        session.feed.stream(),
+        mimetype="multipart/x-mixed-replace; boundary=frame",
+    )
+
+
 @app.route("/alerts")
 def get_alerts():
+    if wants_pagination():
+        return paginated_alerts()
     alerts = db_manager.get_all_alerts()
     return jsonify(alerts)
 
@@ -239,36 +409,112 @@ def get_recent_detections():
 @app.route("/api/detections/<behavior_type>")
 def get_detections_by_type(behavior_type):
     """Get detections filtered by behavior type"""
+    if wants_pagination():
+        return paginated_alerts(behavior_type)
     detections = db_manager.get_detections_by_type(behavior_type, limit=50)
     return jsonify(detections)
 
 
 @app.route("/detected_frames/<filename>")
 def serve_detected_frame(filename):
-    return send_from_directory("detected_frames", filename)
-
-
-def draw_detection_boxes(frame, detections):
-    """Draw bounding boxes for detected objects"""
-    for detection in detections:
-        if "bbox" in detection:
-            bbox = detection["bbox"]
-            x1, y1, x2, y2 = map(int, bbox)
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-            cv2.putText(
-                frame,
-                f"{detection['behavior_type']}: {detection['confidence']:.2f}",
-                (x1, y1 - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 0, 255),
-                2,
+    # Raises NotFound for missing files, which then aren't tracked
+    response = send_from_directory(
+        evidence_store.directory, filename, max_age=EVIDENCE_CACHE_SECONDS
+    )
+    evidence_store.touch(filename)
+    return response
+
+
+@app.route("/detected_frames/thumbs/<filename>")
+def serve_detected_thumbnail(filename):
+    if evidence_store.thumbnail(filename) is None:
+        return jsonify({"error": "Unknown frame"}), 404
+    return send_from_directory(
+        evidence_store.thumbnail_directory, filename, max_age=EVIDENCE_CACHE_SECONDS
+    )
+
+
+@app.route("/events")
+def events():
+    """Server-Sent Events stream of new detections and processing progress"""
+    return Response(
+        event_hub.stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def get_job_manager():
+    """Start the upload worker processes on first use"""
+    global job_manager
+    with job_manager_lock:
+        if job_manager is None:
+            job_manager = JobManager(
+                process_video_job,
+                workers=int(os.getenv("JOB_WORKERS", 2)),
+                max_pending=int(os.getenv("JOB_MAX_PENDING", 20)),
+                max_finished=int(os.getenv("JOB_MAX_FINISHED", 100)),
+                on_event=handle_job_event,
             )
+            atexit.register(job_manager.shutdown)
+        return job_manager
+
+
+def job_processing_status(job):
+    """A job's status in the shape the dashboard's progress bar expects"""
+    if job["status"] == "queued":
+        status = "Waiting for a free worker"
+    elif job["status"] == "running":
+        status = f"Processing frame {job['processed_frames']}/{job['total_frames']}"
+    elif job["status"] == "completed":
+        status = "Processing complete"
+    elif job["status"] == "cancelled":
+        status = "Processing cancelled"
+    else:
+        status = f"Error: {job['error']}"
+    return {
+        "active": job["status"] in ("queued", "running"),
+        "progress": job["progress"],
+        "status": status,
+        "stages": job["stages"],
+        "job_id": job["id"],
+    }
+
+
+def close_job_feed(job_id):
+    feed = job_feeds.pop(job_id, None)
+    if feed is not None:
+        feed.close()
+
+
+def handle_job_event(job, event_type, data):
+    """Relay what upload workers report to dashboards and stream viewers"""
+    if event_type == "publish":
+        event_hub.publish(*data)
+        return
+
+    feed = job_feeds.get(job["id"])
+    if event_type == "frame":
+        if feed is not None:
+            feed.publish(data)
+        return
+
+    status = job_processing_status(job)
+    if job["id"] == video_processing["job_id"]:
+        video_processing.update(status)
+    event_hub.publish("processing", status)
+
+    if not status["active"]:
+        # Finished jobs drop their feed, and with it their metric labels
+        close_job_feed(job["id"])
+        if job["id"] == video_processing["job_id"]:
+            video_source["type"] = "camera"  # Reset back to camera mode
+            video_source["active"] = False
 
 
 @app.route("/upload-video", methods=["POST"])
 def upload_video():
-    global video_source, camera
+    global video_source
 
     if "video" not in request.files:
         return jsonify({"error": "No video file provided"}), 400
@@ -280,140 +526,216 @@ def upload_video():
     if file and allowed_file(file.filename):
         # Stop the camera feed if it's running
         video_source["type"] = "video"
-        video_source["active"] = False
-        if camera is not None:
-            camera.release()
-            camera = None
+        stop_camera_producer()
 
-        filename = secure_filename(file.filename)
+        # Prefixed so concurrent uploads of the same file name don't collide
+        filename = f"{uuid.uuid4().hex[:8]}_{secure_filename(file.filename)}"
         filepath = os.path.join(app.config["UPLOAD_FOLDER"], filename)
         file.save(filepath)
 
-        # Start processing in background
-        threading.Thread(target=process_video_file, args=(filepath,)).start()
+        # Process on a worker process in the background
+        try:
+            job = get_job_manager().submit(
+                {"video_path": filepath, "filename": file.filename}
+            )
+        except JobQueueFull as e:
+            os.remove(filepath)
+            return jsonify({"error": f"Too many videos queued: {str(e)}"}), 503
+
+        job_feeds[job["id"]] = FrameBroadcaster()
+        # The job may have ended before its feed existed
+        current = get_job_manager().get(job["id"])
+        if current is None or current["status"] in JobManager.TERMINAL_STATES:
+            close_job_feed(job["id"])
+        video_processing.update(job_processing_status(job))
+        video_source["active"] = True
 
-        return jsonify({"message": "Video uploaded successfully, processing started"})
+        return jsonify(
+            {
+                "message": "Video uploaded successfully, processing started",
+                "job_id": job["id"],
+            }
+        )
 
     return jsonify({"error": "Invalid file type"}), 400
 
 
 @app.route("/processing-status")
 def get_processing_status():
+    job_id = request.args.get("job_id")
+    if job_id:
+        job = get_job_manager().get(job_id)
+        if job is None:
+            return jsonify({"error": "Unknown job"}), 404
+        return jsonify(job_processing_status(job))
     return jsonify(video_processing)
 
 
-def process_frame_with_detections(frame):
-    """Process a single frame and return it with detection boxes"""
-    try:
-        # Ensure frame dimensions are consistent
-        frame = cv2.resize(frame, (640, 480))
-
-        # Process frame and detect cheating behaviors
-        detections = detector.process_frame(frame)
-
-        # Draw detection boxes on frame and store detections
-        if detections:
-            draw_detection_boxes(frame, detections)
-            # Store each detection in the database
-            for detection in detections:
-                if detection["confidence"] > float(
-                    os.getenv("DETECTION_CONFIDENCE", 0.6)
-                ):
-                    timestamp = datetime.now()
-                    frame_path = os.path.join(
-                        "detected_frames",
-                        f"frame_{timestamp.strftime('%Y%m%d_%H%M%S')}.jpg",
-                    )
-                    # Save the frame with detection boxes
-                    cv2.imwrite(frame_path, frame)
-                    # Store in database immediately
-                    db_manager.store_detection(
-                        timestamp=timestamp,
-                        behavior_type=detection["behavior_type"],
-                        confidence=detection["confidence"],
-                        frame_path=frame_path,
-                    )
-                    print(
-                        f"Stored detection: {detection['behavior_type']} with confidence {detection['confidence']}"
-                    )
-
-        return frame
-    except Exception as e:
-        print(f"Error processing frame: {str(e)}")
-        return frame
-
-
-def generate_processed_frames():
-    """Generator for processed video frames"""
-    while True:
-        if not frame_queue.empty():
-            frame = frame_queue.get()
-            ret, buffer = cv2.imencode(".jpg", frame)
-            if ret:
-                frame_bytes = buffer.tobytes()
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n" + frame_bytes + b"\r\n"
-                )
-        elif processing_complete.is_set():
-            break
-        else:
-            time.sleep(0.01)  # Small delay to prevent CPU overload
-
+@app.route("/jobs")
+def list_jobs():
+    if job_manager is None:
+        return jsonify([])
+    return jsonify(job_manager.list())
 
-def process_video_file(video_path):
-    """Process uploaded video file"""
-    global video_source
-    try:
-        video_processing["active"] = True
-        video_processing["progress"] = 0
-        video_processing["status"] = "Processing started"
-        video_source["type"] = "video"
-        video_source["active"] = True
-        processing_complete.clear()
-
-        cap = cv2.VideoCapture(video_path)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        processed_frames = 0
-
-        while cap.isOpened():
-            success, frame = cap.read()
-            if not success:
-                break
-
-            # Process frame with detections
-            processed_frame = process_frame_with_detections(frame)
-
-            # Add to queue for streaming
-            if frame_queue.full():
-                try:
-                    frame_queue.get_nowait()  # Remove oldest frame if queue is full
-                except queue.Empty:
-                    pass
-            frame_queue.put(processed_frame)
-
-            processed_frames += 1
-            video_processing["progress"] = int((processed_frames / total_frames) * 100)
-            video_processing["status"] = (
-                f"Processing frame {processed_frames}/{total_frames}"
-            )
 
-        cap.release()  # Clean up
-        video_processing["active"] = False
-        video_processing["status"] = "Processing complete"
-        video_processing["progress"] = 100
-        video_source["type"] = "camera"  # Reset back to camera mode
-        video_source["active"] = False
-        processing_complete.set()
+@app.route("/jobs/<job_id>")
+def get_job(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job)
 
-        # Clean up the uploaded video
-        os.remove(video_path)
 
-    except Exception as e:
-        video_processing["status"] = f"Error: {str(e)}"
-        video_processing["active"] = False
-        processing_complete.set()
+@app.route("/jobs/<job_id>/cancel", methods=["POST"])
+@login_required
+def cancel_job(job_id):
+    if not get_job_manager().cancel(job_id):
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job_manager.get(job_id))
+
+
+@app.route("/jobs/<job_id>/video_feed")
+def job_video_feed(job_id):
+    if job_id not in job_feeds:
+        return jsonify({"error": "Unknown job"}), 404
+    return Response(
+        generate_processed_frames(job_id),
+        mimetype="multipart/x-mixed-replace; boundary=frame",
+    )
+
+
+@app.route("/detector-stats")
+def get_detector_stats():
+    return jsonify(
+        {
+            "motion_gate": {
+                session.id: session.detector.get_motion_stats()
+                for session in session_manager.list()
+            },
+            # Each source and each running upload adapts its own resolution
+            "resolution": {
+                "sources": {
+                    session.id: session.detector.get_resolution_stats()
+                    for session in session_manager.list()
+                },
+                "jobs": {
+                    job["id"]: job["resolution"]
+                    for job in (job_manager.list() if job_manager is not None else [])
+                    if job["status"] == "running"
+                },
+            },
+            "streams": {
+                job_id: feed.get_stats() for job_id, feed in job_feeds.items()
+            },
+            "sources": [session.to_dict() for session in session_manager.list()],
+            "scheduler": inference_scheduler.get_stats(),
+            "jobs": job_manager.get_stats() if job_manager is not None else None,
+        }
+    )
+
+
+@app.route("/writer-stats")
+def get_writer_stats():
+    return jsonify(detection_writer.get_stats())
+
+
+def register_metrics():
+    """
+    Gauges read from the components' own counters when /metrics is scraped,
+    so they add nothing to the request or frame paths
+    """
+
+    def feeds():
+        return [
+            ("source", session.id, session.feed)
+            for session in session_manager.list()
+        ] + [("job", job_id, feed) for job_id, feed in list(job_feeds.items())]
+
+    def queue_depths():
+        jobs = job_manager.get_stats()["jobs"] if job_manager is not None else {}
+        return [
+            (
+                {"queue": "detection_writer"},
+                detection_writer.get_stats()["queue_depth"],
+            ),
+            ({"queue": "evidence_writer"}, evidence_writer.get_stats()["pending"]),
+            (
+                {"queue": "inference_scheduler"},
+                sum(inference_scheduler.get_stats()["pending"].values()),
+            ),
+            ({"queue": "jobs"}, jobs.get("queued", 0)),
+        ]
+
+    def stream_clients():
+        clients = [
+            ({"kind": kind, "stream": stream_id}, feed.viewer_count())
+            for kind, stream_id, feed in feeds()
+        ]
+        clients.append(
+            ({"kind": "events", "stream": "sse"}, event_hub.subscriber_count())
+        )
+        return clients
+
+    def frames_dropped():
+        return [
+            ({"stream": stream_id}, feed.get_stats()["frames_skipped"])
+            for _, stream_id, feed in feeds()
+        ]
+
+    def db_connections():
+        pool = db_manager.get_pool_stats()
+        return [({"state": "in_use"}, pool["in_use"]), ({"state": "max"}, pool["max"])]
+
+    def jobs_by_status():
+        if job_manager is None:
+            return []
+        return [
+            ({"status": status}, count)
+            for status, count in job_manager.get_stats()["jobs"].items()
+        ]
+
+    REGISTRY.callback(
+        "exam_queue_depth", "Items waiting in each internal queue", queue_depths
+    )
+    REGISTRY.callback(
+        "exam_stream_clients", "Connected MJPEG viewers and SSE clients", stream_clients
+    )
+    REGISTRY.callback(
+        "exam_stream_frames_dropped_total",
+        "Frames slow MJPEG viewers skipped to stay live",
+        frames_dropped,
+        type="counter",
+    )
+    REGISTRY.callback(
+        "exam_detections_dropped_total",
+        "Detection rows dropped because the writer buffer was full",
+        lambda: [({}, detection_writer.get_stats()["dropped"])],
+        type="counter",
+    )
+    REGISTRY.callback(
+        "exam_db_connections", "Database pool connections", db_connections
+    )
+    REGISTRY.callback("exam_jobs", "Upload jobs by status", jobs_by_status)
+    REGISTRY.callback(
+        "exam_evidence_bytes",
+        "Disk space used by evidence frames and thumbnails",
+        lambda: [({}, evidence_store.get_stats()["bytes"])],
+    )
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+def generate_processed_frames(job_id):
+    """Generator for an upload's preview frames, shared by every viewer"""
+    feed = job_feeds.get(job_id)
+    if feed is None:
+        return
+    yield from feed.stream()
 
 
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,281 @@
+"""
+Micro-benchmarks for the detection hot path, using deterministic stub
+YOLO models so they run offline on a CPU-only box without the .pt weights
+
+    python -m benchmarks.hot_path --output results.json
+    python -m benchmarks.hot_path --video exam.mp4 --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import cv2
+import numpy as np
+from benchmarks.stubs import (
+    CHEATING_CLASSES,
+    GENERAL_CLASSES,
+    StubBackend,
+    recorded_frames,
+    synthetic_frames,
+)
+from src.utils.drawing import draw_detection_boxes
+from src.utils.object_detector import ObjectDetector
+
+BENCHMARK_SOURCE_ID = "benchmark"
+
+
+def summarize(samples, wall_seconds):
+    """Latency percentiles in milliseconds plus throughput"""
+    ms = np.array(samples) * 1000.0
+    return {
+        "iterations": len(samples),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p90_ms": round(float(np.percentile(ms, 90)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+        "per_second": round(len(samples) / wall_seconds, 2) if wall_seconds else 0.0,
+    }
+
+
+def run_stage(name, func, items, warmup=5, memory_items=20):
+    """
+    Time func over every item, then measure its peak Python/NumPy
+    allocations in a separate, shorter pass so tracing doesn't skew timing
+    """
+    for item in items[:warmup]:
+        func(item)
+
+    samples = []
+    started = time.perf_counter()
+    for item in items:
+        call_started = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - call_started)
+    wall = time.perf_counter() - started
+
+    tracemalloc.start()
+    for item in items[:memory_items]:
+        func(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = summarize(samples, wall)
+    result["peak_alloc_kb"] = round(peak / 1024, 1)
+    print(
+        f"{name:<16} p50 {result['p50_ms']:>9.3f} ms  p99 {result['p99_ms']:>9.3f} ms"
+        f"  {result['per_second']:>9.1f}/s  peak {result['peak_alloc_kb']:>9.1f} KB"
+    )
+    return result
+
+
+def make_object_detector(latency_ms):
+    return ObjectDetector(
+        general_model=StubBackend(GENERAL_CLASSES, latency_ms=latency_ms),
+        cheating_model=StubBackend(CHEATING_CLASSES, latency_ms=latency_ms),
+    )
+
+
+def benchmark_parsing(object_detector, frames, stages, warmup):
+    general = object_detector.general_model.predict(frames)
+    cheating = object_detector.cheating_model.predict(frames)
+    stages["parse_objects"] = run_stage(
+        "parse_objects", object_detector._parse_object_result, general, warmup
+    )
+    stages["parse_cheating"] = run_stage(
+        "parse_cheating", object_detector._parse_cheating_result, cheating, warmup
+    )
+
+
+def benchmark_pose(frames, stages, warmup):
+    try:
+        from src.utils.pose_analyzer import PoseAnalyzer
+    except ImportError as e:
+        print(f"Skipping analyze_pose: {str(e)}")
+        return
+    stages["analyze_pose"] = run_stage(
+        "analyze_pose", PoseAnalyzer().analyze_pose, frames, warmup
+    )
+
+
+def benchmark_process_frame(object_detector, frames, stages, warmup):
+    try:
+        from src.detectors.cheating_detector import CheatingDetector
+    except ImportError as e:
+        print(f"Skipping process_frame: {str(e)}")
+        return
+    detector = CheatingDetector(object_detector=object_detector)
+    stages["process_frame"] = run_stage(
+        "process_frame", detector.process_frame, frames, warmup
+    )
+    detector.shutdown()
+
+
+def benchmark_output(object_detector, frames, stages, warmup):
+    # Every stub box drawn, more than a real frame would usually carry
+    detections = [
+        [
+            {"behavior_type": "phone_usage", "confidence": conf, "bbox": bbox}
+            for _, conf, bbox in boxes
+        ]
+        for boxes in object_detector.general_model.predict(frames)
+    ]
+    # Drawing happens in place, so it works on copies of the frames
+    items = [(frame.copy(), dets) for frame, dets in zip(frames, detections)]
+    stages["draw_boxes"] = run_stage(
+        "draw_boxes", lambda item: draw_detection_boxes(*item), items, warmup
+    )
+    stages["jpeg_encode"] = run_stage(
+        "jpeg_encode", lambda frame: cv2.imencode(".jpg", frame), frames, warmup
+    )
+
+
+def benchmark_db(stages, batch_size, iterations, warmup):
+    from src.database.db_manager import DBManager
+
+    db_manager = DBManager()
+    now = datetime.now()
+    row = {
+        "timestamp": now,
+        "behavior_type": "benchmark",
+        "confidence": 0.9,
+        "frame_path": "benchmark.jpg",
+        "details": "Benchmark row",
+        "bbox": [10.0, 20.0, 110.0, 220.0],
+        "end_time": now,
+        "frame_count": 5,
+        "source_id": BENCHMARK_SOURCE_ID,
+    }
+    try:
+        stages["db_store_one"] = run_stage(
+            "db_store_one",
+            lambda r: db_manager.store_detection(**r),
+            [row] * iterations,
+            warmup,
+        )
+        stages["db_store_batch"] = run_stage(
+            f"db_batch_{batch_size}",
+            db_manager.store_detections,
+            [[row] * batch_size] * iterations,
+            warmup,
+        )
+        stages["db_store_batch"]["batch_size"] = batch_size
+    finally:
+        db_manager._execute(
+            "DELETE FROM detections WHERE source_id = %s", (BENCHMARK_SOURCE_ID,)
+        )
+        db_manager.close()
+
+
+def compare(results, baseline, tolerance):
+    """Stages whose median latency regressed beyond tolerance"""
+    regressions = []
+    for name, stage in results["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before or not before["p50_ms"]:
+            continue
+        ratio = stage["p50_ms"] / before["p50_ms"]
+        marker = "REGRESSION" if ratio > 1 + tolerance else "ok"
+        print(
+            f"{name:<16} {before['p50_ms']:>9.3f} -> {stage['p50_ms']:>9.3f} ms"
+            f"  x{ratio:.2f}  {marker}"
+        )
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--video", help="Use frames from this recording")
+    parser.add_argument(
+        "--stub-latency-ms",
+        type=float,
+        default=0.0,
+        help="Simulated cost of each stub model call",
+    )
+    parser.add_argument(
+        "--motion-gate",
+        action="store_true",
+        help="Keep the motion gate on in process_frame (off by default)",
+    )
+    parser.add_argument(
+        "--db", action="store_true", help="Also benchmark writes to the .env database"
+    )
+    parser.add_argument("--db-batch-size", type=int, default=100)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON result")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="Allowed median slowdown before a stage counts as a regression",
+    )
+    args = parser.parse_args(argv)
+
+    # Pin the detector configuration so runs are comparable
+    os.environ["MOTION_GATE"] = "true" if args.motion_gate else "false"
+    os.environ.setdefault("CONCURRENT_INFERENCE", "false")
+    os.environ.setdefault("ADAPTIVE_RESOLUTION", "false")
+    cv2.setRNGSeed(args.seed)
+
+    if args.video:
+        frames = recorded_frames(args.video, args.frames)
+        if not frames:
+            print(f"Could not read frames from {args.video}")
+            return 1
+    else:
+        frames = synthetic_frames(args.frames, seed=args.seed)
+
+    object_detector = make_object_detector(args.stub_latency_ms)
+    stages = {}
+    benchmark_parsing(object_detector, frames, stages, args.warmup)
+    benchmark_pose(frames, stages, args.warmup)
+    benchmark_process_frame(object_detector, frames, stages, args.warmup)
+    benchmark_output(object_detector, frames, stages, args.warmup)
+    if args.db:
+        benchmark_db(stages, args.db_batch_size, min(args.frames, 100), args.warmup)
+
+    results = {
+        "created_at": datetime.now().isoformat(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "frame_source": args.video or "synthetic",
+        "frame_count": len(frames),
+        # Linux reports ru_maxrss in kilobytes
+        "max_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+        "stages": stages,
+    }
+    print(f"Peak RSS {results['max_rss_mb']} MB")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressed stages: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
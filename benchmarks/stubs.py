@@ -0,0 +1,91 @@
+import time
+import zlib
+import cv2
+import numpy as np
+
+# Classes the stand-in models emit, mirroring ObjectDetector's class ids
+GENERAL_CLASSES = (0, 0, 67, 73)  # person, person, cell phone, book
+CHEATING_CLASSES = (0, 1, 2)  # person, students_cheating, students_not_cheating
+
+
+class StubBackend:
+    """
+    Deterministic stand-in for a YOLO backend: the boxes only depend on the
+    frame's content, so repeated runs see identical detections without any
+    weights on disk. latency_ms optionally simulates the model's cost.
+    """
+
+    def __init__(self, classes, boxes_per_frame=6, latency_ms=0.0):
+        self.name = "stub"
+        self.classes = classes
+        self.boxes_per_frame = boxes_per_frame
+        self.latency_ms = latency_ms
+
+    def predict(self, frames, imgsz=None):
+        results = []
+        for frame in frames:
+            frame = getattr(frame, "frame", frame)  # FrameContext or array
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000.0)
+            seed = zlib.crc32(np.ascontiguousarray(frame[::16, ::16]).tobytes())
+            rng = np.random.default_rng(seed)
+            h, w = frame.shape[:2]
+            boxes = []
+            for _ in range(self.boxes_per_frame):
+                x1, y1 = rng.uniform(0, w * 0.8), rng.uniform(0, h * 0.8)
+                x2 = min(w, x1 + rng.uniform(w * 0.05, w * 0.3))
+                y2 = min(h, y1 + rng.uniform(h * 0.1, h * 0.5))
+                boxes.append(
+                    (
+                        int(rng.choice(self.classes)),
+                        float(rng.uniform(0.3, 0.95)),
+                        [float(x1), float(y1), float(x2), float(y2)],
+                    )
+                )
+            results.append(boxes)
+        return results
+
+
+def synthetic_frames(count, size=(640, 480), seed=0):
+    """
+    Reproducible classroom-like frames: a textured background with a few
+    moving blocks, so the motion gate and JPEG encoder see realistic change
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    background = rng.integers(0, 256, (height // 8, width // 8, 3), dtype=np.uint8)
+    background = cv2.resize(background, size, interpolation=cv2.INTER_LINEAR)
+    # (x, y, dx, dy, color) of each moving block
+    blocks = [
+        (
+            rng.uniform(0, width),
+            rng.uniform(0, height),
+            rng.uniform(-6, 6),
+            rng.uniform(-4, 4),
+            tuple(int(c) for c in rng.integers(0, 256, 3)),
+        )
+        for _ in range(5)
+    ]
+
+    frames = []
+    for index in range(count):
+        frame = background.copy()
+        for x, y, dx, dy, color in blocks:
+            cx = int((x + dx * index) % width)
+            cy = int((y + dy * index) % height)
+            cv2.rectangle(frame, (cx, cy), (cx + 60, cy + 90), color, -1)
+        frames.append(frame)
+    return frames
+
+
+def recorded_frames(path, count, size=(640, 480)):
+    """Up to count frames from a video file, resized like the live feed"""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(cv2.resize(frame, size))
+    cap.release()
+    return frames
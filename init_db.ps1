@@ -13,11 +13,23 @@ CREATE TABLE IF NOT EXISTS detections (
     confidence FLOAT NOT NULL,
     frame_path VARCHAR(255) NOT NULL,
     details TEXT,
-    bbox JSON
+    bbox JSON,
+    end_time TIMESTAMP,
+    frame_count INTEGER NOT NULL DEFAULT 1,
+    source_id VARCHAR(64),
+    track_id INTEGER,
+    frame_index INTEGER,
+    media_time FLOAT,
+    episode_id VARCHAR(32),
+    inserted_at TIMESTAMP NOT NULL DEFAULT clock_timestamp(),
+    updated_at TIMESTAMP NOT NULL DEFAULT clock_timestamp()
 );
 
 CREATE INDEX IF NOT EXISTS idx_detections_timestamp ON detections(timestamp DESC);
 CREATE INDEX IF NOT EXISTS idx_detections_behavior_type ON detections(behavior_type);
+CREATE INDEX IF NOT EXISTS idx_detections_timestamp_id ON detections(timestamp DESC, id DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_detections_episode_id ON detections(episode_id);
+CREATE INDEX IF NOT EXISTS idx_detections_updated_at_id ON detections(updated_at, id);
 "@
 
 psql -U postgres -h localhost -d cheating_detection -c $createTables
@@ -1,13 +1,64 @@
 import psycopg2
-from psycopg2.extras import DictCursor
+from psycopg2 import pool
+from psycopg2.extras import DictCursor, execute_values
 import os
 from dotenv import load_dotenv
 import json
+import threading
+from datetime import datetime
+import time
+from contextlib import contextmanager
+from src.utils.metrics import DB_SECONDS, count_error, timed
 
 load_dotenv()
 
+# Columns written for each detection, in INSERT order
+DETECTION_COLUMNS = (
+    "timestamp",
+    "behavior_type",
+    "confidence",
+    "frame_path",
+    "details",
+    "bbox",
+    "end_time",
+    "frame_count",
+    "source_id",
+    "track_id",
+    "frame_index",
+    "media_time",
+    "episode_id",
+)
+# Columns an episode's later reports overwrite on its existing row
+EPISODE_UPDATE_COLUMNS = (
+    "confidence",
+    "frame_path",
+    "details",
+    "bbox",
+    "end_time",
+    "frame_count",
+    "track_id",
+)
+DETECTION_DEFAULTS = {
+    "details": None,
+    "bbox": None,
+    "end_time": None,
+    "frame_count": 1,
+    "source_id": None,
+    "track_id": None,
+    "frame_index": None,
+    "media_time": None,
+    "episode_id": None,
+}
+
 
 class DBManager:
+    # Failures worth retrying later: the server or the pool, not the data
+    TRANSIENT_ERRORS = (
+        psycopg2.OperationalError,
+        psycopg2.InterfaceError,
+        pool.PoolError,
+    )
+
     def __init__(self):
         self.conn_params = {
             "dbname": os.getenv("DB_NAME"),
@@ -16,15 +67,135 @@ class DBManager:
             "host": os.getenv("DB_HOST"),
             "port": os.getenv("DB_PORT"),
         }
+
+        # Shared connection pool so frame loops and dashboard polls don't
+        # pay for a new connection on every statement
+        self.pool_min = int(os.getenv("DB_POOL_MIN", 1))
+        self.pool_max = max(self.pool_min, int(os.getenv("DB_POOL_MAX", 10)))
+        self.pool_timeout = float(os.getenv("DB_POOL_TIMEOUT", 10))
+        # Idle connections older than this are pinged before being handed out
+        self.health_check_interval = float(os.getenv("DB_HEALTH_CHECK_INTERVAL", 30))
+        # Longest a detection write may stay uncommitted; ids and timestamps
+        # are handed out before commit, so pollers only move past rows older
+        # than this
+        self.commit_lag = float(os.getenv("DB_COMMIT_LAG", 5))
+
+        self.pool = pool.ThreadedConnectionPool(
+            self.pool_min, self.pool_max, **self.conn_params
+        )
+        # ThreadedConnectionPool raises when exhausted, so callers wait here
+        self._slots = threading.BoundedSemaphore(self.pool_max)
+        self._last_used = {}
+        self._stats_lock = threading.Lock()
+        self._in_use = 0
+
         self.init_db()
 
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection, committing on success, rolling back on error"""
+        with timed(DB_SECONDS, operation="wait_for_connection"):
+            acquired = self._slots.acquire(timeout=self.pool_timeout)
+        if not acquired:
+            count_error("db")
+            raise pool.PoolError("Timed out waiting for a database connection")
+
+        conn = None
+        try:
+            conn = self._checkout()
+            with self._stats_lock:
+                self._in_use += 1
+            yield conn
+            conn.commit()
+        except Exception:
+            if conn is not None and not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    pass
+            raise
+        finally:
+            if conn is not None:
+                with self._stats_lock:
+                    self._in_use -= 1
+                self._release(conn)
+            self._slots.release()
+
+    def close(self):
+        """Close every pooled connection"""
+        self.pool.closeall()
+
+    def get_pool_stats(self):
+        """Current connection usage of the pool"""
+        with self._stats_lock:
+            return {"in_use": self._in_use, "max": self.pool_max}
+
+    def _checkout(self):
+        """Get a healthy connection, replacing ones the server has dropped"""
+        for _ in range(self.pool_max + 1):
+            conn = self.pool.getconn()
+            if self._is_healthy(conn):
+                return conn
+            self._discard(conn)
+        # Every pooled connection was dead, e.g. after a Postgres restart
+        return self.pool.getconn()
+
+    def _is_healthy(self, conn):
+        if conn.closed:
+            return False
+
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and (
+            time.monotonic() - last_used < self.health_check_interval
+        ):
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _release(self, conn):
+        if conn.closed:
+            self._discard(conn)
+            return
+        self._last_used[id(conn)] = time.monotonic()
+        self.pool.putconn(conn)
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        try:
+            self.pool.putconn(conn, close=True)
+        except pool.PoolError:
+            pass
+
+    def _execute(self, query, params=None, fetch=False):
+        """Run one statement on a pooled connection, retrying once if it dropped"""
+        # Labelled by statement kind (select, insert, alter, ...)
+        operation = query.split(None, 1)[0].lower()
+        for attempt in range(2):
+            try:
+                with timed(DB_SECONDS, operation=operation):
+                    with self.connection() as conn:
+                        cur = conn.cursor(cursor_factory=DictCursor)
+                        cur.execute(query, params)
+                        rows = cur.fetchall() if fetch else None
+                        cur.close()
+                        return rows
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                # The connection went away mid-statement; it has been
+                # discarded, so a retry gets a fresh one
+                count_error("db")
+                if attempt == 1:
+                    raise
+
     def init_db(self):
         """Initialize database and create required tables if they don't exist"""
-        conn = psycopg2.connect(**self.conn_params)
-        cur = conn.cursor()
-
         # Create detections table
-        cur.execute(
+        self._execute(
             """
             CREATE TABLE IF NOT EXISTS detections (id SERIAL PRIMARY KEY,
                 timestamp TIMESTAMP NOT NULL,
@@ -36,39 +207,150 @@ class DBManager:
             );
         """
         )
+        # Episode, source, track and video position columns added after the
+        # original schema
+        self._execute(
+            """
+            ALTER TABLE detections
+                ADD COLUMN IF NOT EXISTS end_time TIMESTAMP,
+                ADD COLUMN IF NOT EXISTS frame_count INTEGER NOT NULL DEFAULT 1,
+                ADD COLUMN IF NOT EXISTS source_id VARCHAR(64),
+                ADD COLUMN IF NOT EXISTS track_id INTEGER,
+                ADD COLUMN IF NOT EXISTS frame_index INTEGER,
+                ADD COLUMN IF NOT EXISTS media_time FLOAT,
+                ADD COLUMN IF NOT EXISTS episode_id VARCHAR(32),
+                ADD COLUMN IF NOT EXISTS inserted_at TIMESTAMP NOT NULL
+                    DEFAULT clock_timestamp(),
+                ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL
+                    DEFAULT clock_timestamp();
+        """
+        )
+        # Each episode keeps one row, inserted when it opens and updated
+        # until it closes; rows without an episode never conflict
+        self._execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_detections_episode_id
+                ON detections(episode_id);
+        """
+        )
+        # Keyset pagination walks detections by (timestamp, id)
+        self._execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_detections_timestamp_id
+                ON detections(timestamp DESC, id DESC);
+        """
+        )
+        # Pollers follow rows that changed after they saw them by
+        # (updated_at, id)
+        self._execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_detections_updated_at_id
+                ON detections(updated_at, id);
+        """
+        )
 
-        conn.commit()
-        cur.close()
-        conn.close()
-
-    def store_detection(self, timestamp, behavior_type, confidence, frame_path):
+    def store_detection(self, timestamp, behavior_type, confidence, frame_path, **extra):
         """Store a new detection in the database"""
-        conn = psycopg2.connect(**self.conn_params)
-        cur = conn.cursor()
+        self.store_detections(
+            [
+                {
+                    "timestamp": timestamp,
+                    "behavior_type": behavior_type,
+                    "confidence": confidence,
+                    "frame_path": frame_path,
+                    **extra,
+                }
+            ]
+        )
+
+    def store_detections(self, rows):
+        """
+        Store several detections in one transaction
+        rows is a list of dicts keyed by DETECTION_COLUMNS; missing optional
+        columns take their defaults. A row whose episode_id is already
+        stored updates that row instead of adding another.
+        """
+        if not rows:
+            return
 
-        cur.execute(
+        # One INSERT can't update a row twice, so an episode reported more
+        # than once in a batch is written once, with its latest state
+        latest = {}
+        for index, row in enumerate(rows):
+            latest[row.get("episode_id") or index] = row
+
+        values = []
+        for row in latest.values():
+            row = {**DETECTION_DEFAULTS, **row}
+            if row["bbox"] is not None:
+                row["bbox"] = json.dumps(row["bbox"])
+            values.append(tuple(row[column] for column in DETECTION_COLUMNS))
+
+        updates = ", ".join(
+            f"{column} = EXCLUDED.{column}" for column in EPISODE_UPDATE_COLUMNS
+        )
+        updates += ", updated_at = clock_timestamp()"
+        with timed(DB_SECONDS, operation="insert_batch"), self.connection() as conn:
+            cur = conn.cursor()
+            execute_values(
+                cur,
+                f"""
+                INSERT INTO detections ({", ".join(DETECTION_COLUMNS)})
+                VALUES %s
+                ON CONFLICT (episode_id) DO UPDATE SET {updates}
+            """,
+                values,
+                page_size=len(values),
+            )
+            cur.close()
+
+    def clear_frame_paths(self, filenames):
+        """
+        Drop the references to evidence frames that were deleted, matched by
+        file name since rows may store the frame under different directories
+        """
+        if not filenames:
+            return
+        self._execute(
             """
-            INSERT INTO detections (timestamp, behavior_type, confidence, frame_path)
-            VALUES (%s, %s, %s, %s)
+            UPDATE detections SET frame_path = ''
+            WHERE substring(frame_path from '[^/\\\\]+$') = ANY(%s)
         """,
-            (timestamp, behavior_type, confidence, frame_path),
+            (list(filenames),),
         )
 
-        conn.commit()
-        cur.close()
-        conn.close()
-
-    def get_detection_query(self):
+    def get_detection_query(
+        self, with_sort_key=False, with_settled=False, with_updated_at=False
+    ):
         """Get the standard query for detections with proper timestamp formatting"""
-        return """
-            SELECT 
+        # The raw timestamp is needed to build exact keyset cursors
+        sort_key = ", timestamp AS sort_timestamp" if with_sort_key else ""
+        # Rows inserted more than commit_lag ago, a parameter, can no longer
+        # have uncommitted rows with lower ids
+        if with_settled:
+            sort_key += (
+                ", inserted_at < clock_timestamp() - %s * interval '1 second'"
+                " AS settled"
+            )
+        # The raw updated_at builds cursors over the rows that changed
+        if with_updated_at:
+            sort_key += ", updated_at AS sort_updated_at"
+        return f"""
+            SELECT
                 id,
                 TO_CHAR(timestamp AT TIME ZONE current_setting('TIMEZONE'), 'YYYY-MM-DD"T"HH24:MI:SS.MS') as timestamp,
                 behavior_type,
                 confidence,
                 frame_path,
                 details,
-                bbox
+                bbox,
+                TO_CHAR(end_time AT TIME ZONE current_setting('TIMEZONE'), 'YYYY-MM-DD"T"HH24:MI:SS.MS') as end_time,
+                frame_count,
+                source_id,
+                track_id,
+                frame_index,
+                media_time,
+                episode_id{sort_key}
             FROM detections
         """
 
@@ -84,9 +366,6 @@ class DBManager:
 
     def get_recent_alerts(self, limit=10):
         """Get recent detections from the database"""
-        conn = psycopg2.connect(**self.conn_params)
-        cur = conn.cursor(cursor_factory=DictCursor)
-
         query = (
             self.get_detection_query()
             + """
@@ -94,38 +373,24 @@ class DBManager:
             LIMIT %s
         """
         )
-        cur.execute(query, (limit,))
-
-        alerts = self.process_detection_rows(cur.fetchall())
+        rows = self._execute(query, (limit,), fetch=True)
 
-        cur.close()
-        conn.close()
-        return alerts
+        return self.process_detection_rows(rows)
 
     def get_all_alerts(self):
         """Get all detections from the database"""
-        conn = psycopg2.connect(**self.conn_params)
-        cur = conn.cursor(cursor_factory=DictCursor)
-
         query = (
             self.get_detection_query()
             + """
             ORDER BY timestamp DESC
         """
         )
-        cur.execute(query)
-
-        alerts = self.process_detection_rows(cur.fetchall())
+        rows = self._execute(query, fetch=True)
 
-        cur.close()
-        conn.close()
-        return alerts
+        return self.process_detection_rows(rows)
 
     def get_recent_detections(self, limit=100):
         """Get recent detections ordered by timestamp"""
-        conn = psycopg2.connect(**self.conn_params)
-        cur = conn.cursor(cursor_factory=DictCursor)
-
         query = (
             self.get_detection_query()
             + """
@@ -133,19 +398,12 @@ class DBManager:
             LIMIT %s
         """
         )
-        cur.execute(query, (limit,))
-
-        detections = self.process_detection_rows(cur.fetchall())
+        rows = self._execute(query, (limit,), fetch=True)
 
-        cur.close()
-        conn.close()
-        return detections
+        return self.process_detection_rows(rows)
 
     def get_detections_by_type(self, behavior_type, limit=100):
         """Get detections filtered by behavior type"""
-        conn = psycopg2.connect(**self.conn_params)
-        cur = conn.cursor(cursor_factory=DictCursor)
-
         query = (
             self.get_detection_query()
             + """
@@ -154,10 +412,160 @@ class DBManager:
             LIMIT %s
         """
         )
-        cur.execute(query, (behavior_type, limit))
+        rows = self._execute(query, (behavior_type, limit), fetch=True)
 
-        detections = self.process_detection_rows(cur.fetchall())
+        return self.process_detection_rows(rows)
 
-        cur.close()
-        conn.close()
-        return detections
+    def get_alerts_since(self, since_id, behavior_type=None, limit=500):
+        """
+        Get detections added after since_id, oldest first
+        Returns (detections, last_id, has_more) so pollers only pay for new
+        rows. Writers commit concurrently, so a lower id may still appear
+        after a higher one; last_id, the since_id for the next call, only
+        moves past rows older than commit_lag, and newer rows are returned
+        again until then, for the caller to skip by id.
+        """
+        conditions = ["id > %s"]
+        params = [since_id]
+        if behavior_type is not None:
+            conditions.append("behavior_type = %s")
+            params.append(behavior_type)
+
+        query = (
+            self.get_detection_query(with_settled=True)
+            + f"""
+            WHERE {" AND ".join(conditions)}
+            ORDER BY id ASC
+            LIMIT %s
+        """
+        )
+        # Fetch one extra row to know whether another call is needed
+        rows = self._execute(query, (self.commit_lag, *params, limit + 1), fetch=True)
+
+        rows, more = rows[:limit], len(rows) > limit
+        last_id = max((row["id"] for row in rows if row["settled"]), default=since_id)
+        detections = self.process_detection_rows(rows)
+        for detection in detections:
+            detection.pop("settled", None)
+        # Asking again right away only helps if the cursor moved
+        return detections, last_id, more and last_id > since_id
+
+    def get_settled_id(self):
+        """
+        Highest id below which every detection is committed, where pollers
+        that start from a page of alerts continue with get_alerts_since
+        """
+        rows = self._execute(
+            """
+            SELECT id FROM detections
+            WHERE inserted_at < clock_timestamp() - %s * interval '1 second'
+            ORDER BY id DESC
+            LIMIT 1
+        """,
+            (self.commit_lag,),
+            fetch=True,
+        )
+        return rows[0]["id"] if rows else 0
+
+    def get_update_cursor(self):
+        """
+        Cursor for get_updates_since that pollers starting from a page of
+        alerts continue with, alongside get_settled_id
+        """
+        return self.encode_cursor(self._settled_time(), 0)
+
+    def get_updates_since(self, since_id, cursor, behavior_type=None, limit=500):
+        """
+        Get detections up to since_id that changed after cursor, such as
+        episodes that grew or closed after a poller first saw them, oldest
+        change first. Returns (detections, next_cursor, has_more); like
+        last_id, the cursor only moves past changes older than commit_lag,
+        so the newest ones may be returned again.
+        """
+        start = self.decode_cursor(cursor)
+        # Taken before the query, so every change older than it is visible
+        settled = (self._settled_time(), 0)
+
+        conditions = ["id <= %s", "(updated_at, id) > (%s, %s)"]
+        params = [since_id, *start]
+        if behavior_type is not None:
+            conditions.append("behavior_type = %s")
+            params.append(behavior_type)
+
+        query = (
+            self.get_detection_query(with_updated_at=True)
+            + f"""
+            WHERE {" AND ".join(conditions)}
+            ORDER BY updated_at ASC, id ASC
+            LIMIT %s
+        """
+        )
+        rows = self._execute(query, (*params, limit + 1), fetch=True)
+
+        rows, more = rows[:limit], len(rows) > limit
+        end = settled
+        if more:
+            end = min(end, (rows[-1]["sort_updated_at"], rows[-1]["id"]))
+        end = max(end, start)
+        detections = self.process_detection_rows(rows)
+        for detection in detections:
+            detection.pop("sort_updated_at", None)
+        return detections, self.encode_cursor(*end), more and end > start
+
+    def _settled_time(self):
+        """Server time before which every write is committed"""
+        rows = self._execute(
+            "SELECT (clock_timestamp() - %s * interval '1 second')::timestamp AS at",
+            (self.commit_lag,),
+            fetch=True,
+        )
+        return rows[0]["at"]
+
+    def get_alerts_page(self, cursor=None, behavior_type=None, limit=100):
+        """
+        Get one page of detections, newest first, using keyset pagination
+        over (timestamp, id). Returns (detections, next_cursor)
+        """
+        conditions = []
+        params = []
+        if cursor is not None:
+            cursor_timestamp, cursor_id = self.decode_cursor(cursor)
+            conditions.append("(timestamp, id) < (%s, %s)")
+            params.extend([cursor_timestamp, cursor_id])
+        if behavior_type is not None:
+            conditions.append("behavior_type = %s")
+            params.append(behavior_type)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = (
+            self.get_detection_query(with_sort_key=True)
+            + f"""
+            {where}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT %s
+        """
+        )
+        rows = self._execute(query, (*params, limit + 1), fetch=True)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = self.encode_cursor(last["sort_timestamp"], last["id"])
+
+        detections = self.process_detection_rows(rows)
+        for detection in detections:
+            detection.pop("sort_timestamp", None)
+        return detections, next_cursor
+
+    def encode_cursor(self, timestamp, detection_id):
+        """Build an opaque keyset cursor from a row's timestamp and id"""
+        return f"{timestamp.isoformat()}|{detection_id}"
+
+    def decode_cursor(self, cursor):
+        """Split a keyset cursor back into (timestamp, id)"""
+        try:
+            timestamp, detection_id = cursor.rsplit("|", 1)
+            return datetime.fromisoformat(timestamp), int(detection_id)
+        except (AttributeError, ValueError):
+            raise ValueError(f"Invalid cursor: {cursor}")
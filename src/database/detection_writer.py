@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import deque
+
+
+class DetectionWriter:
+    """
+    Buffer detection rows in memory and write them to the database from a
+    background thread, one multi-row INSERT per flush
+    """
+
+    OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+    def __init__(
+        self,
+        db_manager,
+        batch_size=100,
+        flush_interval=1.0,
+        max_buffer=10000,
+        overflow_policy="drop_oldest",
+    ):
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.db_manager = db_manager
+        # Only these errors re-queue a batch; any other failure is blamed on
+        # the rows themselves. Without the hint every error is retried.
+        self.transient_errors = getattr(db_manager, "TRANSIENT_ERRORS", (Exception,))
+        self.batch_size = max(1, batch_size)  # Flush once this many rows wait
+        self.flush_interval = flush_interval  # ...or once the oldest waited this long
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.overflow_policy = overflow_policy
+
+        self.buffer = deque()
+        self.condition = threading.Condition()
+        self.running = True
+        self.oldest_enqueued = None
+        self.retry_at = 0.0
+
+        # Metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+        self.thread = threading.Thread(
+            target=self._run, name="detection-writer", daemon=True
+        )
+        self.thread.start()
+
+    def enqueue(self, timestamp, behavior_type, confidence, frame_path, **extra):
+        """Queue a detection row without blocking; returns False if it was dropped"""
+        row = {
+            "timestamp": timestamp,
+            "behavior_type": behavior_type,
+            "confidence": confidence,
+            "frame_path": frame_path,
+            **extra,
+        }
+        with self.condition:
+            if not self.running:
+                return False
+
+            self.enqueued += 1
+            if len(self.buffer) >= self.max_buffer:
+                self.dropped += 1
+                if self.overflow_policy == "drop_newest":
+                    return False
+                self.buffer.popleft()
+
+            if not self.buffer:
+                self.oldest_enqueued = time.monotonic()
+            self.buffer.append(row)
+
+            # The first row re-arms the writer's wait with the flush interval
+            if len(self.buffer) == 1 or len(self.buffer) >= self.batch_size:
+                self.condition.notify()
+        return True
+
+    def flush(self):
+        """Write everything buffered so far, blocking the caller"""
+        with self.condition:
+            rows = self._take_all()
+        self._write(rows)
+
+    def shutdown(self, timeout=10):
+        """Stop the writer thread after flushing the remaining rows"""
+        with self.condition:
+            if not self.running:
+                return
+            self.running = False
+            self.condition.notify()
+        self.thread.join(timeout)
+
+    def get_stats(self):
+        """Queue depth and flush latency metrics"""
+        with self.condition:
+            return {
+                "queue_depth": len(self.buffer),
+                "max_buffer": self.max_buffer,
+                "overflow_policy": self.overflow_policy,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "last_flush_ms": round(self.last_flush_latency * 1000, 2),
+                "max_flush_ms": round(self.max_flush_latency * 1000, 2),
+                "avg_flush_ms": (
+                    round(self.total_flush_latency / self.flushes * 1000, 2)
+                    if self.flushes
+                    else 0.0
+                ),
+            }
+
+    def _take_all(self):
+        rows = list(self.buffer)
+        self.buffer.clear()
+        self.oldest_enqueued = None
+        return rows
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self._flush_due():
+                    self.condition.wait(timeout=self._time_until_due())
+                rows = self._take_all()
+                running = self.running
+
+            self._write(rows)
+
+            if not running:
+                # Pick up anything enqueued while the last batch was written
+                with self.condition:
+                    rows = self._take_all()
+                self._write(rows)
+                return
+
+    def _store(self, rows):
+        """
+        Write rows, splitting a batch the database rejects in halves until
+        the bad rows are isolated and dropped, so one of them can't block
+        every later flush. Returns (written, rejected, unwritten), where
+        unwritten are the rows left after a transient failure, in order.
+        """
+        written = rejected = 0
+        chunks = [rows]  # Stack; the last chunk is written next
+        while chunks:
+            chunk = chunks.pop()
+            try:
+                self.db_manager.store_detections(chunk)
+                written += len(chunk)
+            except self.transient_errors as e:
+                print(f"Error writing {len(chunk)} detections: {str(e)}")
+                unwritten = list(chunk)
+                for remaining in reversed(chunks):
+                    unwritten.extend(remaining)
+                return written, rejected, unwritten
+            except Exception as e:
+                if len(chunk) == 1:
+                    rejected += 1
+                    print(f"Dropping a detection the database rejected: {str(e)}")
+                    continue
+                middle = len(chunk) // 2
+                chunks.append(chunk[middle:])
+                chunks.append(chunk[:middle])
+        return written, rejected, []
+
+    def _flush_due(self):
+        if not self.buffer:
+            return False
+        now = time.monotonic()
+        if now < self.retry_at:
+            return False
+        if len(self.buffer) >= self.batch_size:
+            return True
+        return now - self.oldest_enqueued >= self.flush_interval
+
+    def _time_until_due(self):
+        if not self.buffer:
+            return None
+        now = time.monotonic()
+        due = max(self.oldest_enqueued + self.flush_interval, self.retry_at)
+        return max(0.0, due - now)
+
+    def _write(self, rows):
+        if not rows:
+            return
+
+        start = time.perf_counter()
+        written, rejected, unwritten = self._store(rows)
+        with self.condition:
+            self.written += written
+            self.rejected += rejected
+        if unwritten:
+            with self.condition:
+                self.failed_flushes += 1
+                # Put the rows back in front so the next flush retries them,
+                # keeping the buffer within its bound
+                room = self.max_buffer - len(self.buffer)
+                if room < len(unwritten):
+                    self.dropped += len(unwritten) - room
+                    unwritten = unwritten[len(unwritten) - room :] if room > 0 else []
+                if unwritten:
+                    self.buffer.extendleft(reversed(unwritten))
+                    self.oldest_enqueued = time.monotonic()
+                # Back off instead of hammering a database that is down
+                self.retry_at = time.monotonic() + self.flush_interval
+            return
+
+        latency = time.perf_counter() - start
+        with self.condition:
+            self.flushes += 1
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            self.total_flush_latency += latency
@@ -1,34 +1,375 @@
 import cv2
 import mediapipe as mp
-from ultralytics import YOLO
-import torch
 import numpy as np
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from src.utils.pose_analyzer import PoseAnalyzer
 from src.utils.object_detector import ObjectDetector
+from src.utils.frame_context import FrameContext
+from src.utils.motion_gate import MotionGate
+from src.utils.resolution_controller import DEFAULT_LADDER, ResolutionController
+from src.utils.metrics import MODEL_SECONDS, timed
+from src.detectors.student_tracker import StudentTracker
+
+
+def _env_flag(name, default):
+    """Read a boolean setting from the environment"""
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
 
 
 class CheatingDetector:
-    def __init__(self):
+    def __init__(
+        self, concurrent=None, object_detector=None, scheduler=None, source_id=None
+    ):
+        # Pose analysis and all temporal state belong to this detector, while
+        # the heavy YOLO models can be shared between several detectors
         self.pose_analyzer = PoseAnalyzer()
-        self.object_detector = ObjectDetector()
+        self.object_detector = object_detector or ObjectDetector()
+        # With a scheduler, single-frame YOLO calls are batched fairly with
+        # other sources instead of hitting the shared models directly
+        self.scheduler = scheduler
+        self.source_id = source_id
         self.confidence_threshold = 0.6
         self.custom_model_confidence_threshold = 0.3
 
+        # Concurrent mode runs the three models on a persistent worker pool
+        self._executor = None
+        if concurrent is None:
+            concurrent = _env_flag("CONCURRENT_INFERENCE", False)
+        self.set_concurrent(concurrent)
+
+        # Skip the heavy models on frames that barely changed and carry
+        # the last detections forward instead
+        self.motion_gate = None
+        if _env_flag("MOTION_GATE", True):
+            self.motion_gate = MotionGate(
+                threshold=float(os.getenv("MOTION_THRESHOLD", 8.0)),
+                max_stale_frames=int(os.getenv("MOTION_MAX_STALE_FRAMES", 15)),
+            )
+        self.last_detections = []
+
+        # Trade model input size and pose complexity for speed when frames
+        # take longer than the target frame time
+        self.imgsz = None  # None keeps the models' own input size
+        self.resolution = None
+        if _env_flag("ADAPTIVE_RESOLUTION", False):
+            self.resolution = ResolutionController(
+                target_ms=float(os.getenv("TARGET_FRAME_MS", 100)),
+                ladder=os.getenv("RESOLUTION_LADDER", DEFAULT_LADDER),
+            )
+            self._apply_operating_point(self.resolution.current())
+
+        # Person-ROI mode analyzes the face of every person the general model
+        # finds, instead of the single most prominent face in the frame
+        self.person_roi = _env_flag("PERSON_ROI", False)
+        self.roi_max_people = int(os.getenv("PERSON_ROI_MAX_PEOPLE", 8))
+        self.roi_crop_size = int(os.getenv("PERSON_ROI_CROP_SIZE", 192))
+
+        # Stable per-student ids from the person boxes; in person-ROI mode
+        # only students that moved or are due a refresh are re-analyzed
+        self.tracker = None
+        if _env_flag("TRACKING", True):
+            self.tracker = StudentTracker(
+                max_missed=int(os.getenv("TRACK_MAX_MISSED", 15)),
+                refresh_interval=int(os.getenv("TRACK_REFRESH_FRAMES", 10)),
+            )
+
     def process_frame(self, frame):
         """
         Process a frame and detect potential cheating behaviors
         Returns a list of detections with confidence scores and behavior types
         """
-        detections = []
+        # Conversions and model inputs derived from the frame are computed
+        # once here and shared by the gate and every analyzer
+        context = FrameContext.wrap(frame)
+        if self.motion_gate is not None and not self.motion_gate.should_process(
+            context
+        ):
+            return self._carry_forward()
+
+        started = time.perf_counter()
+        self.last_detections = self._analyze_frame(context)
+        self._record_latency(time.perf_counter() - started)
+        return self._carry_forward()
+
+    def process_frames(self, frames):
+        """
+        Process a list of frames, running both YOLO models once over the batch
+        Returns one list of detections per frame, in the same order as frames
+        """
+        if not frames:
+            return []
+
+        frames = [FrameContext.wrap(frame) for frame in frames]
+        if self.motion_gate is None:
+            active = list(range(len(frames)))
+        else:
+            active = [
+                i
+                for i, frame in enumerate(frames)
+                if self.motion_gate.should_process(frame)
+            ]
+
+        started = time.perf_counter()
+        analyzed = dict(zip(active, self._analyze_frames([frames[i] for i in active])))
+        if active:
+            self._record_latency((time.perf_counter() - started) / len(active))
+
+        # Frames the gate skipped reuse the detections of the last analyzed frame
+        results = []
+        for i in range(len(frames)):
+            if i in analyzed:
+                self.last_detections = analyzed[i]
+            results.append(self._carry_forward())
+        return results
+
+    def reset(self):
+        """
+        Forget all temporal state, so a new video or segment doesn't carry
+        over the previous one's detections, tracks or reference frame
+        """
+        self.last_detections = []
+        self.pose_analyzer.reset()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        if self.tracker is not None:
+            self.tracker.reset()
+
+    def get_motion_stats(self):
+        """Counters for frames skipped by the motion gate"""
+        if self.motion_gate is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.motion_gate.get_stats()}
+
+    def get_resolution_stats(self):
+        """Current operating point of the adaptive resolution controller"""
+        if self.resolution is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.resolution.get_stats()}
+
+    def _record_latency(self, seconds):
+        if self.resolution is None:
+            return
+        point = self.resolution.record(seconds)
+        if point is not None:
+            self._apply_operating_point(point)
+
+    def _apply_operating_point(self, point):
+        self.imgsz = point["imgsz"]
+        self.pose_analyzer.set_model_complexity(point["pose_complexity"])
+
+    def _carry_forward(self):
+        return [dict(detection) for detection in self.last_detections]
+
+    def _analyze_frame(self, frame):
+        """Run all models over a single frame"""
+        if self.person_roi:
+            # Faces are analyzed inside the person boxes, so YOLO goes first
+            if self.scheduler is not None:
+                with timed(MODEL_SECONDS, model="scheduler"):
+                    object_results, cheating_results = self.scheduler.submit(
+                        self.source_id, frame, self.imgsz
+                    ).result()
+            else:
+                object_results, cheating_results = self._run_analyses(
+                    self._timed(
+                        "objects",
+                        lambda: self.object_detector.detect_objects(frame, self.imgsz),
+                    ),
+                    self._timed(
+                        "cheating",
+                        lambda: self.object_detector.detect_cheating(frame, self.imgsz),
+                    ),
+                )
+            with timed(MODEL_SECONDS, model="people"):
+                people_results = self._analyze_people(frame, object_results)
+            return self._finish(people_results, object_results, cheating_results)
+
+        if self.scheduler is not None:
+            pose_results, (object_results, cheating_results) = self._run_analyses(
+                self._timed("pose", lambda: self.pose_analyzer.analyze_pose(frame)),
+                self._timed(
+                    "scheduler",
+                    lambda: self.scheduler.submit(
+                        self.source_id, frame, self.imgsz
+                    ).result(),
+                ),
+            )
+            return self._finish(
+                pose_results, object_results, cheating_results
+            )
 
-        # Get pose analysis
-        pose_results = self.pose_analyzer.analyze_pose(frame)
+        pose_results, object_results, cheating_results = self._run_analyses(
+            # Get pose analysis
+            self._timed("pose", lambda: self.pose_analyzer.analyze_pose(frame)),
+            # Get object detections
+            self._timed(
+                "objects",
+                lambda: self.object_detector.detect_objects(frame, self.imgsz),
+            ),
+            # Get cheating detections from custom model
+            self._timed(
+                "cheating",
+                lambda: self.object_detector.detect_cheating(frame, self.imgsz),
+            ),
+        )
 
-        # Get object detections
-        object_results = self.object_detector.detect_objects(frame)
+        return self._finish(pose_results, object_results, cheating_results)
 
-        # Get cheating detections from custom model
-        cheating_results = self.object_detector.detect_cheating(frame)
+    def _analyze_frames(self, frames):
+        """Run all models over a batch of frames"""
+        if not frames:
+            return []
+
+        if self.person_roi:
+            object_results, cheating_results = self._run_analyses(
+                self._timed(
+                    "objects_batch",
+                    lambda: self.object_detector.detect_objects_batch(
+                        frames, self.imgsz
+                    ),
+                ),
+                self._timed(
+                    "cheating_batch",
+                    lambda: self.object_detector.detect_cheating_batch(
+                        frames, self.imgsz
+                    ),
+                ),
+            )
+            results = []
+            for frame, objects, cheating in zip(
+                frames, object_results, cheating_results
+            ):
+                with timed(MODEL_SECONDS, model="people"):
+                    people_results = self._analyze_people(frame, objects)
+                results.append(self._finish(people_results, objects, cheating))
+            return results
+
+        pose_results, object_results, cheating_results = self._run_analyses(
+            # Pose analysis keeps temporal state, so frames go through it in order
+            self._timed(
+                "pose_batch",
+                lambda: [self.pose_analyzer.analyze_pose(frame) for frame in frames],
+            ),
+            self._timed(
+                "objects_batch",
+                lambda: self.object_detector.detect_objects_batch(frames, self.imgsz),
+            ),
+            self._timed(
+                "cheating_batch",
+                lambda: self.object_detector.detect_cheating_batch(frames, self.imgsz),
+            ),
+        )
+
+        return [
+            self._finish(pose, objects, cheating)
+            for pose, objects, cheating in zip(
+                pose_results, object_results, cheating_results
+            )
+        ]
+
+    def _analyze_people(self, frame, object_results):
+        """Per-person face analysis, reusing it for students who sat still"""
+        if self.tracker is None:
+            return self.pose_analyzer.analyze_people(
+                frame,
+                object_results["people"],
+                max_people=self.roi_max_people,
+                crop_size=self.roi_crop_size,
+            )
+
+        tracks = self.tracker.update(object_results["people"])
+        due = [track for track in tracks if self.tracker.needs_analysis(track)]
+        results = self.pose_analyzer.analyze_people(
+            frame,
+            [
+                {"bbox": t.bbox, "confidence": t.confidence, "track_id": t.id}
+                for t in due
+            ],
+            max_people=self.roi_max_people,
+            crop_size=self.roi_crop_size,
+        )
+        fresh = {person["track_id"]: person for person in results["people"]}
+
+        people = []
+        for track in tracks:
+            if track.id in fresh:
+                self.tracker.record_analysis(track, fresh[track.id])
+                analysis = track.analysis
+            elif track.analysis is not None:
+                analysis = self.tracker.reuse_analysis(track)
+            else:
+                continue  # Over the crop budget and never analyzed yet
+            people.append(
+                {
+                    **analysis,
+                    "bbox": track.bbox,
+                    "confidence": track.confidence,
+                    "track_id": track.id,
+                    "looking_sideways": self.tracker.smoothed_sideways(track),
+                }
+            )
+        results["people"] = people
+        return results
+
+    def _finish(self, pose_results, object_results, cheating_results):
+        """Combine one frame's results and tie detections to tracked students"""
+        if self.tracker is not None and not self.person_roi:
+            self.tracker.update(object_results["people"])
+        detections = self._combine_results(
+            pose_results, object_results, cheating_results
+        )
+        if self.tracker is not None:
+            for detection in detections:
+                if detection.get("track_id") is None and detection.get("bbox"):
+                    detection["track_id"] = self.tracker.assign(detection["bbox"])
+        return detections
+
+    def get_tracking_stats(self):
+        """Tracked students and how many analyses tracking saved"""
+        if self.tracker is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.tracker.get_stats()}
+
+    def set_concurrent(self, enabled):
+        """Switch between sequential and concurrent model execution"""
+        self.concurrent = bool(enabled)
+        if self.concurrent and self._executor is None:
+            # One worker per model so all three can run at the same time
+            self._executor = ThreadPoolExecutor(
+                max_workers=3, thread_name_prefix="detector"
+            )
+
+    def shutdown(self):
+        """Stop the worker pool used by concurrent mode"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.concurrent = False
+
+    def _timed(self, model, analysis):
+        """Wrap an analysis so its duration is recorded per model"""
+
+        def run():
+            with timed(MODEL_SECONDS, model=model):
+                return analysis()
+
+        return run
+
+    def _run_analyses(self, *analyses):
+        """Run the given analyses, in parallel when concurrent mode is on"""
+        if not self.concurrent:
+            return [analysis() for analysis in analyses]
+
+        # The models spend most of their time in native code that releases
+        # the GIL, so frame latency drops to roughly the slowest model
+        futures = [self._executor.submit(analysis) for analysis in analyses]
+        return [future.result() for future in futures]
+
+    def _combine_results(self, pose_results, object_results, cheating_results):
+        """Turn the raw analyzer outputs for one frame into behavior detections"""
+        detections = []
 
         # 1. Check for direct cheating detection from custom model
         for cheating_detection in cheating_results["cheating"]:
@@ -52,7 +393,18 @@ class CheatingDetector:
         #         "details": "Student detected looking sideways",
         #     })
 
-        # 3. Check for looking down suspiciously
+        # 3. Check for looking down suspiciously, per person in person-ROI mode
+        for person in pose_results.get("people", []):
+            if person["looking_down"]:
+                detections.append(
+                    {
+                        "behavior_type": "looking_down_suspicious",
+                        "confidence": person["confidence"],
+                        "bbox": person["bbox"],
+                        "track_id": person.get("track_id"),
+                        "details": "Student detected looking down suspiciously",
+                    }
+                )
         if pose_results.get("looking_down", False):
             detections.append(
                 {
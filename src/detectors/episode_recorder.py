@@ -0,0 +1,100 @@
+import os
+
+
+class EpisodeRecorder:
+    """
+    Persist episodes as they open, grow and close: evidence frame, one
+    database row updated in place, and a live event for each report
+    """
+
+    def __init__(self, evidence_writer, detection_writer, publish=None):
+        self.evidence_writer = evidence_writer
+        # None when detections are only published, e.g. to a batch file
+        self.detection_writer = detection_writer
+        # publish(event_type, data) pushes the detection to dashboards
+        self.publish = publish
+
+    def record(self, episode, source_id=None, start=None):
+        """
+        Store an episode's current state as its one detection; start replaces
+        the episode's own start time, e.g. with the time a video of unknown
+        recording time was processed
+        """
+        start = start or episode.start
+        try:
+            # The frame is only saved again when a new peak replaced it, and
+            # the new file then takes the place of the old one
+            if not episode.evidence_saved:
+                if isinstance(episode.evidence, bytes):
+                    episode.frame_path = self.evidence_writer.save(
+                        jpeg=episode.evidence,
+                        timestamp=start,
+                        replaces=episode.frame_path,
+                    )
+                else:
+                    episode.frame_path = self.evidence_writer.save(
+                        frame=episode.evidence,
+                        timestamp=start,
+                        replaces=episode.frame_path,
+                    )
+                episode.evidence_saved = True
+            detection = {
+                **episode.to_detection(),
+                "state": "closed" if episode.closed else "open",
+                "end_time": start + (episode.end - episode.start),
+            }
+            self.record_detection(start, detection, episode.frame_path, source_id)
+            if episode.closed:
+                print(
+                    f"Stored episode: {episode.behavior_type} over "
+                    f"{episode.frame_count} frames with peak confidence "
+                    f"{episode.peak_confidence}"
+                )
+        except Exception as e:
+            print(f"Error storing episode: {str(e)}")
+
+    def record_detection(self, timestamp, detection, frame_path, source_id=None):
+        """Queue a detection for the database and push it to connected dashboards"""
+        end_time = detection.get("end_time")
+        if self.detection_writer is not None:
+            self.detection_writer.enqueue(
+                timestamp=timestamp,
+                behavior_type=detection["behavior_type"],
+                confidence=detection["confidence"],
+                frame_path=frame_path,
+                details=detection.get("details"),
+                bbox=detection.get("bbox"),
+                end_time=end_time,
+                frame_count=detection.get("frame_count", 1),
+                source_id=source_id,
+                track_id=detection.get("track_id"),
+                frame_index=detection.get("frame_index"),
+                media_time=detection.get("media_time"),
+                episode_id=detection.get("episode_id"),
+            )
+        if self.publish is None:
+            return
+        # Same shape as the rows served by /alerts, minus the id the writer has
+        # yet to get; dashboards match the two on episode_id
+        self.publish(
+            "detection",
+            {
+                "timestamp": timestamp.isoformat(timespec="milliseconds"),
+                "behavior_type": detection["behavior_type"],
+                "confidence": detection["confidence"],
+                "frame_path": os.path.basename(frame_path),
+                "details": detection.get("details"),
+                "bbox": detection.get("bbox"),
+                "end_time": (
+                    end_time.isoformat(timespec="milliseconds") if end_time else None
+                ),
+                "frame_count": detection.get("frame_count", 1),
+                "source_id": source_id,
+                "track_id": detection.get("track_id"),
+                "frame_index": detection.get("frame_index"),
+                "media_time": detection.get("media_time"),
+                "episode_id": detection.get("episode_id"),
+                # Reports of an episode share its id; the last one is closed
+                "state": detection.get("state", "closed"),
+            },
+        )
@@ -0,0 +1,191 @@
+import threading
+import uuid
+
+
+def box_iou(a, b):
+    """Intersection over union of two [x1, y1, x2, y2] boxes"""
+    x1 = max(a[0], b[0])
+    y1 = max(a[1], b[1])
+    x2 = min(a[2], b[2])
+    y2 = min(a[3], b[3])
+    intersection = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    if intersection == 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return intersection / (area_a + area_b - intersection)
+
+
+class Episode:
+    """Consecutive same-type detections merged into one behavior episode"""
+
+    def __init__(self, timestamp, detection, evidence):
+        # Key the episode's one database row is inserted and updated by
+        self.id = uuid.uuid4().hex
+        self.behavior_type = detection["behavior_type"]
+        self.start = timestamp
+        self.end = timestamp
+        self.frame_count = 1
+        self.peak_confidence = detection["confidence"]
+        self.peak_detection = detection
+        # Representative frame (or its encoded bytes) at peak confidence
+        self.evidence = evidence
+        # Set by whoever saves the evidence, which is due again once a new
+        # peak replaces it
+        self.frame_path = None
+        self.evidence_saved = False
+        self.bbox = detection.get("bbox")
+        self.track_id = detection.get("track_id")
+        # Where the episode starts in a recorded video, if it came from one
+        self.frame_index = detection.get("frame_index")
+        self.media_time = detection.get("media_time")
+        # End time the episode was last reported with
+        self.reported_end = None
+        self.closed = False
+
+    def extend(self, timestamp, detection, capture):
+        self.end = timestamp
+        self.frame_count += 1
+        if detection.get("bbox") is not None:
+            self.bbox = detection["bbox"]
+        if detection["confidence"] > self.peak_confidence:
+            self.peak_confidence = detection["confidence"]
+            self.peak_detection = detection
+            self.evidence = capture()
+            self.evidence_saved = False
+
+    def duration(self):
+        return (self.end - self.start).total_seconds()
+
+    def to_detection(self):
+        """Detection dict summarizing the whole episode"""
+        return {
+            "behavior_type": self.behavior_type,
+            "confidence": self.peak_confidence,
+            "bbox": self.peak_detection.get("bbox"),
+            "details": (
+                f"{self.peak_detection.get('details') or self.behavior_type} "
+                f"({self.frame_count} frames over {self.duration():.1f}s)"
+            ),
+            "end_time": self.end,
+            "frame_count": self.frame_count,
+            "track_id": self.track_id,
+            "frame_index": self.frame_index,
+            "media_time": self.media_time,
+            "episode_id": self.id,
+        }
+
+
+class EventAggregator:
+    """
+    Collapse per-frame detections into behavior episodes so that a phone
+    held up for ten seconds is stored once instead of once per frame
+    """
+
+    def __init__(
+        self, max_gap=2.0, iou_threshold=0.3, max_duration=60.0, update_interval=5.0
+    ):
+        # Seconds a behavior may disappear before its episode is closed
+        self.max_gap = max_gap
+        # Minimum box overlap for a detection to continue an episode
+        self.iou_threshold = iou_threshold
+        # Long episodes are closed and persisted at this length, so a
+        # behavior that never stops still shows up periodically
+        self.max_duration = max_duration
+        # Seconds between two reports of an episode that keeps going; 0 only
+        # reports it when it opens and when it closes
+        self.update_interval = update_interval
+
+        self.open_episodes = []
+        self.lock = threading.Lock()
+        self.detections_seen = 0
+        self.episodes_opened = 0
+        self.episodes_closed = 0
+
+    def update(self, timestamp, detections, capture):
+        """
+        Feed one frame's detections; capture() returns the evidence to keep
+        for that frame and is only called when it becomes representative.
+        Returns the episodes to report for this frame: those that opened,
+        those due for an update and those that finished (marked closed),
+        so an ongoing behavior is visible long before it ends.
+        """
+        report = []
+        with self.lock:
+            unmatched = list(self.open_episodes)
+            for detection in detections:
+                self.detections_seen += 1
+                episode = self._match(detection, unmatched)
+                if episode is None:
+                    self.open_episodes.append(Episode(timestamp, detection, capture()))
+                    self.episodes_opened += 1
+                else:
+                    unmatched.remove(episode)
+                    episode.extend(timestamp, detection, capture)
+
+            still_open = []
+            for episode in self.open_episodes:
+                gap = (timestamp - episode.end).total_seconds()
+                if gap > self.max_gap or episode.duration() >= self.max_duration:
+                    episode.closed = True
+                    self.episodes_closed += 1
+                else:
+                    still_open.append(episode)
+                    if not self._report_due(episode):
+                        continue
+                episode.reported_end = episode.end
+                report.append(episode)
+            self.open_episodes = still_open
+        return report
+
+    def flush(self):
+        """Close every open episode, e.g. when a stream or video ends"""
+        with self.lock:
+            finished = self.open_episodes
+            self.open_episodes = []
+            self.episodes_closed += len(finished)
+        for episode in finished:
+            episode.closed = True
+            episode.reported_end = episode.end
+        return finished
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "open_episodes": len(self.open_episodes),
+                "detections_seen": self.detections_seen,
+                "episodes_opened": self.episodes_opened,
+                "episodes_closed": self.episodes_closed,
+            }
+
+    def _report_due(self, episode):
+        """Whether an open episode has news since it was last reported"""
+        if episode.reported_end is None:
+            return True
+        if not self.update_interval or episode.end == episode.reported_end:
+            return False
+        elapsed = (episode.end - episode.reported_end).total_seconds()
+        return elapsed >= self.update_interval
+
+    def _match(self, detection, candidates):
+        """Best open episode this detection continues, if any"""
+        best, best_iou = None, 0.0
+        for episode in candidates:
+            if episode.behavior_type != detection["behavior_type"]:
+                continue
+            track_id = detection.get("track_id")
+            if track_id is not None and episode.track_id is not None:
+                # Tracked students keep separate episodes even when close
+                if track_id == episode.track_id:
+                    return episode
+                continue
+            bbox = detection.get("bbox")
+            if bbox is None and episode.bbox is None:
+                # Frame-level behaviors like looking down have no box
+                return episode
+            if bbox is None or episode.bbox is None:
+                continue
+            iou = box_iou(bbox, episode.bbox)
+            if iou >= self.iou_threshold and iou > best_iou:
+                best, best_iou = episode, iou
+        return best
@@ -0,0 +1,270 @@
+import cv2
+import itertools
+import threading
+import time
+from datetime import datetime
+from src.utils.frame_broadcaster import FrameBroadcaster
+from src.utils.metrics import STAGE_SECONDS, count_error, timed
+
+
+class SourceSession:
+    """
+    One camera or video file being watched: its own capture thread,
+    detector state, episode aggregation and stream
+    """
+
+    def __init__(
+        self,
+        session_id,
+        source,
+        detector,
+        episodes,
+        annotate,
+        on_episode,
+        name=None,
+        evidence_threshold=0.6,
+        idle_timeout=None,
+        realtime=True,
+        frame_size=(640, 480),
+    ):
+        self.id = session_id
+        # Camera index, list of indices to try in order, or a file path/URL
+        self.source = source
+        self.name = name or str(source)
+        self.detector = detector
+        self.episodes = episodes
+        # annotate(frame, detections) -> JPEG bytes to stream
+        self.annotate = annotate
+        # on_episode(session, episode) stores an episode as it opens, grows or
+        # closes
+        self.on_episode = on_episode
+        self.evidence_threshold = evidence_threshold
+        # Stop automatically once nobody has watched for this many seconds
+        self.idle_timeout = idle_timeout
+        # Play files at their own frame rate rather than as fast as possible
+        self.realtime = realtime
+        self.frame_size = frame_size
+
+        self.feed = FrameBroadcaster()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.status = "created"
+        self.frames_processed = 0
+        self.started_at = None
+
+    def start(self):
+        self.stop_event.clear()
+        self.feed.reopen()
+        self.status = "starting"
+        self.started_at = datetime.now()
+        self.thread = threading.Thread(
+            target=self._run, name=f"source-{self.id}", daemon=True
+        )
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "source": self.source,
+            "status": self.status,
+            "running": self.is_running(),
+            "frames_processed": self.frames_processed,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "stream": self.feed.get_stats(),
+            "episodes": self.episodes.get_stats(),
+            "motion_gate": self.detector.get_motion_stats(),
+            "resolution": self.detector.get_resolution_stats(),
+            "tracking": self.detector.get_tracking_stats(),
+        }
+
+    def _open(self):
+        candidates = self.source if isinstance(self.source, list) else [self.source]
+        for candidate in candidates:
+            try:
+                cap = cv2.VideoCapture(candidate)
+                if cap is not None and cap.isOpened():
+                    if isinstance(candidate, int):
+                        # Set resolution to standard dimensions
+                        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_size[0])
+                        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_size[1])
+                    print(f"Source {self.id}: opened {candidate}")
+                    return cap
+            except Exception as e:
+                print(f"Source {self.id}: error opening {candidate}: {str(e)}")
+        return None
+
+    def _idle_expired(self, idle_since):
+        if self.idle_timeout is None:
+            return False, None
+        if self.feed.viewer_count() > 0:
+            return False, None
+        if idle_since is None:
+            return False, time.monotonic()
+        return time.monotonic() - idle_since > self.idle_timeout, idle_since
+
+    def _run(self):
+        cap = self._open()
+        if cap is None:
+            self.status = "error: could not open source"
+            self.feed.close()
+            self.detector.shutdown()
+            return
+
+        is_file = not isinstance(self.source, (int, list))
+        frame_interval = 0.0
+        if is_file and self.realtime:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+
+        self.status = "running"
+        idle_since = None
+        try:
+            while not self.stop_event.is_set():
+                expired, idle_since = self._idle_expired(idle_since)
+                if expired:
+                    self.status = "idle"
+                    break
+
+                started = time.monotonic()
+                with timed(STAGE_SECONDS, stage="capture"):
+                    success, frame = cap.read()
+                if not success:
+                    if is_file:
+                        self.status = "finished"
+                    else:
+                        self.status = "error: could not read frame"
+                    break
+
+                try:
+                    # Ensure frame dimensions are consistent
+                    frame = cv2.resize(frame, self.frame_size)
+                    with timed(STAGE_SECONDS, stage="detect"):
+                        detections = self.detector.process_frame(frame)
+
+                    jpeg = self.annotate(frame, detections)
+                    if jpeg is None:
+                        continue
+                    self.feed.publish(jpeg)
+
+                    threshold = self.evidence_threshold
+                    evidence = [d for d in detections if d["confidence"] > threshold]
+                    for episode in self.episodes.update(
+                        datetime.now(), evidence, lambda: jpeg
+                    ):
+                        self.on_episode(self, episode)
+                    self.frames_processed += 1
+                except Exception as e:
+                    count_error("source")
+                    print(f"Source {self.id}: error processing frame: {str(e)}")
+                    continue
+
+                if frame_interval:
+                    remaining = frame_interval - (time.monotonic() - started)
+                    if remaining > 0:
+                        self.stop_event.wait(remaining)
+            else:
+                self.status = "stopped"
+        except Exception as e:
+            count_error("source")
+            self.status = f"error: {str(e)}"
+        finally:
+            self.feed.close()
+            for episode in self.episodes.flush():
+                self.on_episode(self, episode)
+            cap.release()
+            # Done here rather than in stop(), which may give up waiting while
+            # a frame is still using the detector's worker pool
+            self.detector.shutdown()
+
+
+class SessionManager:
+    """Registry of watched sources, sharing the heavy models between them"""
+
+    def __init__(self, make_detector, make_episodes, annotate, on_episode, **defaults):
+        # make_detector(session_id) builds a detector with its own temporal
+        # state on top of the shared models
+        self.make_detector = make_detector
+        self.make_episodes = make_episodes
+        self.annotate = annotate
+        self.on_episode = on_episode
+        self.defaults = defaults
+
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def add_source(self, source, name=None, session_id=None, **options):
+        """Register a source and start watching it"""
+        with self.lock:
+            if session_id is None:
+                session_id = f"source-{next(self.ids)}"
+            if session_id in self.sessions:
+                raise ValueError(f"Source {session_id} already exists")
+
+            session = SourceSession(
+                session_id,
+                source,
+                self.make_detector(session_id),
+                self.make_episodes(),
+                self.annotate,
+                self.on_episode,
+                name=name,
+                **{**self.defaults, **options},
+            )
+            self.sessions[session_id] = session
+        session.start()
+        return session
+
+    def ensure_source(self, session_id, source, **options):
+        """Return the running session with this id, (re)starting it if needed"""
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is not None and session.is_running():
+                if not session.feed.closed:
+                    return session
+            stale = self.sessions.pop(session_id, None)
+
+        if stale is not None:
+            # Let the old capture thread release the device first
+            stale.stop()
+        try:
+            return self.add_source(source, session_id=session_id, **options)
+        except ValueError:
+            # Another viewer started it in the meantime
+            return self.get(session_id)
+
+    def get(self, session_id):
+        with self.lock:
+            return self.sessions.get(session_id)
+
+    def list(self):
+        with self.lock:
+            return list(self.sessions.values())
+
+    def remove(self, session_id):
+        """Stop watching a source and forget it"""
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.stop()
+        return session
+
+    def stop(self, session_id):
+        """Stop a source but keep it registered so its status stays visible"""
+        session = self.get(session_id)
+        if session is not None:
+            session.stop()
+        return session
+
+    def shutdown(self):
+        for session in self.list():
+            session.stop()
@@ -0,0 +1,212 @@
+import itertools
+import threading
+from collections import deque
+import numpy as np
+from src.detectors.event_aggregator import box_iou
+
+
+def _to_measurement(bbox):
+    x1, y1, x2, y2 = bbox
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1], dtype=float)
+
+
+def _to_bbox(state):
+    cx, cy, w, h = state[:4]
+    w, h = max(w, 1.0), max(h, 1.0)
+    return [float(cx - w / 2), float(cy - h / 2), float(cx + w / 2), float(cy + h / 2)]
+
+
+class Track:
+    """
+    One student followed across frames with a constant-velocity Kalman
+    filter over the box center and size
+    """
+
+    # State is (cx, cy, w, h) and their velocities; we observe the first four
+    TRANSITION = np.eye(8) + np.eye(8, k=4)
+    OBSERVATION = np.eye(4, 8)
+
+    def __init__(self, track_id, detection, window=5):
+        self.id = track_id
+        self.state = np.concatenate([_to_measurement(detection["bbox"]), np.zeros(4)])
+        scale = max(self.state[2], self.state[3])
+        # Position is known from the first box, velocity is not
+        self.covariance = np.diag([scale, scale, scale, scale, 1e3, 1e3, 1e3, 1e3])
+        self.bbox = list(detection["bbox"])
+        self.confidence = detection["confidence"]
+        self.hits = 1
+        self.missed = 0
+        self.age = 1
+
+        # Per-student analysis state, refreshed on a schedule
+        self.analysis = None
+        self.analyzed_bbox = None
+        self.frames_since_analysis = 0
+        self.sideways_window = deque(maxlen=window)
+
+    def predict(self):
+        noise = max(self.state[2], self.state[3]) * 0.05
+        self.state = self.TRANSITION @ self.state
+        self.covariance = (
+            self.TRANSITION @ self.covariance @ self.TRANSITION.T
+            + np.eye(8) * noise
+        )
+        self.bbox = _to_bbox(self.state)
+        self.age += 1
+        self.frames_since_analysis += 1
+        return self.bbox
+
+    def correct(self, detection):
+        noise = max(self.state[2], self.state[3]) * 0.1
+        innovation = _to_measurement(detection["bbox"]) - self.OBSERVATION @ self.state
+        innovation_cov = (
+            self.OBSERVATION @ self.covariance @ self.OBSERVATION.T + np.eye(4) * noise
+        )
+        gain = self.covariance @ self.OBSERVATION.T @ np.linalg.inv(innovation_cov)
+        self.state = self.state + gain @ innovation
+        self.covariance = (np.eye(8) - gain @ self.OBSERVATION) @ self.covariance
+        self.bbox = _to_bbox(self.state)
+        self.confidence = detection["confidence"]
+        self.hits += 1
+        self.missed = 0
+
+    def to_dict(self):
+        return {
+            "track_id": self.id,
+            "bbox": self.bbox,
+            "confidence": self.confidence,
+            "hits": self.hits,
+            "missed": self.missed,
+        }
+
+
+class StudentTracker:
+    """
+    Give each student a stable id from the YOLO person boxes, and decide
+    which students need their expensive per-person analysis re-run
+    """
+
+    def __init__(
+        self,
+        iou_threshold=0.3,
+        max_missed=15,
+        refresh_interval=10,
+        stable_iou=0.85,
+        window=5,
+    ):
+        # Minimum overlap between a predicted track and a new person box
+        self.iou_threshold = iou_threshold
+        # Frames a student may go undetected before the track is dropped
+        self.max_missed = max_missed
+        # Analyses are re-run at least this often, even for a still student
+        self.refresh_interval = refresh_interval
+        # A student whose box still overlaps the analyzed box this much has
+        # not moved enough to need a new analysis
+        self.stable_iou = stable_iou
+        self.window = window
+
+        self.tracks = []
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.analyses_run = 0
+        self.analyses_reused = 0
+
+    def update(self, people):
+        """
+        Match this frame's person detections to the tracks and return the
+        tracks seen in this frame
+        """
+        with self.lock:
+            for track in self.tracks:
+                track.predict()
+
+            # Greedy matching by overlap, best pairs first
+            pairs = sorted(
+                (
+                    (box_iou(track.bbox, person["bbox"]), t, p)
+                    for t, track in enumerate(self.tracks)
+                    for p, person in enumerate(people)
+                ),
+                key=lambda pair: pair[0],
+                reverse=True,
+            )
+            matched_tracks, matched_people = set(), set()
+            for iou, t, p in pairs:
+                if iou < self.iou_threshold:
+                    break
+                if t in matched_tracks or p in matched_people:
+                    continue
+                self.tracks[t].correct(people[p])
+                matched_tracks.add(t)
+                matched_people.add(p)
+
+            for t, track in enumerate(self.tracks):
+                if t not in matched_tracks:
+                    track.missed += 1
+            self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+            seen = [self.tracks[t] for t in sorted(matched_tracks)]
+            for p, person in enumerate(people):
+                if p not in matched_people:
+                    track = Track(next(self.ids), person, self.window)
+                    self.tracks.append(track)
+                    seen.append(track)
+            return seen
+
+    def reset(self):
+        """Drop every track, e.g. before an unrelated video"""
+        with self.lock:
+            self.tracks = []
+
+    def needs_analysis(self, track):
+        """True for new, moving or long-unrefreshed students"""
+        if track.analysis is None or track.analyzed_bbox is None:
+            return True
+        if track.frames_since_analysis >= self.refresh_interval:
+            return True
+        return box_iou(track.bbox, track.analyzed_bbox) < self.stable_iou
+
+    def record_analysis(self, track, analysis):
+        """Keep a fresh per-student analysis and smooth it over time"""
+        track.sideways_window.append(bool(analysis.get("looking_sideways")))
+        track.analysis = dict(analysis)
+        track.analyzed_bbox = list(track.bbox)
+        track.frames_since_analysis = 0
+        self.analyses_run += 1
+
+    def reuse_analysis(self, track):
+        self.analyses_reused += 1
+        return track.analysis
+
+    def smoothed_sideways(self, track, threshold=0.7):
+        """Majority vote over the student's recent analyses"""
+        window = track.sideways_window
+        return bool(window) and sum(window) / len(window) > threshold
+
+    def assign(self, bbox):
+        """
+        Track id of the student a detection box belongs to: the person box
+        containing its center, preferring the largest overlap
+        """
+        cx, cy = (bbox[0] + bbox[2]) / 2, (bbox[1] + bbox[3]) / 2
+        best, best_score = None, -1.0
+        with self.lock:
+            for track in self.tracks:
+                if track.missed:
+                    continue
+                x1, y1, x2, y2 = track.bbox
+                if not (x1 <= cx <= x2 and y1 <= cy <= y2):
+                    continue
+                score = box_iou(bbox, track.bbox)
+                if score > best_score:
+                    best, best_score = track.id, score
+        return best
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "tracks": [t.to_dict() for t in self.tracks if not t.missed],
+                "lost_tracks": sum(1 for t in self.tracks if t.missed),
+                "analyses_run": self.analyses_run,
+                "analyses_reused": self.analyses_reused,
+            }
@@ -0,0 +1,370 @@
+"""
+Analyze a whole exam session's recordings without the web app, spreading
+videos, or segments of one long video, over worker processes
+
+    python -m src.jobs.batch recordings/ --workers 4
+    python -m src.jobs.batch "recordings/*.mp4" --output detections.jsonl
+    python -m src.jobs.batch exam.mp4 --workers 8 --segments 8
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from src.jobs.job_manager import JobManager
+from src.jobs.segments import merge_segments, plan_segments, recording_start
+from src.jobs.video_job import episode_max_gap, process_video_job
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+CSV_FIELDS = [
+    "video",
+    "timestamp",
+    "behavior_type",
+    "confidence",
+    "frame_path",
+    "details",
+    "bbox",
+    "end_time",
+    "frame_count",
+    "track_id",
+    "frame_index",
+    "media_time",
+    "episode_id",
+]
+
+
+def find_videos(inputs):
+    """Video files from directories, glob patterns and plain paths, in order"""
+    videos = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths = sorted(
+                os.path.join(item, name)
+                for name in os.listdir(item)
+                if name.lower().endswith(VIDEO_EXTENSIONS)
+            )
+        else:
+            paths = sorted(glob.glob(item))
+        for path in paths:
+            if os.path.isfile(path) and path not in videos:
+                videos.append(path)
+    return videos
+
+
+class DetectionFile:
+    """
+    Detections from every worker written by the parent process, as JSON
+    lines or, for a .csv path, as CSV rows
+    """
+
+    def __init__(self, path):
+        self.is_csv = path.lower().endswith(".csv")
+        self.file = open(path, "w", newline="")
+        self.lock = threading.Lock()
+        self.rows = 0
+        self.writer = None
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, CSV_FIELDS, extrasaction="ignore")
+            self.writer.writeheader()
+
+    def write(self, video, detections):
+        with self.lock:
+            for detection in detections:
+                row = {"video": video, **detection}
+                if self.is_csv:
+                    if row.get("bbox") is not None:
+                        row["bbox"] = json.dumps(row["bbox"])
+                    self.writer.writerow(row)
+                else:
+                    self.file.write(json.dumps(row) + "\n")
+                self.rows += 1
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+    def describe(self):
+        return f"{self.rows} detections written to {self.file.name}"
+
+
+class DetectionDatabase:
+    """Detections stored by the parent process, one transaction per video"""
+
+    def __init__(self, frames_dir):
+        from src.database.db_manager import DBManager
+
+        self.db_manager = DBManager()
+        self.frames_dir = frames_dir
+        self.rows = 0
+
+    def write(self, video, detections):
+        rows = [
+            {
+                **detection,
+                "timestamp": datetime.fromisoformat(detection["timestamp"]),
+                "end_time": (
+                    datetime.fromisoformat(detection["end_time"])
+                    if detection.get("end_time")
+                    else None
+                ),
+                # Events only carry the evidence file's name
+                "frame_path": os.path.join(self.frames_dir, detection["frame_path"]),
+            }
+            for detection in detections
+        ]
+        try:
+            self.db_manager.store_detections(rows)
+            self.rows += len(rows)
+        except Exception as e:
+            print(f"Error storing detections of {video}: {str(e)}")
+
+    def close(self):
+        self.db_manager.close()
+
+    def describe(self):
+        return f"{self.rows} detections stored in the database"
+
+
+class BatchRun:
+    """
+    Follows the batch's jobs, prints their progress and writes each
+    video's detections, its segments merged in order, once it is done
+    """
+
+    def __init__(self, total, output, segment_counts, max_gap, iou_threshold):
+        self.total = total
+        self.output = output
+        # Segments each video was split into, by name
+        self.segment_counts = segment_counts
+        self.max_gap = max_gap
+        self.iou_threshold = iou_threshold
+        # Percentage points between two progress lines of the same job
+        self.progress_step = 10
+        self.jobs = {}
+        self.printed = {}
+        # Detections of each video, by name, then by segment and episode;
+        # an episode's later reports replace its earlier ones
+        self.detections = {}
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def handle_event(self, job, event_type, data):
+        if event_type == "publish":
+            kind, payload = data
+            if kind == "detection":
+                with self.lock:
+                    segments = self.detections.setdefault(job["name"], {})
+                    episodes = segments.setdefault(job["segment"], {})
+                    episodes[payload.get("episode_id") or len(episodes)] = payload
+            return
+        if event_type != "status":
+            return
+
+        with self.lock:
+            self.jobs[job["id"]] = job
+            done = sum(
+                1
+                for j in self.jobs.values()
+                if j["status"] in JobManager.TERMINAL_STATES
+            )
+            if job["status"] == "running":
+                step = job["progress"] // self.progress_step * self.progress_step
+                if step <= self.printed.get(job["id"], -1):
+                    return
+                self.printed[job["id"]] = step
+                print(
+                    f"[{done}/{self.total}] {job['label']}: {job['progress']}% "
+                    f"({job['processed_frames']}/{job['total_frames']} frames)"
+                )
+                return
+            if job["status"] not in JobManager.TERMINAL_STATES:
+                return
+            detail = job["error"] if job["status"] == "failed" else ""
+            print(f"[{done}/{self.total}] {job['label']}: {job['status']} {detail}")
+            video_done = all(
+                j["status"] in JobManager.TERMINAL_STATES
+                for j in self.jobs.values()
+                if j["name"] == job["name"]
+            )
+            seen = sum(1 for j in self.jobs.values() if j["name"] == job["name"])
+            if video_done and seen == self.segment_counts[job["name"]]:
+                segments = self.detections.pop(job["name"], {})
+            else:
+                segments = None
+            if done == self.total:
+                self.finished.set()
+
+        if segments is not None:
+            self._write(job["name"], segments)
+
+    def _write(self, video, segments):
+        detections = merge_segments(
+            [
+                list(segments.get(i, {}).values())
+                for i in range(self.segment_counts[video])
+            ],
+            self.max_gap,
+            self.iou_threshold,
+        )
+        self.output.write(video, detections)
+
+    def wait(self):
+        # Short waits keep Ctrl+C responsive
+        while not self.finished.wait(1.0):
+            pass
+
+    def print_summary(self, elapsed):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        total_frames = 0
+        print(f"{'video':<40} {'status':<10} {'frames':>8} {'sec':>8} {'fps':>8} eps")
+        for job in jobs:
+            summary = job["summary"] or {}
+            frames = summary.get("frames_processed", job["processed_frames"])
+            total_frames += frames
+            print(
+                f"{job['label'][-40:]:<40} {job['status']:<10} {frames:>8} "
+                f"{summary.get('elapsed_seconds', 0):>8} {summary.get('fps', 0):>8} "
+                f"{summary.get('episodes', 0)}"
+            )
+        fps = total_frames / elapsed if elapsed > 0 else 0.0
+        print(
+            f"{len(jobs)} videos, {total_frames} frames in {elapsed:.1f}s "
+            f"({fps:.1f} fps across all workers)"
+        )
+        print(self.output.describe())
+
+    def failed(self):
+        with self.lock:
+            return [j for j in self.jobs.values() if j["status"] != "completed"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "inputs", nargs="+", help="Video files, directories or glob patterns"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes, each with its own models (default: all cores)",
+    )
+    parser.add_argument(
+        "--output",
+        help="Write detections to this .jsonl or .csv file instead of the database",
+    )
+    parser.add_argument(
+        "--frames-dir", help="Directory for evidence frames (default: SAVE_FRAMES_DIR)"
+    )
+    parser.add_argument(
+        "--analysis-fps",
+        type=float,
+        help="Frames analyzed per second of video (default: UPLOAD_ANALYSIS_FPS)",
+    )
+    parser.add_argument(
+        "--segments",
+        type=int,
+        default=1,
+        help="Split each video into up to this many segments analyzed in parallel",
+    )
+    parser.add_argument(
+        "--min-segment-seconds",
+        type=float,
+        default=60.0,
+        help="Shortest segment worth its own worker",
+    )
+    args = parser.parse_args(argv)
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("No video files found")
+        return 1
+
+    # One job per segment; all segments of a video share the time of its
+    # first frame so their timestamps line up when merged
+    tasks = []
+    segment_counts = {}
+    for path in videos:
+        segments = plan_segments(path, args.segments, args.min_segment_seconds)
+        segment_counts[path] = len(segments)
+        base_time = recording_start(path).isoformat()
+        for index, (start_frame, end_frame) in enumerate(segments):
+            label = path
+            if len(segments) > 1:
+                label = f"{path} [{index + 1}/{len(segments)}]"
+            tasks.append(
+                {
+                    "video_path": os.path.abspath(path),
+                    "name": path,
+                    "label": label,
+                    "segment": index,
+                    "start_frame": start_frame,
+                    "end_frame": end_frame,
+                    "base_time": base_time,
+                    "source_id": os.path.basename(path)[:64],
+                    "store_detections": False,
+                    "keep_video": True,
+                    "preview": False,
+                }
+            )
+    workers = max(1, min(args.workers, len(tasks)))
+
+    # Workers inherit the environment; each model runtime gets its share of
+    # the cores instead of every process claiming all of them
+    os.environ.setdefault(
+        "INFERENCE_INTRA_THREADS", str(max(1, (os.cpu_count() or 1) // workers))
+    )
+    if args.frames_dir:
+        os.environ["SAVE_FRAMES_DIR"] = args.frames_dir
+    if args.analysis_fps is not None:
+        os.environ["UPLOAD_ANALYSIS_FPS"] = str(args.analysis_fps)
+    analysis_fps = float(os.getenv("UPLOAD_ANALYSIS_FPS", 0))
+    frames_dir = os.getenv("SAVE_FRAMES_DIR", "detected_frames")
+
+    # Workers only report detections; the parent writes them once each
+    # video's segments are merged
+    if args.output:
+        output = DetectionFile(args.output)
+    else:
+        output = DetectionDatabase(frames_dir)
+    run = BatchRun(
+        len(tasks),
+        output,
+        segment_counts,
+        # The gap the workers closed episodes with, widened for sampling
+        max_gap=episode_max_gap(analysis_fps),
+        iou_threshold=float(os.getenv("EPISODE_IOU_THRESHOLD", 0.3)),
+    )
+    print(
+        f"Analyzing {len(videos)} videos as {len(tasks)} jobs "
+        f"on {workers} worker processes"
+    )
+    started = time.perf_counter()
+    manager = JobManager(
+        process_video_job,
+        workers=workers,
+        max_pending=len(tasks),
+        on_event=run.handle_event,
+    )
+    try:
+        for task in tasks:
+            manager.submit(task)
+        run.wait()
+    except KeyboardInterrupt:
+        print("Interrupted, stopping the workers")
+    finally:
+        manager.shutdown()
+        output.close()
+
+    run.print_summary(time.perf_counter() - started)
+    return 1 if run.failed() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import traceback
+import uuid
+from datetime import datetime
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+class JobReporter:
+    """Worker-side handle a job uses to talk back to the web process"""
+
+    def __init__(self, job_id, events, cancelled):
+        self.job_id = job_id
+        self.events = events
+        self.cancelled_jobs = cancelled
+
+    def progress(self, processed, total, stages=None, resolution=None):
+        self.events.put(
+            (self.job_id, "progress", (processed, total, stages or [], resolution))
+        )
+
+    def publish(self, event_type, data):
+        self.events.put((self.job_id, "publish", (event_type, data)))
+
+    def frame(self, jpeg):
+        self.events.put((self.job_id, "frame", jpeg))
+
+    def cancelled(self):
+        return bool(self.cancelled_jobs.get(self.job_id, False))
+
+
+def _worker_main(target, tasks, events, cancelled, assigned):
+    """Loop run by each worker process: take a job, run it, report back"""
+    while True:
+        job = tasks.get()
+        if job is None:
+            break
+
+        job_id = job["job_id"]
+        if cancelled.get(job_id):
+            events.put((job_id, "cancelled", None))
+            continue
+
+        # Written through before the job runs, unlike queued events that a
+        # crashing process may never get to send
+        assigned[os.getpid()] = job_id
+        events.put((job_id, "started", os.getpid()))
+        reporter = JobReporter(job_id, events, cancelled)
+        try:
+            summary = target(job, reporter)
+            status = "cancelled" if reporter.cancelled() else "completed"
+            events.put((job_id, status, summary))
+        except Exception as e:
+            traceback.print_exc()
+            events.put((job_id, "failed", str(e)))
+        assigned.pop(os.getpid(), None)
+
+
+class JobManager:
+    """
+    Run jobs on a pool of worker processes so several uploads are
+    processed at once on separate cores, each with its own progress
+    """
+
+    TERMINAL_STATES = ("completed", "failed", "cancelled")
+
+    def __init__(
+        self, target, workers=2, max_pending=20, max_finished=None, on_event=None
+    ):
+        # target(job, reporter) runs in a worker and returns a summary; it
+        # must be importable from a fresh process
+        self.target = target
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        # Finished jobs kept for status queries; None keeps them all
+        self.max_finished = max_finished
+        # on_event(job, event_type, data) lets the web process react, e.g.
+        # relaying detections and preview frames to viewers
+        self.on_event = on_event
+
+        self.context = mp.get_context("spawn")
+        self.tasks = self.context.Queue()
+        self.events = self.context.Queue()
+        self.sync_manager = self.context.Manager()
+        self.cancelled = self.sync_manager.dict()
+        # Job each worker process is running, by pid
+        self.assigned = self.sync_manager.dict()
+
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.running = True
+
+        self.processes = []
+        for _ in range(self.workers):
+            self._start_worker()
+
+        self.listener = threading.Thread(
+            target=self._listen, name="job-events", daemon=True
+        )
+        self.listener.start()
+
+    def submit(self, payload):
+        """Queue a job; raises JobQueueFull if max_pending jobs are waiting"""
+        with self.lock:
+            pending = sum(1 for job in self.jobs.values() if job["status"] == "queued")
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"{pending} jobs are already waiting")
+
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                "id": job_id,
+                "status": "queued",
+                "progress": 0,
+                "processed_frames": 0,
+                "total_frames": 0,
+                "stages": [],
+                # The worker detector's adaptive resolution state
+                "resolution": None,
+                "submitted_at": datetime.now().isoformat(),
+                "started_at": None,
+                "finished_at": None,
+                "worker_pid": None,
+                "summary": None,
+                "error": None,
+                **{k: v for k, v in payload.items() if k != "video_path"},
+            }
+            self.jobs[job_id] = job
+        self.tasks.put({"job_id": job_id, **payload})
+        self._notify(job, "status", None)
+        return dict(job)
+
+    def cancel(self, job_id):
+        """Ask a queued or running job to stop; returns False if it is unknown"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return False
+            if job["status"] in self.TERMINAL_STATES:
+                return True
+            job["cancel_requested"] = True
+        self.cancelled[job_id] = True
+        return True
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def list(self):
+        with self.lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def get_stats(self):
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {
+            "workers": self.workers,
+            "workers_alive": sum(1 for p in self.processes if p.is_alive()),
+            "max_pending": self.max_pending,
+            "jobs": counts,
+        }
+
+    def shutdown(self):
+        self.running = False
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+        self.sync_manager.shutdown()
+
+    def _start_worker(self):
+        process = self.context.Process(
+            target=_worker_main,
+            args=(
+                self.target,
+                self.tasks,
+                self.events,
+                self.cancelled,
+                self.assigned,
+            ),
+            daemon=True,
+        )
+        process.start()
+        self.processes.append(process)
+        return process
+
+    def _notify(self, job, event_type, data):
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(dict(job), event_type, data)
+        except Exception as e:
+            print(f"Error handling job event {event_type}: {str(e)}")
+
+    def _listen(self):
+        while self.running:
+            try:
+                job_id, event_type, data = self.events.get(timeout=1)
+            except queue.Empty:
+                self._check_workers()
+                continue
+
+            with self.lock:
+                job = self.jobs.get(job_id)
+                if job is None:
+                    continue
+                self._apply(job, event_type, data)
+                snapshot = dict(job)
+
+            if event_type in ("publish", "frame"):
+                self._notify(snapshot, event_type, data)
+            else:
+                self._notify(snapshot, "status", None)
+
+    def _apply(self, job, event_type, data):
+        if event_type == "started":
+            job["status"] = "running"
+            job["worker_pid"] = data
+            job["started_at"] = datetime.now().isoformat()
+        elif event_type == "progress":
+            processed, total, stages, resolution = data
+            job["processed_frames"] = processed
+            job["total_frames"] = total
+            job["progress"] = int(processed / total * 100) if total else 0
+            job["stages"] = stages
+            job["resolution"] = resolution
+        elif event_type in self.TERMINAL_STATES:
+            job["status"] = event_type
+            job["finished_at"] = datetime.now().isoformat()
+            if event_type == "failed":
+                job["error"] = data
+            else:
+                job["summary"] = data
+            if event_type == "completed":
+                job["progress"] = 100
+            self.cancelled.pop(job["id"], None)
+            self._prune_finished()
+
+    def _prune_finished(self):
+        """Forget the oldest finished jobs beyond max_finished; lock held"""
+        if self.max_finished is None:
+            return
+        finished = [
+            job_id
+            for job_id, job in self.jobs.items()
+            if job["status"] in self.TERMINAL_STATES
+        ]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def _check_workers(self):
+        """Fail the jobs of crashed workers and replace those processes"""
+        for process in list(self.processes):
+            if process.is_alive() or not self.running:
+                continue
+            self.processes.remove(process)
+            assigned = self.assigned.pop(process.pid, None)
+            failed = []
+            with self.lock:
+                for job in self.jobs.values():
+                    if job["status"] in self.TERMINAL_STATES:
+                        continue
+                    if job["id"] == assigned or job["worker_pid"] == process.pid:
+                        job["status"] = "failed"
+                        job["error"] = f"Worker exited with code {process.exitcode}"
+                        job["finished_at"] = datetime.now().isoformat()
+                        failed.append(dict(job))
+                self._prune_finished()
+            for job in failed:
+                self._notify(job, "status", None)
+            self._start_worker()
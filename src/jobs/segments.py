@@ -0,0 +1,108 @@
+import os
+from datetime import datetime, timedelta
+import cv2
+from src.detectors.event_aggregator import box_iou
+
+
+def plan_segments(video_path, segments, min_seconds=60.0):
+    """
+    Split a video into up to `segments` consecutive (start_frame, end_frame)
+    ranges of at least min_seconds each; the last range runs to the end
+    of the file, whatever its reported frame count
+    """
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    cap.release()
+    if total <= 0 or fps <= 0 or segments <= 1:
+        return [(0, None)]
+
+    count = max(1, min(segments, int(total / fps // max(min_seconds, 1.0))))
+    bounds = [round(i * total / count) for i in range(count)] + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def recording_start(video_path):
+    """
+    Best guess of when a recording started: its file is last written when
+    the recording stops, so its modification time minus its duration
+    """
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    cap.release()
+    end = datetime.fromtimestamp(os.path.getmtime(video_path))
+    if total <= 0 or fps <= 0:
+        return end
+    return end - timedelta(seconds=total / fps)
+
+
+def _merge_pair(first, second):
+    """One episode from the two halves a segment boundary cut it into"""
+    peak = first if first["confidence"] >= second["confidence"] else second
+    frame_count = first["frame_count"] + second["frame_count"]
+    duration = (
+        datetime.fromisoformat(second["end_time"])
+        - datetime.fromisoformat(first["timestamp"])
+    ).total_seconds()
+    # Episode details end in "(N frames over Xs)", which no longer holds
+    label = (peak.get("details") or peak["behavior_type"]).rsplit(" (", 1)[0]
+    return {
+        **peak,
+        "timestamp": first["timestamp"],
+        "end_time": second["end_time"],
+        "frame_count": frame_count,
+        "details": f"{label} ({frame_count} frames over {duration:.1f}s)",
+        "frame_index": first.get("frame_index"),
+        "media_time": first.get("media_time"),
+        "track_id": first.get("track_id"),
+        "episode_id": first.get("episode_id"),
+    }
+
+
+def merge_segments(segment_detections, max_gap=2.0, iou_threshold=0.3):
+    """
+    Join the episode detections of a video's segments, given in segment
+    order, into one list ordered by time. An episode still running when
+    one segment ended is merged with the matching episode that opened the
+    next segment, since each worker had to close it at its boundary.
+    """
+    merged = []
+    previous = []
+    for detections in segment_detections:
+        detections = sorted(detections, key=lambda d: d["timestamp"])
+        current = []
+        unmatched = list(previous)
+        for detection in detections:
+            match = _boundary_match(detection, unmatched, max_gap, iou_threshold)
+            if match is None:
+                current.append(detection)
+                continue
+            unmatched.remove(match)
+            merged.remove(match)
+            current.append(_merge_pair(match, detection))
+        merged.extend(current)
+        previous = current
+    return sorted(merged, key=lambda d: d["timestamp"])
+
+
+def _boundary_match(detection, candidates, max_gap, iou_threshold):
+    """Episode of the previous segment this detection continues, if any"""
+    start = datetime.fromisoformat(detection["timestamp"])
+    best, best_iou = None, -1.0
+    for candidate in candidates:
+        if candidate["behavior_type"] != detection["behavior_type"]:
+            continue
+        gap = (start - datetime.fromisoformat(candidate["end_time"])).total_seconds()
+        if not 0 <= gap <= max_gap:
+            continue
+        # Track ids are only meaningful within a segment, so match by box
+        if candidate.get("bbox") is None or detection.get("bbox") is None:
+            iou = 0.0
+        else:
+            iou = box_iou(candidate["bbox"], detection["bbox"])
+            if iou < iou_threshold:
+                continue
+        if iou > best_iou:
+            best, best_iou = candidate, iou
+    return best
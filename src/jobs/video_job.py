@@ -0,0 +1,205 @@
+import os
+import time
+from datetime import datetime, timedelta
+from src.detectors.cheating_detector import CheatingDetector
+from src.detectors.episode_recorder import EpisodeRecorder
+from src.detectors.event_aggregator import EventAggregator
+from src.database.db_manager import DBManager
+from src.database.detection_writer import DetectionWriter
+from src.utils.drawing import annotate_frame
+from src.utils.evidence_writer import EvidenceWriter
+from src.utils.video_pipeline import VideoPipeline
+
+# Models and writers are loaded once per worker process and reused by
+# every job that process runs
+_context = None
+
+
+def _get_context(store_detections=True):
+    global _context
+    if _context is None:
+        _context = {
+            "detector": CheatingDetector(),
+            "evidence_writer": EvidenceWriter(
+                os.getenv("SAVE_FRAMES_DIR", "detected_frames")
+            ),
+        }
+    # The database is only connected once a job actually stores to it
+    if store_detections and "detection_writer" not in _context:
+        db_manager = DBManager()
+        _context["db_manager"] = db_manager
+        _context["detection_writer"] = DetectionWriter(
+            db_manager,
+            batch_size=int(os.getenv("DETECTION_WRITER_BATCH_SIZE", 100)),
+            flush_interval=float(os.getenv("DETECTION_WRITER_FLUSH_INTERVAL", 1.0)),
+            max_buffer=int(os.getenv("DETECTION_WRITER_MAX_BUFFER", 10000)),
+            overflow_policy=os.getenv("DETECTION_WRITER_OVERFLOW", "drop_oldest"),
+        )
+    return _context
+
+
+def episode_max_gap(analysis_fps=0):
+    """
+    Seconds a behavior may disappear before its episode closes; videos
+    sampled at analysis_fps hold detections over the time between two
+    analyzed frames, so sampling doesn't split a behavior into episodes
+    """
+    max_gap = float(os.getenv("EPISODE_MAX_GAP", 2.0))
+    if analysis_fps > 0:
+        max_gap = max(max_gap, 2.0 / analysis_fps)
+    return max_gap
+
+
+def make_episode_aggregator(analysis_fps=0):
+    """Aggregator merging per-frame detections into behavior episodes"""
+    return EventAggregator(
+        max_gap=episode_max_gap(analysis_fps),
+        iou_threshold=float(os.getenv("EPISODE_IOU_THRESHOLD", 0.3)),
+        max_duration=float(os.getenv("EPISODE_MAX_DURATION", 60.0)),
+        update_interval=float(os.getenv("EPISODE_UPDATE_INTERVAL", 5.0)),
+    )
+
+
+def process_video_job(job, reporter):
+    """
+    Analyze one uploaded video inside a worker process
+    job is a dict with job_id and video_path, and optionally source_id,
+    store_detections (default True), keep_video (default False), preview
+    (default True), start_frame and end_frame to analyze one segment, and
+    base_time, the ISO time of the video's first frame if known;
+    reporter relays progress, detections and preview frames back to the
+    parent process
+    Returns a summary dict
+    """
+    store_detections = job.get("store_detections", True)
+    context = _get_context(store_detections)
+    detector = context["detector"]
+    # The worker's detector is reused, so nothing may leak from its last job
+    detector.reset()
+    detection_writer = context["detection_writer"] if store_detections else None
+    recorder = EpisodeRecorder(
+        context["evidence_writer"],
+        detection_writer,
+        publish=reporter.publish,
+    )
+    analysis_fps = float(os.getenv("UPLOAD_ANALYSIS_FPS", 0))
+    episodes = make_episode_aggregator(analysis_fps)
+    threshold = float(os.getenv("DETECTION_CONFIDENCE", 0.6))
+    preview_interval = 1.0 / max(0.1, float(os.getenv("JOB_PREVIEW_FPS", 10)))
+    # Episodes are built on the video's own clock, so gaps and durations
+    # match the footage however fast it is processed. With a known start,
+    # detections are stamped on that clock and segments line up; otherwise
+    # they get the time they were found and media_time keeps the offset.
+    known_start = bool(job.get("base_time"))
+    base_time = (
+        datetime.fromisoformat(job["base_time"]) if known_start else datetime.now()
+    )
+    found_at = {}  # Episode id -> processing time it was first reported
+    behavior_counts = {}
+    last_preview = 0.0
+    started = time.perf_counter()
+
+    def record(episode):
+        if episode.closed:
+            behavior_counts[episode.behavior_type] = (
+                behavior_counts.get(episode.behavior_type, 0) + 1
+            )
+        start = None
+        if not known_start:
+            start = found_at.setdefault(episode.id, datetime.now())
+            if episode.closed:
+                del found_at[episode.id]
+        recorder.record(episode, job.get("source_id"), start)
+
+    def infer_frames(frames):
+        try:
+            # Process all frames with one call per model
+            return detector.process_frames(frames)
+        except Exception as e:
+            print(f"Error processing frame batch: {str(e)}")
+            return [[] for _ in frames]
+
+    def persist(frame, detections, jpeg, position):
+        nonlocal last_preview
+        frame_index, media_time = position
+        evidence = [
+            {**d, "frame_index": frame_index, "media_time": round(media_time, 3)}
+            for d in detections
+            if d["confidence"] > threshold
+        ]
+        # The already encoded frame with detection boxes becomes the
+        # episode's evidence if it turns out to be the representative one
+        for episode in episodes.update(
+            base_time + timedelta(seconds=media_time),
+            evidence,
+            lambda: jpeg if jpeg is not None else frame,
+        ):
+            record(episode)
+
+        # Preview frames cross a process boundary, so send them at a capped rate
+        now = time.monotonic()
+        if (
+            job.get("preview", True)
+            and jpeg is not None
+            and now - last_preview >= preview_interval
+        ):
+            last_preview = now
+            reporter.frame(jpeg)
+
+    def report_progress(processed_frames, total_frames):
+        if reporter.cancelled():
+            pipeline.stop()
+        reporter.progress(
+            processed_frames,
+            total_frames,
+            pipeline.get_stats(),
+            detector.get_resolution_stats(),
+        )
+
+    pipeline = VideoPipeline(
+        infer=infer_frames,
+        annotate=annotate_frame,
+        persist=persist,
+        batch_size=int(os.getenv("UPLOAD_BATCH_SIZE", 8)),
+        queue_size=int(os.getenv("PIPELINE_QUEUE_SIZE", 4)),
+        annotate_workers=int(os.getenv("PIPELINE_ANNOTATE_WORKERS", 2)),
+        on_progress=report_progress,
+        analysis_fps=analysis_fps,
+    )
+
+    try:
+        stage_stats = pipeline.run(
+            job["video_path"], job.get("start_frame", 0), job.get("end_frame")
+        )
+    finally:
+        for episode in episodes.flush():
+            record(episode)
+        context["evidence_writer"].flush()
+        if detection_writer is not None:
+            detection_writer.flush()
+        # Clean up the uploaded video
+        if not job.get("keep_video", False):
+            try:
+                os.remove(job["video_path"])
+            except OSError as e:
+                print(f"Error removing {job['video_path']}: {str(e)}")
+
+    elapsed = time.perf_counter() - started
+    frames = stage_stats[-1]["frames"] if stage_stats else 0
+    for stats in stage_stats:
+        print(
+            f"Job {job['job_id']} stage {stats['stage']}: {stats['frames']} frames, "
+            f"{stats['busy_fps']} fps busy, {stats['wall_fps']} fps wall"
+        )
+
+    return {
+        "frames_processed": frames,
+        "total_frames": pipeline.total_frames,
+        "frames_skipped": pipeline.frames_skipped,
+        "elapsed_seconds": round(elapsed, 2),
+        "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        "episodes": sum(behavior_counts.values()),
+        "episodes_by_behavior": behavior_counts,
+        "stages": stage_stats,
+        "resolution": detector.get_resolution_stats(),
+    }
@@ -0,0 +1,43 @@
+import cv2
+from src.utils.metrics import STAGE_SECONDS, count_error, timed
+
+
+def draw_detection_boxes(frame, detections):
+    """Draw bounding boxes for detected objects"""
+    for detection in detections:
+        if "bbox" in detection:
+            bbox = detection["bbox"]
+            x1, y1, x2, y2 = map(int, bbox)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+            cv2.putText(
+                frame,
+                f"{detection['behavior_type']}: {detection['confidence']:.2f}",
+                (x1, y1 - 10),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                (0, 0, 255),
+                2,
+            )
+
+
+def annotate_frame(frame, detections):
+    """
+    Draw detection boxes on the frame and encode it once; the same bytes
+    are streamed to viewers and kept as evidence
+    """
+    try:
+        if detections:
+            with timed(STAGE_SECONDS, stage="draw"):
+                draw_detection_boxes(frame, detections)
+
+        with timed(STAGE_SECONDS, stage="jpeg_encode"):
+            ret, buffer = cv2.imencode(".jpg", frame)
+        if not ret:
+            count_error("annotate")
+            print("Error: Could not encode frame")
+            return None
+        return buffer.tobytes()
+    except Exception as e:
+        count_error("annotate")
+        print(f"Error annotating frame: {str(e)}")
+        return None
@@ -0,0 +1,83 @@
+import json
+import queue
+import threading
+
+
+class Subscription:
+    """A subscriber's bounded inbox of published events"""
+
+    def __init__(self, hub, max_events):
+        self.hub = hub
+        self.events = queue.Queue(maxsize=max_events)
+        self.dropped = 0
+
+    def deliver(self, event):
+        # Publishers must never block on a slow subscriber, so the oldest
+        # undelivered event makes room for the new one
+        while True:
+            try:
+                self.events.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Next (event_type, data) pair, or None if nothing arrived in time"""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    """In-process publish/subscribe hub feeding the /events SSE stream"""
+
+    def __init__(self, max_events_per_subscriber=100):
+        self.max_events_per_subscriber = max_events_per_subscriber
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(self, self.max_events_per_subscriber)
+        with self.lock:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            self.subscribers.discard(subscription)
+
+    def publish(self, event_type, data):
+        """Hand an event to every current subscriber without blocking"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for subscription in subscribers:
+            subscription.deliver((event_type, data))
+
+    def subscriber_count(self):
+        with self.lock:
+            return len(self.subscribers)
+
+    def stream(self, keepalive_interval=15):
+        """Generator of Server-Sent Events text for one client"""
+        subscription = self.subscribe()
+        try:
+            # Tell the browser how long to wait before reconnecting
+            yield "retry: 3000\n\n"
+            while True:
+                event = subscription.get(timeout=keepalive_interval)
+                if event is None:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                event_type, data = event
+                yield f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            subscription.close()
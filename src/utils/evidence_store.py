@@ -0,0 +1,188 @@
+import cv2
+import os
+import threading
+import time
+from src.utils.metrics import count_error
+
+
+class EvidenceStore:
+    """
+    Keep the evidence frame directory within a disk budget and serve small
+    thumbnails of its frames. Frames past max_age are removed first, then
+    the least recently viewed ones until the directory fits max_bytes.
+    """
+
+    THUMBNAIL_DIR = "thumbs"
+
+    def __init__(
+        self,
+        directory="detected_frames",
+        max_bytes=2 * 1024**3,
+        max_age=0,
+        min_age=300,
+        sweep_interval=300,
+        thumbnail_width=160,
+        on_evict=None,
+    ):
+        self.directory = directory
+        self.thumbnail_directory = os.path.join(directory, self.THUMBNAIL_DIR)
+        self.max_bytes = max_bytes  # 0 disables the size budget
+        self.max_age = max_age  # Seconds; 0 keeps frames regardless of age
+        # Newer frames are never evicted: their rows may still be waiting
+        # in the detection writer and would be inserted after the clear
+        self.min_age = min_age
+        self.sweep_interval = sweep_interval
+        self.thumbnail_width = thumbnail_width
+        # on_evict(filenames) runs before the files are deleted, so database
+        # rows stop pointing at them; if it raises, nothing is deleted
+        self.on_evict = on_evict
+
+        # Last time each frame was served, on top of its modification time
+        self.last_access = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+        self.files = 0
+        self.bytes = 0
+        self.evicted = 0
+        self.thumbnails_created = 0
+
+        os.makedirs(self.thumbnail_directory, exist_ok=True)
+
+        self.thread = threading.Thread(
+            target=self._run, name="evidence-store", daemon=True
+        )
+        self.thread.start()
+
+    def touch(self, filename):
+        """Note that a served frame was viewed, so eviction keeps it longer"""
+        if os.path.basename(filename) != filename:
+            return
+        with self.lock:
+            self.last_access[filename] = time.time()
+
+    def thumbnail(self, filename):
+        """Path of the frame's thumbnail, created on first use; None if missing"""
+        if os.path.basename(filename) != filename or not filename.endswith(".jpg"):
+            return None
+        thumb_path = os.path.join(self.thumbnail_directory, filename)
+        if os.path.exists(thumb_path):
+            return thumb_path
+
+        frame = cv2.imread(os.path.join(self.directory, filename))
+        if frame is None:
+            return None
+        h, w = frame.shape[:2]
+        width = min(self.thumbnail_width, w)
+        thumb = cv2.resize(
+            frame, (width, max(1, h * width // w)), interpolation=cv2.INTER_AREA
+        )
+        ret, buffer = cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        if not ret:
+            return None
+        # Concurrent requests may race to create it; the last rename wins
+        tmp_path = f"{thumb_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(buffer.tobytes())
+        os.replace(tmp_path, thumb_path)
+        self.thumbnails_created += 1
+        return thumb_path
+
+    def sweep(self):
+        """Evict frames past the age limit or over the budget; returns their names"""
+        frames = self._scan()
+        now = time.time()
+        with self.lock:
+            # Forget views of frames that are gone, however they went
+            names = {frame["name"] for frame in frames}
+            for name in [n for n in self.last_access if n not in names]:
+                del self.last_access[name]
+            access = dict(self.last_access)
+
+        # Least recently used first, where viewing a frame counts as a use
+        frames.sort(key=lambda f: max(f["mtime"], access.get(f["name"], 0)))
+        total = sum(f["size"] for f in frames)
+        evict = []
+        for frame in frames:
+            if now - frame["mtime"] < self.min_age:
+                continue
+            expired = self.max_age and now - frame["mtime"] > self.max_age
+            over_budget = self.max_bytes and total > self.max_bytes
+            if not expired and not over_budget:
+                continue
+            evict.append(frame)
+            total -= frame["size"]
+
+        if evict:
+            names = [frame["name"] for frame in evict]
+            if self.on_evict is not None:
+                self.on_evict(names)
+            for frame in evict:
+                for path in frame["paths"]:
+                    try:
+                        os.remove(path)
+                    except OSError as e:
+                        print(f"Error removing evidence file {path}: {str(e)}")
+            with self.lock:
+                for name in names:
+                    self.last_access.pop(name, None)
+            self.evicted += len(evict)
+            print(f"Evicted {len(evict)} evidence frames")
+
+        self.files = len(frames) - len(evict)
+        self.bytes = total
+        return [frame["name"] for frame in evict]
+
+    def shutdown(self):
+        self.stop_event.set()
+        self.thread.join(timeout=5)
+
+    def get_stats(self):
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "max_age": self.max_age,
+            "evicted": self.evicted,
+            "thumbnails_created": self.thumbnails_created,
+        }
+
+    def _scan(self):
+        """Every finished frame with its size, counting its thumbnail too"""
+        frames = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(".jpg"):
+                    continue
+                stat = entry.stat()
+                frames[entry.name] = {
+                    "name": entry.name,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "paths": [entry.path],
+                }
+
+        with os.scandir(self.thumbnail_directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.endswith(".jpg"):
+                    continue
+                frame = frames.get(entry.name)
+                if frame is None:
+                    # Thumbnail of a frame that is already gone
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+                    continue
+                frame["size"] += entry.stat().st_size
+                frame["paths"].append(entry.path)
+        return list(frames.values())
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                count_error("evidence_store")
+                print(f"Error sweeping evidence frames: {str(e)}")
+            self.stop_event.wait(self.sweep_interval)
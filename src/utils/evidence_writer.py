@@ -0,0 +1,114 @@
+import cv2
+import itertools
+import os
+import queue
+import threading
+from datetime import datetime
+from src.utils.metrics import STAGE_SECONDS, count_error, timed
+
+
+class EvidenceWriter:
+    """
+    Save annotated evidence frames from a background thread. Each frame is
+    encoded at most once and gets a unique name, however many detections
+    in it point at the file.
+    """
+
+    def __init__(self, directory="detected_frames", max_pending=64, jpeg_quality=90):
+        self.directory = directory
+        self.jpeg_quality = jpeg_quality
+        # Bounded so a stalled disk applies backpressure instead of memory growth
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+
+        self.saved = 0
+        self.failed = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.thread = threading.Thread(
+            target=self._run, name="evidence-writer", daemon=True
+        )
+        self.thread.start()
+
+    def save(self, frame=None, jpeg=None, timestamp=None, replaces=None):
+        """
+        Queue a frame (or already encoded JPEG bytes) for writing and return
+        the path it will be written to; the file at replaces, e.g. an
+        episode's earlier evidence, is deleted once the new one is written
+        """
+        if frame is None and jpeg is None:
+            raise ValueError("Either frame or jpeg is required")
+
+        path = self.next_path(timestamp)
+        if jpeg is None:
+            # The caller keeps drawing on and streaming its frame
+            frame = frame.copy()
+        self.pending.put((path, frame, jpeg, replaces))
+        return path
+
+    def next_path(self, timestamp=None):
+        """
+        Collision-free file name for a new evidence frame, also across the
+        processes writing into the same directory
+        """
+        timestamp = timestamp or datetime.now()
+        with self.lock:
+            seq = next(self.sequence)
+        stamp = timestamp.strftime("%Y%m%d_%H%M%S_%f")
+        return os.path.join(
+            self.directory, f"frame_{stamp}_{os.getpid()}_{seq:06d}.jpg"
+        )
+
+    def flush(self):
+        """Block until every queued frame has been written"""
+        self.pending.join()
+
+    def shutdown(self):
+        self.flush()
+
+    def get_stats(self):
+        return {
+            "pending": self.pending.qsize(),
+            "saved": self.saved,
+            "failed": self.failed,
+        }
+
+    def _run(self):
+        while True:
+            path, frame, jpeg, replaces = self.pending.get()
+            try:
+                if jpeg is None:
+                    with timed(STAGE_SECONDS, stage="jpeg_encode"):
+                        ret, buffer = cv2.imencode(
+                            ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+                        )
+                    if not ret:
+                        raise ValueError("Could not encode frame")
+                    jpeg = buffer.tobytes()
+
+                # Write to a temporary name so readers never see a partial file
+                with timed(STAGE_SECONDS, stage="disk_write"):
+                    tmp_path = path + ".tmp"
+                    with open(tmp_path, "wb") as f:
+                        f.write(jpeg)
+                    os.replace(tmp_path, path)
+                self.saved += 1
+                if replaces is not None:
+                    self._remove(replaces)
+            except Exception as e:
+                self.failed += 1
+                count_error("evidence_writer")
+                print(f"Error saving evidence frame {path}: {str(e)}")
+            finally:
+                self.pending.task_done()
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # Already evicted
+            pass
+        except OSError as e:
+            print(f"Error removing replaced evidence frame {path}: {str(e)}")
@@ -0,0 +1,151 @@
+"""
+Export the YOLO models for the CPU inference backends and check that the
+exported versions agree with PyTorch
+
+    python -m src.utils.export_models --backend onnx
+    python -m src.utils.export_models --backend openvino --check exam.mp4
+"""
+import argparse
+import os
+import sys
+import cv2
+from src.utils.inference_backends import (
+    CONF_THRESHOLD,
+    TorchBackend,
+    create_backend,
+    export_path,
+)
+from src.utils.object_detector import CHEATING_WEIGHTS, GENERAL_WEIGHTS
+from src.detectors.event_aggregator import box_iou
+
+EXPORT_FORMATS = {"onnx": "onnx", "openvino": "openvino"}
+
+
+def export_model(weights, backend, imgsz=640, force=False):
+    """Export one .pt model once; the artifact is cached next to it"""
+    from ultralytics import YOLO
+
+    target = export_path(weights, backend)
+    if os.path.exists(target) and not force:
+        print(f"{target} already exists, skipping (use --force to re-export)")
+        return target
+
+    # A dynamic batch lets the exported model take whole frame batches
+    exported = YOLO(weights).export(
+        format=EXPORT_FORMATS[backend], imgsz=imgsz, dynamic=True, simplify=True
+    )
+    print(f"Exported {weights} -> {exported}")
+    return target
+
+
+def read_frames(source, count):
+    """Up to count frames spread over a video, or a single image"""
+    image = cv2.imread(source)
+    if image is not None:
+        return [image]
+
+    cap = cv2.VideoCapture(source)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or count
+    step = max(1, total // count)
+    frames = []
+    for index in range(0, total, step):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(cv2.resize(frame, (640, 480)))
+        if len(frames) == count:
+            break
+    cap.release()
+    return frames
+
+
+def compare_boxes(expected, actual, iou_threshold, conf_tolerance):
+    """
+    Match every reference box to an unused box of the same class; returns
+    the list of mismatches (empty when the frame agrees)
+    """
+    problems = []
+    unused = list(actual)
+    for cls_id, conf, bbox in expected:
+        candidates = [
+            (box_iou(bbox, other[2]), other) for other in unused if other[0] == cls_id
+        ]
+        best_iou, best = max(candidates, key=lambda c: c[0], default=(0.0, None))
+        if best is None or best_iou < iou_threshold:
+            # Boxes right at the confidence threshold may legitimately flip
+            if conf > CONF_THRESHOLD + conf_tolerance:
+                problems.append(f"class {cls_id} ({conf:.2f}) missing")
+            continue
+        unused.remove(best)
+        if abs(best[1] - conf) > conf_tolerance:
+            problems.append(f"class {cls_id} confidence {conf:.3f} vs {best[1]:.3f}")
+    for cls_id, conf, _ in unused:
+        if conf > CONF_THRESHOLD + conf_tolerance:
+            problems.append(f"class {cls_id} ({conf:.2f}) unexpected")
+    return problems
+
+
+def check_parity(weights, backend, frames, iou_threshold=0.9, conf_tolerance=0.05):
+    """Compare an exported backend against PyTorch on the same frames"""
+    reference = TorchBackend(weights)
+    candidate = create_backend(weights, backend)
+    if candidate.name != backend:
+        print(f"{weights}: {backend} backend unavailable")
+        return False
+
+    failures = 0
+    for index, (expected, actual) in enumerate(
+        zip(reference.predict(frames), candidate.predict(frames))
+    ):
+        problems = compare_boxes(expected, actual, iou_threshold, conf_tolerance)
+        if problems:
+            failures += 1
+            print(f"{weights} frame {index}: " + "; ".join(problems))
+
+    print(
+        f"{weights}: {backend} matches torch on {len(frames) - failures}/"
+        f"{len(frames)} frames"
+    )
+    return failures == 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=sorted(EXPORT_FORMATS), default="onnx")
+    parser.add_argument(
+        "--weights", nargs="+", default=[GENERAL_WEIGHTS, CHEATING_WEIGHTS]
+    )
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument(
+        "--force", action="store_true", help="Re-export existing artifacts"
+    )
+    parser.add_argument(
+        "--check", metavar="VIDEO_OR_IMAGE", help="Run the parity check on this source"
+    )
+    parser.add_argument("--frames", type=int, default=20, help="Frames to compare")
+    parser.add_argument(
+        "--iou", type=float, default=0.9, help="Minimum IoU of matched boxes"
+    )
+    parser.add_argument("--conf-tolerance", type=float, default=0.05)
+    args = parser.parse_args(argv)
+
+    for weights in args.weights:
+        export_model(weights, args.backend, args.imgsz, args.force)
+
+    if not args.check:
+        return 0
+
+    frames = read_frames(args.check, args.frames)
+    if not frames:
+        print(f"Could not read frames from {args.check}")
+        return 1
+    passed = [
+        check_parity(weights, args.backend, frames, args.iou, args.conf_tolerance)
+        for weights in args.weights
+    ]
+    return 0 if all(passed) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
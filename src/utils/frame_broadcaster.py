@@ -0,0 +1,81 @@
+import threading
+
+
+class FrameBroadcaster:
+    """
+    Fan-out hub for one video source: a single producer publishes JPEG
+    bytes and any number of viewers stream them. Each viewer only ever
+    sees the latest frame, so a slow client skips frames instead of
+    stalling the producer or the other viewers.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.jpeg = None
+        self.sequence = 0
+        self.closed = False
+        self.viewers = 0
+        self.frames_published = 0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+
+    def publish(self, jpeg):
+        """Replace the current frame and wake every waiting viewer"""
+        with self.condition:
+            self.jpeg = jpeg
+            self.sequence += 1
+            self.frames_published += 1
+            self.condition.notify_all()
+
+    def close(self):
+        """Mark the end of the source so viewers finish their streams"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def reopen(self):
+        """Start a new run of the source, e.g. the next uploaded video"""
+        with self.condition:
+            self.closed = False
+            self.jpeg = None
+
+    def viewer_count(self):
+        with self.condition:
+            return self.viewers
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                "viewers": self.viewers,
+                "closed": self.closed,
+                "frames_published": self.frames_published,
+                "frames_sent": self.frames_sent,
+                "frames_skipped": self.frames_skipped,
+            }
+
+    def stream(self, wait_timeout=1.0):
+        """Multipart MJPEG generator for one viewer"""
+        with self.condition:
+            self.viewers += 1
+            # Start from the frame currently on screen, if there is one
+            last_sequence = self.sequence
+            if self.jpeg is not None:
+                last_sequence -= 1
+        try:
+            while True:
+                with self.condition:
+                    while self.sequence == last_sequence and not self.closed:
+                        self.condition.wait(timeout=wait_timeout)
+                    if self.sequence == last_sequence:
+                        return  # Closed and nothing new left to send
+                    self.frames_skipped += self.sequence - last_sequence - 1
+                    self.frames_sent += 1
+                    last_sequence = self.sequence
+                    jpeg = self.jpeg
+
+                yield (
+                    b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+                )
+        finally:
+            with self.condition:
+                self.viewers -= 1
@@ -0,0 +1,95 @@
+import threading
+import cv2
+import numpy as np
+
+
+def letterbox(frame, imgsz, stride=None):
+    """
+    Resize keeping aspect ratio and pad, like Ultralytics, to an imgsz
+    square or, given a stride, only up to the next multiple of it (so a
+    640x480 frame stays 640x480 instead of 640x640), and return the RGB
+    CHW float32 blob with the transform to undo it
+    """
+    h, w = frame.shape[:2]
+    ratio = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    pad_x, pad_y = imgsz - new_w, imgsz - new_h
+    if stride:
+        pad_x, pad_y = pad_x % stride, pad_y % stride
+    pad_x, pad_y = pad_x / 2, pad_y / 2
+
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    frame = cv2.copyMakeBorder(
+        frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+
+    # BGR HWC uint8 -> RGB CHW float in [0, 1]
+    blob = frame[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(blob), (ratio, left, top)
+
+
+def unletterbox_box(box, transform, shape):
+    """Map an [x1, y1, x2, y2] box on the letterboxed input back to the frame"""
+    ratio, left, top = transform
+    h, w = shape[:2]
+    x1, y1, x2, y2 = box
+    return [
+        float(min(max((x1 - left) / ratio, 0), w)),
+        float(min(max((y1 - top) / ratio, 0), h)),
+        float(min(max((x2 - left) / ratio, 0), w)),
+        float(min(max((y2 - top) / ratio, 0), h)),
+    ]
+
+
+class FrameContext:
+    """
+    One frame plus the derived views the analyzers need (RGB copy, model
+    input blobs, downscaled grayscale), each computed at most once and
+    shared by every analyzer that asks for it
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.shape = frame.shape
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def wrap(cls, frame):
+        """Accept either a raw BGR frame or an existing context"""
+        return frame if isinstance(frame, cls) else cls(frame)
+
+    @property
+    def rgb(self):
+        """RGB copy for MediaPipe"""
+        return self._cached("rgb", lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2RGB))
+
+    def letterboxed(self, imgsz, stride=None):
+        """(blob, transform) of the frame as a YOLO input of imgsz, see letterbox"""
+        return self._cached(
+            ("letterbox", imgsz, stride), lambda: letterbox(self.frame, imgsz, stride)
+        )
+
+    def small_gray(self, size):
+        """Grayscale copy downscaled to size (width, height)"""
+
+        def compute():
+            small = cv2.resize(self.frame, size, interpolation=cv2.INTER_AREA)
+            if small.ndim == 3:
+                small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            return small
+
+        return self._cached(("gray", size), compute)
+
+    def _cached(self, key, compute):
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]
+        # Computed outside the lock so analyzers running in parallel don't
+        # wait on each other's views
+        value = compute()
+        with self.lock:
+            return self.cache.setdefault(key, value)
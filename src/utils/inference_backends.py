@@ -0,0 +1,259 @@
+import os
+import cv2
+import numpy as np
+from src.utils.frame_context import FrameContext, unletterbox_box
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+# Ultralytics' default prediction settings, so every backend returns the
+# same boxes for the same frame
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+MAX_WH = 7680  # Offsets boxes per class so NMS never merges across classes
+# Largest YOLOv8 feature map stride; flexible inputs only need to be a
+# multiple of it, not a full square
+STRIDE = 32
+
+
+def export_path(weights, backend):
+    """Where the exported artifact of a .pt model is cached"""
+    stem = os.path.splitext(weights)[0]
+    if backend == "onnx":
+        return f"{stem}.onnx"
+    if backend == "openvino":
+        return f"{stem}_openvino_model"
+    return weights
+
+
+def letterbox_batch(contexts, imgsz, stride=None):
+    """
+    Blobs and transforms of a batch of frame contexts. With a stride, frames
+    are padded to the smallest multiple of it, unless their sizes differ,
+    in which case they are padded to squares so they still stack.
+    """
+    if stride and len({context.shape for context in contexts}) > 1:
+        stride = None
+    return zip(*(context.letterboxed(imgsz, stride) for context in contexts))
+
+
+class TorchBackend:
+    """Run the original .pt model through Ultralytics/PyTorch"""
+
+    name = "torch"
+
+    def __init__(self, weights, intra_threads=0, inter_threads=0):
+        import torch
+        from ultralytics import YOLO
+
+        if intra_threads:
+            torch.set_num_threads(intra_threads)
+        if inter_threads:
+            try:
+                torch.set_num_interop_threads(inter_threads)
+            except RuntimeError:
+                # Only allowed before PyTorch starts any parallel work
+                pass
+        self.torch = torch
+        self.weights = weights
+        self.model = YOLO(weights)
+        # Size the model was trained at, which Ultralytics predicts at too
+        imgsz = self.model.overrides.get("imgsz", 640)
+        self.imgsz = imgsz if isinstance(imgsz, int) else max(imgsz)
+
+    def predict(self, frames, imgsz=None):
+        """
+        One list of (class_id, confidence, [x1, y1, x2, y2]) per frame;
+        imgsz overrides the model's input size
+        """
+        if not frames:
+            return []
+        contexts = [FrameContext.wrap(frame) for frame in frames]
+        imgsz = imgsz or self.imgsz
+
+        # Feed the letterboxed blobs the frame contexts already share with
+        # the other model, instead of letting Ultralytics redo them; PyTorch
+        # takes any stride-aligned shape, so 4:3 frames skip the square's
+        # padding rows
+        blobs, transforms = letterbox_batch(contexts, imgsz, STRIDE)
+        if len(blobs) == 1:
+            batch = self.torch.from_numpy(blobs[0][None])
+        else:
+            batch = self.torch.from_numpy(np.stack(blobs))
+        results = self.model(batch, imgsz=imgsz)
+
+        return [
+            [
+                (
+                    int(box.cls),
+                    float(box.conf),
+                    unletterbox_box(box.xyxy[0].tolist(), transform, context.shape),
+                )
+                for box in result.boxes
+            ]
+            for result, transform, context in zip(results, transforms, contexts)
+        ]
+
+
+class ExportedBackend:
+    """
+    Shared pre- and post-processing for exported YOLOv8 detection models:
+    letterbox to the model's input size, then confidence filtering and
+    class-aware NMS on the raw (batch, 4 + classes, anchors) output
+    """
+
+    name = None
+
+    def __init__(self, weights, intra_threads=0, inter_threads=0, imgsz=640):
+        self.weights = weights
+        self.path = export_path(weights, self.name)
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(
+                f"{self.path} not found, run: python -m src.utils.export_models "
+                f"--backend {self.name}"
+            )
+        self.imgsz = imgsz
+        # Exported with a fixed input size, which then ignores imgsz overrides
+        self.fixed_size = False
+        self.intra_threads = intra_threads
+        self.inter_threads = inter_threads
+        self.load()
+
+    def load(self):
+        raise NotImplementedError
+
+    def infer(self, blob):
+        """Run the model on an NCHW float32 batch and return its raw output"""
+        raise NotImplementedError
+
+    def predict(self, frames, imgsz=None):
+        """
+        One list of (class_id, confidence, [x1, y1, x2, y2]) per frame;
+        imgsz overrides the input size of models exported with dynamic axes
+        """
+        if not frames:
+            return []
+        if imgsz is None or self.fixed_size:
+            imgsz = self.imgsz
+        contexts = [FrameContext.wrap(frame) for frame in frames]
+        # Only models exported with dynamic axes accept a non-square input
+        stride = None if self.fixed_size else STRIDE
+        blobs, transforms = letterbox_batch(contexts, imgsz, stride)
+        if self.batch_size is None:
+            outputs = self.infer(np.stack(blobs))
+        else:
+            # Exported with a fixed batch, so feed the frames one at a time
+            outputs = np.concatenate([self.infer(blob[None]) for blob in blobs])
+        return [
+            self._postprocess(output, transform, context.shape)
+            for output, transform, context in zip(outputs, transforms, contexts)
+        ]
+
+    def _postprocess(self, output, transform, shape):
+        predictions = output.T  # (anchors, 4 + classes)
+        scores = predictions[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences > CONF_THRESHOLD
+        if not keep.any():
+            return []
+
+        boxes = predictions[keep, :4]
+        class_ids = class_ids[keep]
+        confidences = confidences[keep]
+
+        # Center x/y, width/height -> top-left x/y, width/height
+        xywh = boxes.copy()
+        xywh[:, :2] -= xywh[:, 2:] / 2
+        offset = xywh.copy()
+        offset[:, :2] += class_ids[:, None] * MAX_WH
+        indices = cv2.dnn.NMSBoxes(
+            offset.tolist(), confidences.tolist(), CONF_THRESHOLD, IOU_THRESHOLD
+        )
+        indices = np.array(indices).reshape(-1)[:MAX_DETECTIONS]
+
+        detections = []
+        for i in indices:
+            x, y, bw, bh = xywh[i]
+            bbox = unletterbox_box([x, y, x + bw, y + bh], transform, shape)
+            detections.append((int(class_ids[i]), float(confidences[i]), bbox))
+        return detections
+
+
+class OnnxRuntimeBackend(ExportedBackend):
+    """Exported .onnx model on the ONNX Runtime CPU execution provider"""
+
+    name = "onnx"
+
+    def load(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.intra_threads:
+            options.intra_op_num_threads = self.intra_threads
+        if self.inter_threads:
+            options.inter_op_num_threads = self.inter_threads
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        self.session = ort.InferenceSession(
+            self.path, options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch = model_input.shape[0]
+        self.batch_size = batch if isinstance(batch, int) else None
+        if isinstance(model_input.shape[2], int):
+            self.imgsz = model_input.shape[2]
+            self.fixed_size = True
+
+    def infer(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVINOBackend(ExportedBackend):
+    """Exported OpenVINO IR model compiled for the CPU plugin"""
+
+    name = "openvino"
+
+    def load(self):
+        import openvino as ov
+
+        xml = [f for f in os.listdir(self.path) if f.endswith(".xml")]
+        if not xml:
+            raise FileNotFoundError(f"No .xml model found in {self.path}")
+
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if self.intra_threads:
+            config["INFERENCE_NUM_THREADS"] = self.intra_threads
+        if self.inter_threads:
+            config["NUM_STREAMS"] = self.inter_threads
+        core = ov.Core()
+        model = core.read_model(os.path.join(self.path, xml[0]))
+        shape = model.inputs[0].get_partial_shape()
+        self.batch_size = None if shape[0].is_dynamic else shape[0].get_length()
+        if not shape[2].is_dynamic:
+            self.imgsz = shape[2].get_length()
+            self.fixed_size = True
+        self.compiled = core.compile_model(model, "CPU", config)
+
+    def infer(self, blob):
+        return self.compiled(blob)[0]
+
+
+def create_backend(weights, backend="torch", intra_threads=0, inter_threads=0):
+    """
+    Load a model with the requested backend, falling back to PyTorch when
+    the exported artifact or its runtime is not available
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend}, use one of {BACKENDS}")
+
+    if backend != "torch":
+        backend_class = OnnxRuntimeBackend if backend == "onnx" else OpenVINOBackend
+        try:
+            return backend_class(weights, intra_threads, inter_threads)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"Could not load {backend} backend for {weights}: {str(e)}")
+            print("Falling back to the PyTorch backend")
+
+    return TorchBackend(weights, intra_threads, inter_threads)
@@ -0,0 +1,123 @@
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+
+class InferenceScheduler:
+    """
+    Run the shared YOLO models for many sources from one thread. Pending
+    frames are served round-robin, at most one per source per batch, so a
+    fast source cannot starve the others.
+    """
+
+    def __init__(self, object_detector, max_batch=4):
+        self.object_detector = object_detector
+        self.max_batch = max(1, max_batch)
+
+        self.condition = threading.Condition()
+        self.pending = {}  # source_id -> deque of (frame, imgsz, future)
+        self.ring = deque()  # Sources with pending frames, in service order
+        self.running = True
+
+        self.batches = 0
+        self.served = {}
+
+        self.thread = threading.Thread(
+            target=self._run, name="inference-scheduler", daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, source_id, frame, imgsz=None):
+        """
+        Queue a frame for both YOLO models, optionally at a reduced input
+        size; the future resolves to (object_results, cheating_results)
+        """
+        future = Future()
+        with self.condition:
+            if not self.running:
+                raise RuntimeError("Inference scheduler is shut down")
+            if source_id not in self.pending:
+                self.pending[source_id] = deque()
+                self.ring.append(source_id)
+            self.pending[source_id].append((frame, imgsz, future))
+            self.condition.notify()
+        return future
+
+    def shutdown(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        self.thread.join(timeout=5)
+
+    def get_stats(self):
+        with self.condition:
+            return {
+                "batches": self.batches,
+                "pending": {sid: len(q) for sid, q in self.pending.items()},
+                "served": dict(self.served),
+            }
+
+    def _next_batch(self):
+        """
+        Take one frame from each waiting source, in round-robin order; a
+        batch only holds frames for the same input size
+        """
+        batch = []
+        imgsz = None
+        skipped = []
+        while self.ring and len(batch) < self.max_batch:
+            source_id = self.ring.popleft()
+            requests = self.pending[source_id]
+            if batch and requests[0][1] != imgsz:
+                # Served in a later batch, without losing its turn
+                skipped.append(source_id)
+                continue
+            frame, imgsz, future = requests.popleft()
+            batch.append((source_id, frame, future))
+            if requests:
+                # Back of the line until every other source had a turn
+                self.ring.append(source_id)
+            else:
+                del self.pending[source_id]
+        self.ring.extendleft(reversed(skipped))
+        return batch, imgsz
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.ring:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                batch, imgsz = self._next_batch()
+
+            frames = [frame for _, frame, _ in batch]
+            try:
+                object_results = self.object_detector.detect_objects_batch(
+                    frames, imgsz
+                )
+                cheating_results = self.object_detector.detect_cheating_batch(
+                    frames, imgsz
+                )
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self.condition:
+                self.batches += 1
+                for source_id, _, _ in batch:
+                    self.served[source_id] = self.served.get(source_id, 0) + 1
+
+            for (_, _, future), objects, cheating in zip(
+                batch, object_results, cheating_results
+            ):
+                future.set_result((objects, cheating))
+
+        # Fail whatever is still queued so no caller waits forever
+        with self.condition:
+            leftovers = [request for q in self.pending.values() for request in q]
+            self.pending.clear()
+            self.ring.clear()
+        for _, _, future in leftovers:
+            future.set_exception(RuntimeError("Inference scheduler is shut down"))
@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+import threading
+from src.utils.frame_context import FrameContext
+
+
+class MotionGate:
+    """
+    Cheap frame-difference check that decides whether a frame needs the
+    heavy models or can reuse the detections of the last analyzed frame
+    """
+
+    def __init__(self, threshold=8.0, max_stale_frames=15, size=(64, 48), grid=(4, 4)):
+        # Mean absolute grayscale difference a region must exceed to count as motion
+        self.threshold = threshold
+        # Force a full pass after this many skipped frames in a row
+        self.max_stale_frames = max_stale_frames
+        self.size = size  # (width, height) of the downscaled comparison image
+        self.grid = grid  # (rows, cols) of regions compared independently
+
+        self.lock = threading.Lock()
+        self.reference = None
+        self.stale_frames = 0
+        self.frames_seen = 0
+        self.frames_skipped = 0
+        self.full_passes = 0
+        self.forced_passes = 0
+
+    def should_process(self, frame):
+        """Return True if the frame changed enough to run the detectors"""
+        small = self._downscale(frame)
+
+        with self.lock:
+            self.frames_seen += 1
+
+            if self.reference is None or self.reference.shape != small.shape:
+                return self._accept(small)
+
+            if self.stale_frames >= self.max_stale_frames:
+                self.forced_passes += 1
+                return self._accept(small)
+
+            if self._region_change(small) > self.threshold:
+                return self._accept(small)
+
+            self.stale_frames += 1
+            self.frames_skipped += 1
+            return False
+
+    def reset(self):
+        """Forget the reference frame so the next frame is always processed"""
+        with self.lock:
+            self.reference = None
+            self.stale_frames = 0
+
+    def get_stats(self):
+        """Counters showing how much inference the gate saved"""
+        with self.lock:
+            return {
+                "frames_seen": self.frames_seen,
+                "frames_skipped": self.frames_skipped,
+                "full_passes": self.full_passes,
+                "forced_passes": self.forced_passes,
+                "skip_ratio": (
+                    round(self.frames_skipped / self.frames_seen, 3)
+                    if self.frames_seen
+                    else 0.0
+                ),
+            }
+
+    def _accept(self, small):
+        # Compare later frames against the last analyzed one, not the
+        # previous frame, so slow drift still triggers a new pass
+        self.reference = small
+        self.stale_frames = 0
+        self.full_passes += 1
+        return True
+
+    def _downscale(self, frame):
+        return FrameContext.wrap(frame).small_gray(self.size)
+
+    def _region_change(self, small):
+        """Largest mean difference over the grid regions"""
+        diff = cv2.absdiff(small, self.reference)
+        rows, cols = self.grid
+        height, width = diff.shape
+        diff = diff[: height - height % rows, : width - width % cols]
+        regions = diff.reshape(rows, height // rows, cols, width // cols)
+        return float(regions.mean(axis=(1, 3), dtype=np.float32).max())
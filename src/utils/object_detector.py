@@ -1,16 +1,39 @@
-from ultralytics import YOLO
-import torch
+import os
+from src.utils.inference_backends import create_backend
+
+GENERAL_WEIGHTS = "yolov8n.pt"  # Using the smallest YOLOv8 model for speed
+CHEATING_WEIGHTS = "best.pt"  # Custom model for cheating detection
 
 
 class ObjectDetector:
-    def __init__(self):
+    def __init__(
+        self,
+        backend=None,
+        intra_threads=None,
+        inter_threads=None,
+        general_model=None,
+        cheating_model=None,
+    ):
+        # torch runs the .pt files; onnx and openvino run the artifacts
+        # cached by python -m src.utils.export_models
+        self.backend = backend or os.getenv("INFERENCE_BACKEND", "torch")
+        if intra_threads is None:
+            intra_threads = int(os.getenv("INFERENCE_INTRA_THREADS", 0))
+        if inter_threads is None:
+            inter_threads = int(os.getenv("INFERENCE_INTER_THREADS", 0))
+
+        # Already loaded models (anything with the backends' predict method)
+        # can be passed in instead, e.g. stand-ins for benchmarks
+
         # Initialize general object detection model
-        self.general_model = YOLO(
-            "yolov8n.pt"
-        )  # Using the smallest YOLOv8 model for speed
+        self.general_model = general_model or create_backend(
+            GENERAL_WEIGHTS, self.backend, intra_threads, inter_threads
+        )
 
         # Initialize cheating detection model
-        self.cheating_model = YOLO("best.pt")  # Custom model for cheating detection
+        self.cheating_model = cheating_model or create_backend(
+            CHEATING_WEIGHTS, self.backend, intra_threads, inter_threads
+        )
 
         # Classes we're interested in (from COCO dataset)
         self.target_classes = {"cell phone": 67, "book": 73, "person": 0}
@@ -22,17 +45,35 @@ class ObjectDetector:
             "students_not_cheating": 2,
         }
 
-    def detect_objects(self, frame):
+    def detect_objects(self, frame, imgsz=None):
         """Detect objects in the frame using YOLO"""
-        results = self.general_model(frame)
-        detections = {"phones": [], "books": [], "people": []}
+        results = self.general_model.predict([frame], imgsz)
+        return self._parse_object_result(results[0])
+
+    def detect_objects_batch(self, frames, imgsz=None):
+        """Detect objects in a list of frames with a single YOLO call"""
+        if not frames:
+            return []
+        results = self.general_model.predict(list(frames), imgsz)
+        return [self._parse_object_result(result) for result in results]
 
-        boxes = results[0].boxes
-        for box in boxes:
-            cls_id = int(box.cls)
-            conf = float(box.conf)
-            bbox = box.xyxy[0].tolist()  # Convert to normal list
+    def detect_cheating(self, frame, imgsz=None):
+        """Detect cheating behavior using the custom model"""
+        results = self.cheating_model.predict([frame], imgsz)
+        return self._parse_cheating_result(results[0])
+
+    def detect_cheating_batch(self, frames, imgsz=None):
+        """Detect cheating behavior in a list of frames with a single YOLO call"""
+        if not frames:
+            return []
+        results = self.cheating_model.predict(list(frames), imgsz)
+        return [self._parse_cheating_result(result) for result in results]
+
+    def _parse_object_result(self, result):
+        """Convert one frame's boxes from the general model into detection lists"""
+        detections = {"phones": [], "books": [], "people": []}
 
+        for cls_id, conf, bbox in result:
             detection = {"confidence": conf, "bbox": bbox}
 
             if cls_id == self.target_classes["cell phone"]:
@@ -44,17 +85,11 @@ class ObjectDetector:
 
         return detections
 
-    def detect_cheating(self, frame):
-        """Detect cheating behavior using the custom model"""
-        results = self.cheating_model(frame)
+    def _parse_cheating_result(self, result):
+        """Convert one frame's boxes from the custom model into detection lists"""
         detections = {"cheating": [], "not_cheating": [], "people": []}
 
-        boxes = results[0].boxes
-        for box in boxes:
-            cls_id = int(box.cls)
-            conf = float(box.conf)
-            bbox = box.xyxy[0].tolist()
-
+        for cls_id, conf, bbox in result:
             detection = {"confidence": conf, "bbox": bbox}
 
             if cls_id == self.cheating_classes["students_cheating"]:
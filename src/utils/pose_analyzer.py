@@ -1,23 +1,99 @@
 import mediapipe as mp
 import numpy as np
 import cv2
+from src.utils.frame_context import FrameContext
+
+# Face mesh landmarks used for head orientation
+NOSE_TIP = 1
+FOREHEAD = 10  # Forehead center
+CHIN = 152  # Chin center
+LEFT_EAR = 234
+RIGHT_EAR = 454
+LEFT_EYE = 33  # Left eye outer corner
+RIGHT_EYE = 263  # Right eye outer corner
+
+
+def landmarks_to_array(landmarks, width, height):
+    """(N, 3) array of a face's landmarks: pixel x, pixel y, relative depth z"""
+    points = np.array(
+        [(lm.x, lm.y, lm.z) for lm in landmarks.landmark], dtype=np.float32
+    )
+    points[:, 0] *= width
+    points[:, 1] *= height
+    return points
+
+
+def head_orientation(faces, width):
+    """
+    Head-orientation checks for a (faces, landmarks, 3) stack in pixel
+    coordinates, all faces at once. Returns arrays with one value per face:
+    looking_sideways, looking_down, and yaw/pitch in degrees (positive yaw
+    is turned towards the image's right, positive pitch is looking down)
+    """
+    nose = faces[:, NOSE_TIP]
+    forehead = faces[:, FOREHEAD]
+    chin = faces[:, CHIN]
+    left_ear = faces[:, LEFT_EAR]
+    right_ear = faces[:, RIGHT_EAR]
+    left_eye = faces[:, LEFT_EYE]
+    right_eye = faces[:, RIGHT_EYE]
+
+    # Sideways: one ear much closer to the nose, a clear depth difference
+    # between the ears, and eyes that are not fully visible
+    left_dist = np.linalg.norm(nose[:, :2] - left_ear[:, :2], axis=1)
+    right_dist = np.linalg.norm(nose[:, :2] - right_ear[:, :2], axis=1)
+    eye_dist = np.linalg.norm(left_eye[:, :2] - right_eye[:, :2], axis=1)
+    ear_ratio = np.minimum(left_dist, right_dist) / np.maximum(
+        np.maximum(left_dist, right_dist), 1e-6
+    )
+    z_diff = np.abs(left_ear[:, 2] - right_ear[:, 2])
+    looking_sideways = (ear_ratio < 0.75) & (z_diff > 0.05) & (eye_dist < 100)
+
+    # Down: the forehead-chin axis tilts away from vertical and the nose
+    # sits low in the face
+    face_vector = chin[:, :2] - forehead[:, :2]
+    face_length = np.maximum(np.linalg.norm(face_vector, axis=1), 1e-6)
+    angle = np.degrees(np.arccos(np.clip(face_vector[:, 1] / face_length, -1.0, 1.0)))
+    nose_position = (nose[:, 1] - forehead[:, 1]) / face_length
+    looking_down = (angle > 30) & (nose_position > 0.6)
+
+    # Yaw and pitch from the face's own axes; MediaPipe's z shares the
+    # scale of the normalized x, so it is brought to pixels with the width
+    scale = np.array([1.0, 1.0, width], dtype=np.float32)
+    right = (right_eye - left_eye) * scale
+    up = (forehead - chin) * scale
+    forward = np.cross(right, up)  # Points out of the face, towards the camera
+    yaw = np.degrees(np.arctan2(forward[:, 0], -forward[:, 2]))
+    pitch = np.degrees(
+        np.arctan2(forward[:, 1], np.hypot(forward[:, 0], forward[:, 2]))
+    )
+
+    return {
+        "looking_sideways": looking_sideways,
+        "looking_down": looking_down,
+        "yaw": yaw,
+        "pitch": pitch,
+    }
 
 
 class PoseAnalyzer:
-    def __init__(self):
+    def __init__(self, model_complexity=1):
         self.mp_pose = mp.solutions.pose
         self.mp_face_mesh = mp.solutions.face_mesh
-        self.pose = self.mp_pose.Pose(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-            model_complexity=1,
-        )
+        # One Pose graph per complexity already used, so switching back and
+        # forth does not reload the model
+        self.pose_models = {}
+        self.model_complexity = None
+        self.set_model_complexity(model_complexity)
         self.face_mesh = self.mp_face_mesh.FaceMesh(
             max_num_faces=1,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5,
             refine_landmarks=True,
         )
+        # Multi-face mesh for the person-ROI mosaic, created on first use
+        self.roi_face_mesh = None
+        self.roi_max_faces = 0
         # For temporal smoothing
         self.last_n_detections = []
         self.detection_window = 5  # Number of frames to consider
@@ -25,9 +101,27 @@ class PoseAnalyzer:
             0.7  # Increased threshold to reduce false positives
         )
 
+    def reset(self):
+        """Forget the temporal smoothing window"""
+        self.last_n_detections = []
+
+    def set_model_complexity(self, model_complexity):
+        """Switch the Pose model between lite (0), full (1) and heavy (2)"""
+        if model_complexity == self.model_complexity:
+            return
+        if model_complexity not in self.pose_models:
+            self.pose_models[model_complexity] = self.mp_pose.Pose(
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5,
+                model_complexity=model_complexity,
+            )
+        self.pose = self.pose_models[model_complexity]
+        self.model_complexity = model_complexity
+
     def analyze_pose(self, frame):
-        """Analyze pose and face landmarks in the frame"""
-        height, width = frame.shape[:2]
+        """Analyze pose and face landmarks in the frame (or FrameContext)"""
+        context = FrameContext.wrap(frame)
+        height, width = context.shape[:2]
         results = {
             "confidence": 0.0,
             "face_proximity_confidence": 0.0,
@@ -35,12 +129,14 @@ class PoseAnalyzer:
             "face_landmarks": None,
             "looking_sideways": False,
             "looking_down": False,
+            "yaw": None,
+            "pitch": None,
             "image_width": width,
             "image_height": height,
         }
 
-        # Convert BGR to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # Convert BGR to RGB, once per frame for every analyzer
+        rgb_frame = context.rgb
 
         # Get pose landmarks
         pose_results = self.pose.process(rgb_frame)
@@ -54,14 +150,11 @@ class PoseAnalyzer:
 
         if face_results.multi_face_landmarks:
             results["face_landmarks"] = face_results.multi_face_landmarks[0]
-            scaled_landmarks = self._scale_landmarks_to_image(
-                results["face_landmarks"],
-                width,
-                height,
-            )
+            points = landmarks_to_array(results["face_landmarks"], width, height)
 
             # Get the head rotation state
-            looking_sideways = self._check_looking_sideways(scaled_landmarks)
+            orientation = head_orientation(points[None], width)
+            looking_sideways = bool(orientation["looking_sideways"][0])
 
             # Add to temporal window
             self.last_n_detections.append(looking_sideways)
@@ -74,93 +167,115 @@ class PoseAnalyzer:
                 > self.looking_sideways_threshold
             )
 
-            results["looking_down"] = self._check_looking_down(scaled_landmarks)
+            results["looking_down"] = bool(orientation["looking_down"][0])
+            results["yaw"] = float(orientation["yaw"][0])
+            results["pitch"] = float(orientation["pitch"][0])
 
         return results
 
-    def _scale_landmarks_to_image(self, landmarks, width, height):
-        """Scale normalized landmarks to actual image dimensions"""
-        scaled = []
-        for landmark in landmarks.landmark:
-            scaled.append(
+    def analyze_people(self, frame, people, max_people=8, crop_size=192, head=0.5):
+        """
+        Per-person face analysis: the head region (top fraction of each
+        person box) is cropped, scaled to fit crop_size and tiled into one
+        mosaic, so a single FaceMesh pass covers the whole room at a cost
+        bounded by max_people crops
+        """
+        context = FrameContext.wrap(frame)
+        height, width = context.shape[:2]
+        people = sorted(people, key=lambda p: p["confidence"], reverse=True)
+        people = people[:max_people]
+        results = {"people": [], "image_width": width, "image_height": height}
+        if not people:
+            return results
+
+        cols = int(np.ceil(np.sqrt(len(people))))
+        rows = int(np.ceil(len(people) / cols))
+        mosaic = np.zeros((rows * crop_size, cols * crop_size, 3), dtype=np.uint8)
+        tiles = []
+        for index, person in enumerate(people):
+            results["people"].append(
                 {
-                    "x": int(landmark.x * width),
-                    "y": int(landmark.y * height),
-                    "z": landmark.z,
-                    "visibility": (
-                        landmark.visibility if hasattr(landmark, "visibility") else 1.0
-                    ),
+                    "bbox": person["bbox"],
+                    "confidence": person["confidence"],
+                    "track_id": person.get("track_id"),
+                    "face_found": False,
+                    "looking_sideways": False,
+                    "looking_down": False,
+                    "yaw": None,
+                    "pitch": None,
                 }
             )
-        return scaled
-
-    def _check_looking_sideways(self, landmarks):
-        """Enhanced check for looking sideways using multiple facial features"""
-        nose = landmarks[1]  # Nose tip
-        left_ear = landmarks[234]  # Left ear
-        right_ear = landmarks[454]  # Right ear
-        left_eye = landmarks[33]  # Left eye outer corner
-        right_eye = landmarks[263]  # Right eye outer corner
-
-        # Calculate ear-to-nose distances
-        left_dist = np.sqrt(
-            (nose["x"] - left_ear["x"]) ** 2 + (nose["y"] - left_ear["y"]) ** 2
-        )
-        right_dist = np.sqrt(
-            (nose["x"] - right_ear["x"]) ** 2 + (nose["y"] - right_ear["y"]) ** 2
-        )
-
-        # Calculate eye distances
-        eye_dist = np.sqrt(
-            (left_eye["x"] - right_eye["x"]) ** 2
-            + (left_eye["y"] - right_eye["y"]) ** 2
-        )
-
-        # Calculate relative distances
-        ear_ratio = min(left_dist, right_dist) / max(left_dist, right_dist)
-
-        # Use Z-coordinate for depth perception
-        nose_z = nose["z"]
-        left_ear_z = left_ear["z"]
-        right_ear_z = right_ear["z"]
+            x1, y1, x2, y2 = map(int, person["bbox"])
+            x1, y1 = max(x1, 0), max(y1, 0)
+            x2, y2 = min(x2, width), min(y2, height)
+            y2 = min(y2, y1 + max(1, int((y2 - y1) * head)))
+            crop = context.rgb[y1:y2, x1:x2]
+            if crop.size == 0:
+                tiles.append(None)
+                continue
 
-        # Check if head is rotated (one ear is significantly closer than the other)
-        z_diff = abs(left_ear_z - right_ear_z)
-
-        # Combine multiple factors for more accurate detection
-        is_looking_sideways = (
-            ear_ratio < 0.75  # Relaxed ratio threshold
-            and z_diff > 0.05  # Significant depth difference
-            and eye_dist < 100  # Eyes are not fully visible (indicating head turn)
-        )
-
-        return is_looking_sideways
-
-    def _check_looking_down(self, landmarks):
-        """Enhanced check for looking down"""
-        forehead = landmarks[10]  # Forehead center
-        chin = landmarks[152]  # Chin center
-        nose = landmarks[1]  # Nose tip
+            scale = crop_size / max(crop.shape[:2])
+            size = (
+                max(1, int(crop.shape[1] * scale)),
+                max(1, int(crop.shape[0] * scale)),
+            )
+            interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR
+            crop = cv2.resize(crop, size, interpolation=interpolation)
+            row, col = divmod(index, cols)
+            tx, ty = col * crop_size, row * crop_size
+            mosaic[ty : ty + size[1], tx : tx + size[0]] = crop
+            tiles.append((tx, ty, x1, y1, scale))
 
-        # Calculate angle between vertical and face orientation
-        face_vector = np.array([chin["x"] - forehead["x"], chin["y"] - forehead["y"]])
-        vertical_vector = np.array([0, 1])
+        face_results = self._get_roi_face_mesh(max_people).process(mosaic)
+        mosaic_height, mosaic_width = mosaic.shape[:2]
+        found, faces = [], []
+        for face in face_results.multi_face_landmarks or []:
+            # The nose tip decides which person's tile a face belongs to
+            nose = face.landmark[1]
+            col = min(int(nose.x * mosaic_width) // crop_size, cols - 1)
+            row = min(int(nose.y * mosaic_height) // crop_size, rows - 1)
+            index = row * cols + col
+            if index >= len(tiles) or tiles[index] is None:
+                continue
+            person = results["people"][index]
+            if person["face_found"]:
+                continue
+            person["face_found"] = True
 
-        # Normalize vectors
-        face_vector = face_vector / np.linalg.norm(face_vector)
-        vertical_vector = vertical_vector / np.linalg.norm(vertical_vector)
+            # Back to full-frame pixels, so the checks use the same scale
+            # as in whole-frame mode
+            tx, ty, x0, y0, scale = tiles[index]
+            points = landmarks_to_array(face, mosaic_width, mosaic_height)
+            points[:, 0] = x0 + (points[:, 0] - tx) / scale
+            points[:, 1] = y0 + (points[:, 1] - ty) / scale
+            points[:, 2] *= mosaic_width / scale / width
+            found.append(person)
+            faces.append(points)
 
-        # Calculate angle
-        angle = np.arccos(np.clip(np.dot(face_vector, vertical_vector), -1.0, 1.0))
-        angle_degrees = np.degrees(angle)
+        if faces:
+            # Every face in the room goes through the geometry in one go
+            orientation = head_orientation(np.stack(faces), width)
+            for i, person in enumerate(found):
+                person["looking_sideways"] = bool(orientation["looking_sideways"][i])
+                person["looking_down"] = bool(orientation["looking_down"][i])
+                person["yaw"] = float(orientation["yaw"][i])
+                person["pitch"] = float(orientation["pitch"][i])
 
-        # Check nose position relative to face
-        face_length = np.sqrt(
-            (chin["y"] - forehead["y"]) ** 2 + (chin["x"] - forehead["x"]) ** 2
-        )
-        nose_position = (nose["y"] - forehead["y"]) / face_length
+        return results
 
-        return angle_degrees > 30 and nose_position > 0.6
+    def _get_roi_face_mesh(self, faces):
+        if self.roi_face_mesh is None or faces > self.roi_max_faces:
+            if self.roi_face_mesh is not None:
+                self.roi_face_mesh.close()
+            # Tiles change from frame to frame, so detect instead of track
+            self.roi_face_mesh = self.mp_face_mesh.FaceMesh(
+                static_image_mode=True,
+                max_num_faces=faces,
+                min_detection_confidence=0.5,
+                refine_landmarks=True,
+            )
+            self.roi_max_faces = faces
+        return self.roi_face_mesh
 
     def detect_close_faces(self, pose_results):
         """Detect if multiple faces are close to each other (potential talking)"""
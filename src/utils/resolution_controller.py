@@ -0,0 +1,106 @@
+import threading
+
+# (YOLO input size, MediaPipe Pose model complexity), most accurate first
+DEFAULT_LADDER = "640:1,512:1,416:0,320:0"
+
+
+def parse_ladder(spec):
+    """Parse "imgsz:complexity,..." into a list of operating points"""
+    ladder = []
+    for step in spec.split(","):
+        step = step.strip()
+        if not step:
+            continue
+        imgsz, _, complexity = step.partition(":")
+        imgsz = int(imgsz)
+        if imgsz % 32:
+            raise ValueError(f"Input size {imgsz} is not a multiple of 32")
+        ladder.append({"imgsz": imgsz, "pose_complexity": int(complexity or 1)})
+    if not ladder:
+        raise ValueError("Resolution ladder is empty")
+    return ladder
+
+
+class ResolutionController:
+    """
+    Keep the measured frame time near a target by stepping down the ladder
+    when frames are too slow and back up when there is headroom. A smoothed
+    latency and a cooldown after each change keep it from oscillating.
+    """
+
+    def __init__(
+        self,
+        target_ms=100.0,
+        ladder=DEFAULT_LADDER,
+        smoothing=0.2,
+        headroom=0.7,
+        tolerance=1.1,
+        cooldown_frames=15,
+    ):
+        self.target_ms = target_ms
+        self.ladder = parse_ladder(ladder) if isinstance(ladder, str) else ladder
+        self.smoothing = smoothing  # Weight of the newest sample in the average
+        # Step up when below headroom * target, down when above tolerance * target
+        self.headroom = headroom
+        self.tolerance = tolerance
+        self.cooldown_frames = cooldown_frames
+
+        self.lock = threading.Lock()
+        self.level = 0
+        self.latency_ms = None
+        self.frames_since_change = 0
+        self.steps_down = 0
+        self.steps_up = 0
+
+    def current(self):
+        """The operating point the models should use for the next frame"""
+        with self.lock:
+            return dict(self.ladder[self.level])
+
+    def record(self, latency_seconds):
+        """
+        Feed the latency of one analyzed frame; returns the new operating
+        point if it changed, otherwise None
+        """
+        latency_ms = latency_seconds * 1000.0
+        with self.lock:
+            if self.latency_ms is None:
+                self.latency_ms = latency_ms
+            else:
+                self.latency_ms += self.smoothing * (latency_ms - self.latency_ms)
+
+            self.frames_since_change += 1
+            if self.frames_since_change < self.cooldown_frames:
+                return None
+
+            level = self.level
+            if self.latency_ms > self.target_ms * self.tolerance:
+                level = min(self.level + 1, len(self.ladder) - 1)
+            elif self.latency_ms < self.target_ms * self.headroom:
+                level = max(self.level - 1, 0)
+            if level == self.level:
+                return None
+
+            if level > self.level:
+                self.steps_down += 1
+            else:
+                self.steps_up += 1
+            self.level = level
+            self.frames_since_change = 0
+            # The old average describes the previous operating point
+            self.latency_ms = None
+            return dict(self.ladder[level])
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "level": self.level,
+                "levels": len(self.ladder),
+                **self.ladder[self.level],
+                "target_ms": self.target_ms,
+                "latency_ms": (
+                    round(self.latency_ms, 2) if self.latency_ms is not None else None
+                ),
+                "steps_down": self.steps_down,
+                "steps_up": self.steps_up,
+            }
@@ -0,0 +1,342 @@
+import cv2
+import math
+import queue
+import threading
+import time
+
+# Marks the end of the stream on a stage queue
+_STOP = object()
+
+
+class StageStats:
+    """Throughput counters for a single pipeline stage"""
+
+    def __init__(self, name, workers=1):
+        self.name = name
+        self.workers = workers
+        self.frames = 0
+        self.busy_time = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, frames, elapsed):
+        with self.lock:
+            self.frames += frames
+            self.busy_time += elapsed
+
+    def to_dict(self, wall_time):
+        with self.lock:
+            frames = self.frames
+            busy_time = self.busy_time
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "frames": frames,
+            "busy_seconds": round(busy_time, 3),
+            # Rate while the stage was actually working, per worker
+            "busy_fps": round(frames / busy_time, 2) if busy_time > 0 else 0.0,
+            # Rate over the whole run, the one that bounds the pipeline
+            "wall_fps": round(frames / wall_time, 2) if wall_time > 0 else 0.0,
+        }
+
+
+class VideoPipeline:
+    """
+    Process a video file as decode -> infer -> annotate/encode -> persist
+    stages running on their own threads and joined by bounded queues
+    """
+
+    def __init__(
+        self,
+        infer,
+        annotate,
+        persist,
+        batch_size=8,
+        queue_size=4,
+        annotate_workers=2,
+        frame_size=(640, 480),
+        on_progress=None,
+        analysis_fps=0,
+    ):
+        # infer(frames) -> list of detections per frame
+        self.infer = infer
+        # annotate(frame, detections) -> encoded evidence JPEG bytes or None
+        self.annotate = annotate
+        # persist(frame, detections, jpeg_bytes, position), called in frame
+        # order; position is the frame's (index, media time in seconds)
+        self.persist = persist
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.annotate_workers = max(1, annotate_workers)
+        self.frame_size = frame_size
+        self.on_progress = on_progress
+        # Frames analyzed per second of video; 0 analyzes every frame.
+        # Frames in between are grabbed but never decoded into images.
+        self.analysis_fps = max(0.0, analysis_fps)
+
+        self.stop_event = threading.Event()
+        self.error = None
+        self.total_frames = 0
+        self.frames_skipped = 0
+        self.fps = 0.0
+        self.stats = {}
+        self.start_time = None
+        self.end_time = None
+
+    def run(self, video_path, start_frame=0, end_frame=None):
+        """
+        Run the pipeline over a video file, or only its frames from
+        start_frame up to end_frame, and block until it finishes
+        """
+        self.stop_event.clear()
+        self.error = None
+        self.frames_skipped = 0
+        self.stats = {
+            "decode": StageStats("decode"),
+            "infer": StageStats("infer"),
+            "annotate": StageStats("annotate", self.annotate_workers),
+            "persist": StageStats("persist"),
+        }
+
+        # Bounded queues give backpressure: the decoder blocks when
+        # inference falls behind instead of buffering the whole video
+        decoded = queue.Queue(maxsize=self.queue_size)
+        inferred = queue.Queue(maxsize=self.queue_size)
+        annotated = queue.Queue(maxsize=self.queue_size)
+
+        cap = cv2.VideoCapture(video_path)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        if start_frame > 0:
+            # FFmpeg seeks to the keyframe before and decodes forward from
+            # there, so a segment starts exactly at start_frame
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        last_frame = frame_count if end_frame is None else min(end_frame, frame_count)
+        self.total_frames = max(0, last_frame - start_frame)
+        if self.analysis_fps and self.fps > self.analysis_fps:
+            # Progress counts the frames that will actually be analyzed
+            self.total_frames = math.ceil(
+                self.total_frames * self.analysis_fps / self.fps
+            )
+
+        threads = [
+            threading.Thread(
+                target=self._decode_stage,
+                args=(cap, decoded, start_frame, end_frame),
+                name="pipeline-decode",
+            ),
+            threading.Thread(
+                target=self._infer_stage,
+                args=(decoded, inferred),
+                name="pipeline-infer",
+            ),
+            threading.Thread(
+                target=self._persist_stage, args=(annotated,), name="pipeline-persist"
+            ),
+        ]
+        for i in range(self.annotate_workers):
+            threads.append(
+                threading.Thread(
+                    target=self._annotate_stage,
+                    args=(inferred, annotated),
+                    name=f"pipeline-annotate-{i}",
+                )
+            )
+
+        self.start_time = time.perf_counter()
+        self.end_time = None
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.end_time = time.perf_counter()
+
+        cap.release()
+
+        if self.error is not None:
+            raise self.error
+
+        return self.get_stats()
+
+    def stop(self):
+        """Ask all stages to stop as soon as possible"""
+        self.stop_event.set()
+
+    def get_stats(self):
+        """Per-stage throughput for the current or last run"""
+        if self.start_time is None:
+            return []
+        end_time = self.end_time or time.perf_counter()
+        wall_time = end_time - self.start_time
+        return [stats.to_dict(wall_time) for stats in self.stats.values()]
+
+    def _media_time(self, cap, index):
+        """Position of the frame just read in the video, in seconds"""
+        msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+        if msec > 0 or index == 0 or self.fps <= 0:
+            return msec / 1000.0
+        # Some containers report no timestamps; assume a constant frame rate
+        return index / self.fps
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+        self.stop_event.set()
+
+    def _put(self, q, item):
+        """Put with backpressure, giving up if the pipeline is stopping"""
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        """Get the next item, or _STOP if the pipeline is stopping"""
+        while not self.stop_event.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _STOP
+
+    def _decode_stage(self, cap, sink, start_frame=0, end_frame=None):
+        try:
+            seq = 0
+            index = start_frame
+            sample_interval = 1.0 / self.analysis_fps if self.analysis_fps else 0.0
+            # Half a frame of slack so rounded timestamps don't skip a sample
+            tolerance = 0.5 / self.fps if self.fps > 0 else 0.0
+            next_sample = None
+            while cap.isOpened() and not self.stop_event.is_set():
+                start = time.perf_counter()
+                batch = []
+                positions = []
+                while len(batch) < self.batch_size:
+                    if end_frame is not None and index >= end_frame:
+                        break
+                    # grab() advances the decoder; only sampled frames pay for
+                    # retrieve()'s conversion into an image and the resize
+                    if not cap.grab():
+                        break
+                    media_time = self._media_time(cap, index)
+                    if sample_interval:
+                        if next_sample is not None and (
+                            media_time + tolerance < next_sample
+                        ):
+                            index += 1
+                            self.frames_skipped += 1
+                            continue
+                        if next_sample is None:
+                            next_sample = media_time
+                        next_sample += sample_interval
+                        if next_sample <= media_time:
+                            # Catch up after a jump in the timestamps
+                            next_sample = media_time + sample_interval
+                    success, frame = cap.retrieve()
+                    if not success:
+                        break
+                    if self.frame_size is not None:
+                        # Ensure frame dimensions are consistent
+                        frame = cv2.resize(frame, self.frame_size)
+                    batch.append(frame)
+                    positions.append((index, media_time))
+                    index += 1
+                self.stats["decode"].record(len(batch), time.perf_counter() - start)
+
+                if not batch:
+                    break
+                if not self._put(sink, (seq, batch, positions)):
+                    return
+                seq += 1
+
+                if len(batch) < self.batch_size:
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(sink, _STOP)
+
+    def _infer_stage(self, source, sink):
+        try:
+            while True:
+                item = self._get(source)
+                if item is _STOP:
+                    break
+                seq, frames, positions = item
+
+                start = time.perf_counter()
+                detections = self.infer(frames)
+                self.stats["infer"].record(len(frames), time.perf_counter() - start)
+
+                if not self._put(sink, (seq, frames, positions, detections)):
+                    return
+        except Exception as e:
+            self._fail(e)
+        finally:
+            # Every annotate worker needs its own end marker
+            for _ in range(self.annotate_workers):
+                self._put(sink, _STOP)
+
+    def _annotate_stage(self, source, sink):
+        try:
+            while True:
+                item = self._get(source)
+                if item is _STOP:
+                    break
+                seq, frames, positions, detections = item
+
+                start = time.perf_counter()
+                results = []
+                for frame, position, frame_detections in zip(
+                    frames, positions, detections
+                ):
+                    jpeg = self.annotate(frame, frame_detections)
+                    results.append((frame, frame_detections, jpeg, position))
+                self.stats["annotate"].record(len(frames), time.perf_counter() - start)
+
+                if not self._put(sink, (seq, results)):
+                    return
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(sink, _STOP)
+
+    def _persist_stage(self, source):
+        try:
+            # Annotate workers can finish out of order, so hold batches
+            # until the next one in sequence arrives
+            pending = {}
+            next_seq = 0
+            finished_workers = 0
+            processed_frames = 0
+
+            while finished_workers < self.annotate_workers:
+                item = self._get(source)
+                if item is _STOP:
+                    if self.stop_event.is_set():
+                        return
+                    finished_workers += 1
+                    continue
+
+                seq, results = item
+                pending[seq] = results
+
+                while next_seq in pending:
+                    results = pending.pop(next_seq)
+                    next_seq += 1
+
+                    start = time.perf_counter()
+                    for frame, detections, jpeg, position in results:
+                        self.persist(frame, detections, jpeg, position)
+                    self.stats["persist"].record(
+                        len(results), time.perf_counter() - start
+                    )
+
+                    processed_frames += len(results)
+                    if self.on_progress is not None:
+                        self.on_progress(processed_frames, self.total_frames)
+        except Exception as e:
+            self._fail(e)
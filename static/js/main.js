@@ -31,48 +31,132 @@ function formatTimestamp(timestamp) {
     }
 }
 
+// Incremental alert state: the list is only rebuilt when the filter changes,
+// afterwards each poll adds the rows added since lastAlertId and refreshes
+// the ones that changed since alertsUpdatedAfter
+let alertsFilter = null;
+let lastAlertId = null;
+let alertsUpdatedAfter = null;
+let alertsRequestInFlight = false;
+
+function alertsEndpoint(behavior) {
+    return behavior === 'all' ? '/alerts' : `/api/detections/${behavior}`;
+}
+
 // Function to update detections
 function updateDetections() {
     const behaviorFilter = document.getElementById('behaviorFilter');
     const selectedBehavior = behaviorFilter.value;
-    
-    const endpoint = selectedBehavior === 'all' ? '/alerts' : `/api/detections/${selectedBehavior}`;
-    
-    fetch(endpoint)
+
+    if (alertsRequestInFlight && selectedBehavior === alertsFilter) {
+        return;
+    }
+
+    const reload = selectedBehavior !== alertsFilter;
+    if (reload) {
+        alertsFilter = selectedBehavior;
+        lastAlertId = null;
+        alertsUpdatedAfter = null;
+        document.getElementById('alerts-list').innerHTML = '';
+    }
+
+    const endpoint = alertsEndpoint(selectedBehavior);
+    let url = `${endpoint}?limit=100`;
+    if (lastAlertId !== null) {
+        url = `${endpoint}?since_id=${lastAlertId}`;
+        if (alertsUpdatedAfter !== null) {
+            url += `&updated_after=${encodeURIComponent(alertsUpdatedAfter)}`;
+        }
+    }
+
+    alertsRequestInFlight = true;
+    fetch(url)
         .then(response => response.json())
-        .then(alerts => {
-            const alertsListElement = document.getElementById('alerts-list');
-            alertsListElement.innerHTML = '';
-            
-            console.log('Received alerts:', alerts); // Debug log for all alerts
-            
-            alerts.forEach(detection => {
-                console.log('Processing timestamp:', detection.timestamp); // Debug log for each timestamp
-                const formattedTime = formatTimestamp(detection.timestamp);
-                console.log('Formatted timestamp:', formattedTime); // Debug log for formatted time
-                
-                const confidenceClass = getConfidenceClass(detection.confidence);
-                const detectionElement = document.createElement('div');
-                detectionElement.className = `detection-item ${confidenceClass}`;
-                
-                detectionElement.innerHTML = `
-                    <h3>${formatBehaviorType(detection.behavior_type)}</h3>
-                    <p>Confidence: ${(detection.confidence * 100).toFixed(1)}%</p>
-                    <p>Time: ${formattedTime}</p>
-                    ${detection.details ? `<p>${detection.details}</p>` : ''}
-                `;
-                
-                // Add click event listener to show the image
-                if (detection.frame_path) {
-                    detectionElement.addEventListener('click', () => {
-                        showAlertImage(detection.frame_path);
-                    });
-                }
-                
-                alertsListElement.appendChild(detectionElement);
-            });
+        .then(page => {
+            // Ignore responses for a filter the user has since changed
+            if (selectedBehavior !== alertsFilter) {
+                return;
+            }
+
+            // The first page is newest first; deltas are oldest first, so
+            // each new one goes on top, while rows already listed, repeated
+            // or changed, are redrawn in place
+            const onTop = lastAlertId !== null;
+            page.alerts.forEach(detection => renderDetection(detection, onTop));
+
+            lastAlertId = page.last_id === null ? 0 : page.last_id;
+            if (page.updated_after) {
+                alertsUpdatedAfter = page.updated_after;
+            }
+            if (page.has_more) {
+                setTimeout(updateDetections, 0);
+            }
         })
-        .catch(error => console.error('Error fetching alerts:', error));
+        .catch(error => console.error('Error fetching alerts:', error))
+        .finally(() => {
+            alertsRequestInFlight = false;
+        });
+}
+
+function createDetectionElement(detection) {
+    const formattedTime = formatTimestamp(detection.timestamp);
+
+    const confidenceClass = getConfidenceClass(detection.confidence);
+    const detectionElement = document.createElement('div');
+    detectionElement.className = `detection-item ${confidenceClass}`;
+    detectionElement.dataset.key = detectionKey(detection);
+
+    // Small cached thumbnail; the full frame only loads when clicked
+    const thumbnail = detection.frame_path
+        ? `<img class="detection-thumbnail" loading="lazy" alt=""
+              src="/detected_frames/thumbs/${detection.frame_path.split('/').pop()}"
+              onerror="this.remove()">`
+        : '';
+
+    detectionElement.innerHTML = `
+        ${thumbnail}
+        <h3>${formatBehaviorType(detection.behavior_type)}</h3>
+        <p>Confidence: ${(detection.confidence * 100).toFixed(1)}%</p>
+        <p>Time: ${formattedTime}</p>
+        ${detection.details ? `<p>${detection.details}</p>` : ''}
+    `;
+
+    // Add click event listener to show the image
+    if (detection.frame_path) {
+        detectionElement.addEventListener('click', () => {
+            showAlertImage(detection.frame_path);
+        });
+    }
+
+    return detectionElement;
+}
+
+// Identifies a detection both as pushed over SSE, which happens before the
+// database assigns its id, and as a row fetched from the alerts endpoints
+function detectionKey(detection) {
+    if (detection.episode_id) {
+        return detection.episode_id;
+    }
+    return [detection.timestamp, detection.behavior_type, detection.source_id]
+        .join('|');
+}
+
+// An episode is reported when it opens and again as it grows, and polling
+// may fetch rows already pushed live, so a detection whose key is listed
+// replaces its element instead of appearing twice
+function renderDetection(detection, onTop) {
+    const alertsListElement = document.getElementById('alerts-list');
+    const element = createDetectionElement(detection);
+    const existing = Array.from(alertsListElement.children).find(
+        child => child.dataset.key === element.dataset.key
+    );
+    if (existing) {
+        existing.replaceWith(element);
+    } else if (onTop) {
+        alertsListElement.insertBefore(element, alertsListElement.firstChild);
+    } else {
+        alertsListElement.appendChild(element);
+    }
 }
 
 // Function to display the selected alert image
@@ -99,11 +183,62 @@ function showAlertImage(framePath) {
     img.onerror = (e) => console.error('Error loading image:', e);
 }
 
+// While the /events stream is connected, new alerts arrive over SSE and
+// polling is only needed when the filter changes
+let liveAlerts = false;
+
+function pollDetections() {
+    const selectedBehavior = document.getElementById('behaviorFilter').value;
+    if (liveAlerts && selectedBehavior === alertsFilter) {
+        return;
+    }
+    updateDetections();
+}
+
+function prependLiveDetection(detection) {
+    if (alertsFilter !== 'all' && detection.behavior_type !== alertsFilter) {
+        return;
+    }
+    renderDetection(detection, true);
+}
+
+function connectEvents() {
+    if (!window.EventSource) {
+        return;
+    }
+
+    const eventSource = new EventSource('/events');
+
+    eventSource.addEventListener('open', () => {
+        liveAlerts = true;
+        // Rebuild the list from the database once, covering anything
+        // missed while disconnected; the stream carries everything after
+        alertsFilter = null;
+        updateDetections();
+    });
+
+    eventSource.addEventListener('detection', (e) => {
+        prependLiveDetection(JSON.parse(e.data));
+    });
+
+    eventSource.addEventListener('processing', (e) => {
+        document.dispatchEvent(
+            new CustomEvent('processing-status', { detail: JSON.parse(e.data) })
+        );
+    });
+
+    eventSource.addEventListener('error', () => {
+        // EventSource reconnects on its own; poll until it does
+        liveAlerts = false;
+    });
+}
+
 // Update detections every 5 seconds
-setInterval(updateDetections, 5000);
+setInterval(pollDetections, 5000);
 
 // Initial update
 updateDetections();
+connectEvents();
 
 function getConfidenceClass(confidence) {
     if (confidence > 0.8) return 'confidence-high';
@@ -208,30 +343,13 @@ document.addEventListener('DOMContentLoaded', function() {
             if (!response.ok) {
                 throw new Error('Upload failed');
             }
-            
+            const { job_id: jobId } = await response.json();
+
             // Show processed video feed and start polling for progress
             videoFeed.style.display = 'block';
-            videoFeed.src = '/video_feed?source=processed';
-            
-            // Start polling for both progress and alerts
-            pollProcessingStatus();
-            
-            // Increase alert polling frequency during video processing
-            const alertUpdateInterval = setInterval(updateDetections, 1000); // Update every second
-            
-            // Once processing is complete, revert to normal polling frequency
-            const checkComplete = setInterval(() => {
-                fetch('/processing-status')
-                    .then(response => response.json())
-                    .then(data => {
-                        if (!data.active) {
-                            clearInterval(alertUpdateInterval);
-                            clearInterval(checkComplete);
-                            // Revert to normal polling frequency
-                            setInterval(updateDetections, 5000);
-                        }
-                    });
-            }, 1000);
+            videoFeed.src = `/jobs/${jobId}/video_feed`;
+
+            watchProcessingStatus(jobId);
 
         } catch (error) {
             console.error('Error uploading video:', error);
@@ -241,32 +359,60 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     });
 
-    // Poll for processing status
-    function pollProcessingStatus() {
+    // Follow processing status, over SSE when connected, otherwise by polling
+    function watchProcessingStatus(jobId) {
+        // Increase alert polling frequency during video processing
+        const alertUpdateInterval = setInterval(pollDetections, 1000);
+
+        if (liveAlerts) {
+            const onStatus = (e) => {
+                // Other uploads may be processed at the same time
+                if (e.detail.job_id !== jobId) {
+                    return;
+                }
+                if (handleProcessingStatus(e.detail)) {
+                    document.removeEventListener('processing-status', onStatus);
+                    clearInterval(alertUpdateInterval);
+                }
+            };
+            document.addEventListener('processing-status', onStatus);
+            return;
+        }
+
         const interval = setInterval(async () => {
             try {
-                const response = await fetch('/processing-status');
+                const response = await fetch(`/processing-status?job_id=${jobId}`);
                 const data = await response.json();
 
-                progressBar.style.width = `${data.progress}%`;
-                progressText.textContent = `${data.progress}% - ${data.status}`;
-
-                if (!data.active && data.progress === 100) {
-                    clearInterval(interval);
-                    alert('Video processing complete!');
-                    progressSection.style.display = 'none';
-                    // Refresh alerts to show new detections
-                    updateDetections();
-                } else if (!data.active) {
+                if (handleProcessingStatus(data)) {
                     clearInterval(interval);
-                    alert('Video processing failed: ' + data.status);
-                    progressSection.style.display = 'none';
+                    clearInterval(alertUpdateInterval);
                 }
             } catch (error) {
                 console.error('Error checking processing status:', error);
                 clearInterval(interval);
+                clearInterval(alertUpdateInterval);
                 progressSection.style.display = 'none';
             }
         }, 1000); // Check every second
     }
+
+    // Update the progress bar; returns true once processing has finished
+    function handleProcessingStatus(data) {
+        progressBar.style.width = `${data.progress}%`;
+        progressText.textContent = `${data.progress}% - ${data.status}`;
+
+        if (!data.active && data.progress === 100) {
+            alert('Video processing complete!');
+            progressSection.style.display = 'none';
+            // Refresh alerts to show new detections
+            pollDetections();
+            return true;
+        } else if (!data.active) {
+            alert('Video processing failed: ' + data.status);
+            progressSection.style.display = 'none';
+            return true;
+        }
+        return false;
+    }
 });
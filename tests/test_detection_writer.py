@@ -0,0 +1,99 @@
+import threading
+import time
+from datetime import datetime
+from src.database.detection_writer import DetectionWriter
+
+
+class ConnectionLost(Exception):
+    pass
+
+
+class FakeDB:
+    """Stands in for DBManager; rejects rows whose source_id is too long"""
+
+    TRANSIENT_ERRORS = (ConnectionLost,)
+
+    def __init__(self):
+        self.rows = []
+        self.down = False
+        self.lock = threading.Lock()
+
+    def store_detections(self, rows):
+        if self.down:
+            raise ConnectionLost("server closed the connection")
+        if any(len(row.get("source_id") or "") > 64 for row in rows):
+            raise ValueError("value too long for type character varying(64)")
+        with self.lock:
+            self.rows.extend(rows)
+
+
+def enqueue(writer, source_id, n):
+    writer.enqueue(
+        timestamp=datetime.now(),
+        behavior_type="phone_usage",
+        confidence=0.9,
+        frame_path=f"frame_{n}.jpg",
+        source_id=source_id,
+    )
+
+
+def test_poison_row_does_not_block_later_rows():
+    db = FakeDB()
+    writer = DetectionWriter(db, batch_size=100, flush_interval=60)
+    for n in range(10):
+        enqueue(writer, "camera", n)
+    enqueue(writer, "x" * 80, 10)
+    for n in range(11, 21):
+        enqueue(writer, "camera", n)
+
+    writer.flush()
+    enqueue(writer, "camera", 21)
+    writer.flush()
+    writer.shutdown()
+
+    stats = writer.get_stats()
+    assert stats["rejected"] == 1
+    assert stats["written"] == 21
+    assert stats["queue_depth"] == 0
+    # Rows keep their order around the one that was dropped
+    assert [row["frame_path"] for row in db.rows] == [
+        f"frame_{n}.jpg" for n in range(22) if n != 10
+    ]
+
+
+def test_transient_error_requeues_the_batch():
+    db = FakeDB()
+    writer = DetectionWriter(db, batch_size=100, flush_interval=60)
+    for n in range(5):
+        enqueue(writer, "camera", n)
+
+    db.down = True
+    writer.flush()
+    stats = writer.get_stats()
+    assert stats["queue_depth"] == 5
+    assert stats["failed_flushes"] == 1
+    assert stats["rejected"] == 0
+
+    db.down = False
+    writer.flush()
+    writer.shutdown()
+    assert [row["frame_path"] for row in db.rows] == [
+        f"frame_{n}.jpg" for n in range(5)
+    ]
+
+
+def test_partial_batch_is_written_after_the_flush_interval():
+    db = FakeDB()
+    writer = DetectionWriter(db, batch_size=100, flush_interval=0.2)
+    # Let the writer thread start waiting on an empty buffer
+    time.sleep(0.05)
+    enqueue(writer, "camera", 0)
+
+    deadline = time.monotonic() + 2.0
+    while not db.rows and time.monotonic() < deadline:
+        time.sleep(0.02)
+    # Checked before shutdown, which would flush the row anyway
+    written = [row["frame_path"] for row in db.rows]
+    writer.shutdown()
+
+    assert written == ["frame_0.jpg"]
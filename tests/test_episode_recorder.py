@@ -0,0 +1,51 @@
+import os
+from datetime import datetime, timedelta
+from src.detectors.episode_recorder import EpisodeRecorder
+from src.detectors.event_aggregator import EventAggregator
+from src.utils.evidence_writer import EvidenceWriter
+
+START = datetime(2024, 5, 1, 9, 0, 0)
+
+
+def test_new_peak_replaces_the_episode_evidence_file(tmp_path):
+    writer = EvidenceWriter(str(tmp_path))
+    events = []
+    recorder = EpisodeRecorder(
+        writer, None, publish=lambda kind, data: events.append(data)
+    )
+    episodes = EventAggregator(update_interval=1.0)
+    detection = {"behavior_type": "phone_usage", "bbox": [0, 0, 10, 10]}
+
+    (episode,) = episodes.update(
+        START, [{**detection, "confidence": 0.7}], lambda: b"first"
+    )
+    recorder.record(episode)
+    writer.flush()
+    first_path = episode.frame_path
+    assert os.path.exists(first_path)
+
+    # A new peak is saved under a new name and the old file goes away
+    reported = episodes.update(
+        START + timedelta(seconds=1),
+        [{**detection, "confidence": 0.9}],
+        lambda: b"peak",
+    )
+    assert reported == [episode]
+    recorder.record(episode)
+    writer.flush()
+
+    assert episode.frame_path != first_path
+    assert os.listdir(tmp_path) == [os.path.basename(episode.frame_path)]
+    with open(episode.frame_path, "rb") as f:
+        assert f.read() == b"peak"
+    assert [event["frame_path"] for event in events] == [
+        os.path.basename(first_path),
+        os.path.basename(episode.frame_path),
+    ]
+
+    # Reports without a new peak keep the file
+    (episode,) = episodes.flush()
+    recorder.record(episode)
+    writer.flush()
+    assert events[-1]["state"] == "closed"
+    assert events[-1]["frame_path"] == events[-2]["frame_path"]
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from src.detectors.event_aggregator import EventAggregator
+
+START = datetime(2024, 5, 1, 9, 0, 0)
+
+
+def phone(confidence=0.9):
+    return {
+        "behavior_type": "phone_usage",
+        "confidence": confidence,
+        "bbox": [10, 10, 50, 50],
+    }
+
+
+def at(seconds):
+    return START + timedelta(seconds=seconds)
+
+
+def test_episode_is_reported_when_it_opens_grows_and_closes():
+    episodes = EventAggregator(max_gap=2.0, update_interval=5.0)
+
+    opened = episodes.update(at(0), [phone()], lambda: b"jpeg")
+    assert len(opened) == 1
+    episode = opened[0]
+    assert not episode.closed
+
+    # Nothing new to report until update_interval of the episode has passed
+    for second in range(1, 5):
+        assert episodes.update(at(second), [phone()], lambda: b"jpeg") == []
+    assert episodes.update(at(5), [phone()], lambda: b"jpeg") == [episode]
+
+    # Gone for longer than max_gap: the same episode is reported closed
+    assert episodes.update(at(6), [phone()], lambda: b"jpeg") == []
+    assert episodes.update(at(9), [], lambda: b"jpeg") == [episode]
+    assert episode.closed
+    assert episode.to_detection()["episode_id"] == episode.id
+    assert episode.frame_count == 7
+
+    stats = episodes.get_stats()
+    assert stats["episodes_opened"] == 1
+    assert stats["episodes_closed"] == 1
+
+
+def test_new_peak_marks_the_evidence_for_saving_again():
+    episodes = EventAggregator(update_interval=0)
+    (episode,) = episodes.update(at(0), [phone(0.7)], lambda: b"first")
+    episode.frame_path = "detected_frames/first.jpg"
+    episode.evidence_saved = True
+
+    # Without periodic updates, only opening and closing are reported
+    assert episodes.update(at(1), [phone(0.95)], lambda: b"peak") == []
+    assert episode.evidence == b"peak"
+    assert not episode.evidence_saved
+    # Kept so the new file can replace it
+    assert episode.frame_path == "detected_frames/first.jpg"
+
+    assert episodes.flush() == [episode]
+    assert episode.closed
+
+
+def test_boxless_detection_does_not_join_a_boxed_episode():
+    episodes = EventAggregator()
+    (boxed,) = episodes.update(at(0), [phone()], lambda: b"jpeg")
+    boxless = {"behavior_type": "phone_usage", "confidence": 0.9}
+
+    (opened,) = episodes.update(at(1), [boxless], lambda: b"jpeg")
+    assert opened is not boxed
+    assert boxed.frame_count == 1
+
+    # Two boxless detections of a type still form one episode
+    assert episodes.update(at(2), [boxless], lambda: b"jpeg") == []
+    assert opened.frame_count == 2
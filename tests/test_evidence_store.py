@@ -0,0 +1,46 @@
+import os
+import time
+from src.utils.evidence_store import EvidenceStore
+
+
+def write_frame(directory, name, size, age):
+    path = os.path.join(directory, name)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def make_store(directory, **kwargs):
+    store = EvidenceStore(str(directory), sweep_interval=3600, **kwargs)
+    # Sweep by hand only
+    store.shutdown()
+    return store
+
+
+def test_sweep_spares_frames_younger_than_min_age(tmp_path):
+    cleared = []
+    store = make_store(tmp_path, max_bytes=1500, min_age=60, on_evict=cleared.extend)
+    write_frame(tmp_path, "old.jpg", 1000, age=3600)
+    write_frame(tmp_path, "older.jpg", 1000, age=7200)
+    # Newest, and its row may still be queued in the detection writer
+    write_frame(tmp_path, "new.jpg", 1000, age=1)
+
+    evicted = store.sweep()
+
+    assert sorted(evicted) == ["old.jpg", "older.jpg"]
+    assert cleared == evicted
+    assert os.listdir(tmp_path / "thumbs") == []
+    assert sorted(os.listdir(tmp_path)) == ["new.jpg", "thumbs"]
+
+
+def test_views_of_missing_frames_are_forgotten(tmp_path):
+    store = make_store(tmp_path, max_bytes=0, min_age=0)
+    write_frame(tmp_path, "kept.jpg", 10, age=0)
+    store.touch("kept.jpg")
+    store.touch("never_existed.jpg")
+    store.touch("../outside.jpg")
+
+    store.sweep()
+
+    assert list(store.last_access) == ["kept.jpg"]
@@ -0,0 +1,65 @@
+import threading
+import time
+from src.utils.frame_broadcaster import FrameBroadcaster
+
+
+def part(jpeg):
+    return b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+
+
+def test_slow_viewer_gets_the_newest_frame():
+    broadcaster = FrameBroadcaster()
+    broadcaster.publish(b"a")
+    slow = broadcaster.stream()
+    fast = broadcaster.stream()
+    # Both start from the frame on screen
+    assert next(slow) == part(b"a")
+    assert next(fast) == part(b"a")
+
+    for jpeg in (b"b", b"c", b"d"):
+        broadcaster.publish(jpeg)
+        assert next(fast) == part(jpeg)
+
+    # The slow viewer skips straight to the latest frame
+    assert next(slow) == part(b"d")
+    stats = broadcaster.get_stats()
+    assert stats["viewers"] == 2
+    assert stats["frames_published"] == 4
+    assert stats["frames_sent"] == 6
+    assert stats["frames_skipped"] == 2
+
+
+def test_close_wakes_and_ends_waiting_viewers():
+    broadcaster = FrameBroadcaster()
+    broadcaster.publish(b"a")
+    received = []
+
+    def watch():
+        # A long wait timeout, so only close() can end the wait in time
+        for chunk in broadcaster.stream(wait_timeout=30):
+            received.append(chunk)
+
+    viewers = [threading.Thread(target=watch, daemon=True) for _ in range(3)]
+    for viewer in viewers:
+        viewer.start()
+    deadline = time.monotonic() + 5
+    while len(received) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    broadcaster.close()
+    for viewer in viewers:
+        viewer.join(timeout=5)
+        assert not viewer.is_alive()
+    assert received == [part(b"a")] * 3
+    assert broadcaster.viewer_count() == 0
+
+
+def test_last_frame_is_still_sent_after_close():
+    broadcaster = FrameBroadcaster()
+    viewer = broadcaster.stream()
+    broadcaster.publish(b"a")
+    assert next(viewer) == part(b"a")
+
+    broadcaster.publish(b"final")
+    broadcaster.close()
+    assert list(viewer) == [part(b"final")]
@@ -0,0 +1,29 @@
+import numpy as np
+from src.utils.frame_context import FrameContext, letterbox, unletterbox_box
+
+
+def test_stride_letterbox_pads_only_to_the_next_multiple():
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    square, _ = letterbox(frame, 640)
+    assert square.shape == (3, 640, 640)
+
+    blob, transform = letterbox(frame, 640, stride=32)
+    assert blob.shape == (3, 480, 640)
+    assert transform == (1.0, 0, 0)
+
+    # 1280x720 at 640 is 640x360, padded to 640x384
+    blob, (ratio, left, top) = letterbox(
+        np.zeros((720, 1280, 3), dtype=np.uint8), 640, stride=32
+    )
+    assert blob.shape == (3, 384, 640)
+    assert (ratio, left, top) == (0.5, 0, 12)
+    box = unletterbox_box([100, 112, 200, 212], (ratio, left, top), (720, 1280))
+    assert box == [200.0, 200.0, 400.0, 400.0]
+
+
+def test_letterboxed_views_are_cached_per_stride():
+    context = FrameContext(np.zeros((480, 640, 3), dtype=np.uint8))
+    rect = context.letterboxed(640, 32)
+    assert context.letterboxed(640, 32) is rect
+    assert context.letterboxed(640)[0].shape == (3, 640, 640)
@@ -0,0 +1,66 @@
+import numpy as np
+from src.utils.inference_backends import ExportedBackend
+
+# 1280x720 frame letterboxed to 640x384: half size, 12 rows of padding on top
+SHAPE = (720, 1280, 3)
+TRANSFORM = (0.5, 0, 12)
+
+
+def raw_output(anchors, classes=3):
+    """
+    Raw (4 + classes, anchors) YOLOv8 output from (cx, cy, w, h, class_id,
+    score) anchors on the letterboxed input
+    """
+    output = np.zeros((4 + classes, len(anchors)), dtype=np.float32)
+    for i, (cx, cy, w, h, class_id, score) in enumerate(anchors):
+        output[:4, i] = (cx, cy, w, h)
+        output[4 + class_id, i] = score
+    return output
+
+
+def postprocess(output):
+    backend = object.__new__(ExportedBackend)
+    return backend._postprocess(output, TRANSFORM, SHAPE)
+
+
+def test_overlapping_boxes_are_suppressed_per_class():
+    output = raw_output(
+        [
+            (150, 162, 100, 100, 0, 0.9),
+            # Mostly the same box and class, but less confident
+            (155, 162, 100, 100, 0, 0.8),
+            # Same box, other class: kept
+            (150, 162, 100, 100, 1, 0.6),
+            # Below the confidence threshold
+            (300, 162, 50, 50, 2, 0.1),
+            # Same class elsewhere
+            (400, 162, 40, 40, 0, 0.7),
+        ]
+    )
+
+    detections = postprocess(output)
+
+    assert [(class_id, round(conf, 2)) for class_id, conf, _ in detections] == [
+        (0, 0.9),
+        (0, 0.7),
+        (1, 0.6),
+    ]
+    # Boxes are mapped back from the letterboxed input to the frame
+    assert [bbox for _, _, bbox in detections] == [
+        [200.0, 200.0, 400.0, 400.0],
+        [760.0, 260.0, 840.0, 340.0],
+        [200.0, 200.0, 400.0, 400.0],
+    ]
+
+
+def test_boxes_reaching_into_the_padding_are_clipped_to_the_frame():
+    # Starts in the top padding rows and runs past the right edge
+    output = raw_output([(630, 20, 40, 40, 0, 0.9)])
+
+    ((_, _, bbox),) = postprocess(output)
+
+    assert bbox == [1220.0, 0.0, 1280.0, 56.0]
+
+
+def test_nothing_above_the_confidence_threshold():
+    assert postprocess(raw_output([(150, 162, 100, 100, 0, 0.2)])) == []
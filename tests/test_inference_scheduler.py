@@ -0,0 +1,95 @@
+import threading
+import pytest
+from src.utils.inference_scheduler import InferenceScheduler
+
+
+class GatedDetector:
+    """
+    Stands in for ObjectDetector; holds its first batch until released, so
+    the test can queue frames while the scheduler is busy
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.busy = threading.Event()
+        self.release = threading.Event()
+
+    def detect_objects_batch(self, frames, imgsz=None):
+        self.batches.append((list(frames), imgsz))
+        self.busy.set()
+        self.release.wait(timeout=5)
+        return [f"objects:{frame}" for frame in frames]
+
+    def detect_cheating_batch(self, frames, imgsz=None):
+        return [f"cheating:{frame}" for frame in frames]
+
+
+def start_busy(max_batch):
+    detector = GatedDetector()
+    scheduler = InferenceScheduler(detector, max_batch=max_batch)
+    first = scheduler.submit("warmup", "w0")
+    assert detector.busy.wait(timeout=5)
+    return detector, scheduler, first
+
+
+def test_sources_are_served_round_robin_in_batches():
+    detector, scheduler, first = start_busy(max_batch=3)
+    # A fast source queues many frames before two slow ones queue one each
+    futures = [scheduler.submit("fast", f"f{i}") for i in range(5)]
+    futures.append(scheduler.submit("slow1", "s1"))
+    futures.append(scheduler.submit("slow2", "s2"))
+    detector.release.set()
+
+    results = [future.result(timeout=5) for future in [first] + futures]
+    scheduler.shutdown()
+
+    # Every caller gets the results of its own frame
+    frames = ["w0", "f0", "f1", "f2", "f3", "f4", "s1", "s2"]
+    assert results == [(f"objects:{f}", f"cheating:{f}") for f in frames]
+    # The slow sources share the first batch after the warmup instead of
+    # waiting behind all of the fast source's frames
+    assert [batch for batch, _ in detector.batches] == [
+        ["w0"],
+        ["f0", "s1", "s2"],
+        ["f1", "f2", "f3"],
+        ["f4"],
+    ]
+    stats = scheduler.get_stats()
+    assert stats["batches"] == 4
+    assert stats["served"] == {"warmup": 1, "fast": 5, "slow1": 1, "slow2": 1}
+    assert stats["pending"] == {}
+
+
+def test_batches_only_mix_frames_of_one_input_size():
+    detector, scheduler, first = start_busy(max_batch=4)
+    small = scheduler.submit("a", "a0", imgsz=320)
+    full = scheduler.submit("b", "b0")
+    small_too = scheduler.submit("c", "c0", imgsz=320)
+    detector.release.set()
+
+    for future in (first, small, full, small_too):
+        future.result(timeout=5)
+    scheduler.shutdown()
+
+    # b keeps its turn and goes first once the 320 batch is done
+    assert detector.batches == [(["w0"], None), (["a0", "c0"], 320), (["b0"], None)]
+
+
+def test_failed_batch_fails_its_callers_only():
+    detector, scheduler, first = start_busy(max_batch=2)
+
+    def broken(frames, imgsz=None):
+        raise RuntimeError("model failed")
+
+    detector.detect_cheating_batch = broken
+    future = scheduler.submit("a", "a0")
+    detector.release.set()
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        first.result(timeout=5)
+    with pytest.raises(RuntimeError, match="model failed"):
+        future.result(timeout=5)
+
+    scheduler.shutdown()
+    with pytest.raises(RuntimeError):
+        scheduler.submit("a", "a1")
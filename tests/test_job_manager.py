@@ -0,0 +1,83 @@
+import os
+import time
+import pytest
+from src.jobs.job_manager import JobManager
+
+
+def run_job(job, reporter):
+    """Job target; spawned workers import it from this module"""
+    if job["action"] == "crash":
+        os._exit(3)
+    if job["action"] == "wait_for_cancel":
+        while not reporter.cancelled():
+            time.sleep(0.01)
+        return {"stopped": True}
+    return {"value": job["value"]}
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def manager():
+    managers = []
+
+    def start(**kwargs):
+        jobs = JobManager(run_job, workers=1, **kwargs)
+        managers.append(jobs)
+        return jobs
+
+    yield start
+    for jobs in managers:
+        jobs.shutdown()
+
+
+def test_cancel_stops_running_and_queued_jobs(manager):
+    jobs = manager()
+    running = jobs.submit({"action": "wait_for_cancel"})
+    queued = jobs.submit({"action": "value", "value": 1})
+    assert wait_for(lambda: jobs.get(running["id"])["status"] == "running")
+
+    # The queued job is skipped by the worker instead of being run
+    assert jobs.cancel(queued["id"])
+    assert jobs.cancel(running["id"])
+    assert wait_for(lambda: jobs.get(queued["id"])["status"] == "cancelled")
+    assert jobs.get(running["id"])["status"] == "cancelled"
+    assert jobs.get(running["id"])["summary"] == {"stopped": True}
+    assert jobs.get(queued["id"])["summary"] is None
+
+    assert not jobs.cancel("unknown")
+    # Cancelling a finished job is a no-op
+    assert jobs.cancel(running["id"])
+    assert jobs.get(running["id"])["status"] == "cancelled"
+
+
+def test_crashed_worker_fails_its_job_and_is_replaced(manager):
+    jobs = manager()
+    crashed = jobs.submit({"action": "crash"})
+    assert wait_for(lambda: jobs.get(crashed["id"])["status"] == "failed")
+    assert jobs.get(crashed["id"])["error"] == "Worker exited with code 3"
+
+    # The replacement worker picks up the next job
+    after = jobs.submit({"action": "value", "value": 2})
+    assert wait_for(lambda: jobs.get(after["id"])["status"] == "completed")
+    assert jobs.get(after["id"])["summary"] == {"value": 2}
+    assert jobs.get_stats()["workers_alive"] == 1
+
+
+def test_only_the_newest_finished_jobs_are_kept(manager):
+    jobs = manager(max_finished=2)
+    submitted = [jobs.submit({"action": "value", "value": i}) for i in range(4)]
+    last = submitted[-1]["id"]
+    assert wait_for(lambda: (jobs.get(last) or {}).get("status") == "completed")
+
+    # One worker finishes jobs in submission order
+    assert [job["value"] for job in jobs.list()] == [2, 3]
+    assert jobs.get(submitted[0]["id"]) is None
+    assert jobs.get_stats()["jobs"] == {"completed": 2}
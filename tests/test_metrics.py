@@ -0,0 +1,64 @@
+import pytest
+from src.utils.metrics import Registry
+
+
+def test_registry_renders_the_prometheus_text_format():
+    registry = Registry()
+    errors = registry.counter("app_errors_total", "Errors by component", ["component"])
+    errors.inc(component="db")
+    errors.inc(2, component='say "hi"\\\nbye')
+    viewers = registry.gauge("app_viewers", "Connected viewers")
+    viewers.set(3)
+    viewers.dec()
+    latency = registry.histogram(
+        "app_seconds", "Latency", ["stage"], buckets=(1.0, 0.1)
+    )
+    for value in (0.05, 0.1, 0.5, 7.0):
+        latency.observe(value, stage="infer")
+    registry.callback(
+        "app_queue_depth", "Queued items", lambda: [({"queue": "writer"}, 4)]
+    )
+
+    assert registry.render() == (
+        "# HELP app_errors_total Errors by component\n"
+        "# TYPE app_errors_total counter\n"
+        'app_errors_total{component="db"} 1\n'
+        'app_errors_total{component="say \\"hi\\"\\\\\\nbye"} 2\n'
+        "# HELP app_viewers Connected viewers\n"
+        "# TYPE app_viewers gauge\n"
+        "app_viewers 2\n"
+        "# HELP app_seconds Latency\n"
+        "# TYPE app_seconds histogram\n"
+        # Cumulative counts per sorted bound, then +Inf, sum and count
+        'app_seconds_bucket{stage="infer",le="0.1"} 2\n'
+        'app_seconds_bucket{stage="infer",le="1.0"} 3\n'
+        'app_seconds_bucket{stage="infer",le="+Inf"} 4\n'
+        'app_seconds_sum{stage="infer"} 7.65\n'
+        'app_seconds_count{stage="infer"} 4\n'
+        "# HELP app_queue_depth Queued items\n"
+        "# TYPE app_queue_depth gauge\n"
+        'app_queue_depth{queue="writer"} 4\n'
+    )
+
+
+def test_failing_callback_is_left_out_of_the_scrape():
+    registry = Registry()
+
+    def broken():
+        raise RuntimeError("component is gone")
+
+    registry.callback("app_broken", "Always fails", broken)
+    registry.counter("app_total", "Still rendered").inc()
+
+    assert registry.render() == (
+        "# HELP app_total Still rendered\n"
+        "# TYPE app_total counter\n"
+        "app_total 1\n"
+    )
+
+
+def test_wrong_labels_are_rejected():
+    registry = Registry()
+    errors = registry.counter("app_errors_total", "Errors", ["component"])
+    with pytest.raises(ValueError, match="expects labels"):
+        errors.inc(stage="db")
@@ -0,0 +1,55 @@
+import numpy as np
+from src.utils.motion_gate import MotionGate
+
+
+def frame(value=100):
+    return np.full((480, 640, 3), value, dtype=np.uint8)
+
+
+def with_motion(region_value=255):
+    """A static frame with one student-sized patch changed"""
+    moved = frame()
+    moved[0:60, 0:80] = region_value
+    return moved
+
+
+def test_static_frames_are_skipped_and_motion_passes():
+    gate = MotionGate(threshold=8.0, max_stale_frames=100)
+    assert gate.should_process(frame())
+    assert not gate.should_process(frame())
+    # A slight brightness change everywhere stays under the threshold
+    assert not gate.should_process(frame(104))
+
+    # A change confined to one grid region counts, though averaged over the
+    # whole frame it would stay under the threshold
+    assert gate.should_process(with_motion())
+    # The moved frame is the new reference
+    assert not gate.should_process(with_motion())
+
+
+def test_full_pass_is_forced_after_max_stale_frames():
+    gate = MotionGate(max_stale_frames=3)
+    decisions = [gate.should_process(frame()) for _ in range(9)]
+
+    assert decisions == [True, False, False, False, True, False, False, False, True]
+    stats = gate.get_stats()
+    assert stats["forced_passes"] == 2
+
+
+def test_stats_count_every_decision():
+    gate = MotionGate(max_stale_frames=3)
+    for image in [frame(), frame(), with_motion(), frame(), frame(), frame()]:
+        gate.should_process(image)
+
+    # Passes: the first frame, the motion and the change back
+    assert gate.get_stats() == {
+        "frames_seen": 6,
+        "frames_skipped": 3,
+        "full_passes": 3,
+        "forced_passes": 0,
+        "skip_ratio": 0.5,
+    }
+
+    gate.reset()
+    assert gate.should_process(frame())
+    assert gate.get_stats()["full_passes"] == 4
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("mediapipe")
+
+from src.utils.pose_analyzer import head_orientation  # noqa: E402
+
+WIDTH = 640
+
+
+def face(nose, forehead, chin, left_ear, right_ear, left_eye, right_eye):
+    """(478, 3) landmarks in pixels with only the ones head_orientation reads"""
+    points = np.zeros((478, 3), dtype=np.float32)
+    for index, point in (
+        (1, nose),
+        (10, forehead),
+        (152, chin),
+        (234, left_ear),
+        (454, right_ear),
+        (33, left_eye),
+        (263, right_eye),
+    ):
+        points[index] = point
+    return points
+
+
+FACES = {
+    "straight": face(
+        (320, 240, 0.0),
+        (320, 160, 0.0),
+        (320, 320, 0.0),
+        (240, 230, 0.0),
+        (400, 230, 0.0),
+        (280, 210, 0.0),
+        (360, 210, 0.0),
+    ),
+    "left": face(
+        (270, 240, -0.05),
+        (300, 160, 0.0),
+        (300, 320, 0.0),
+        (250, 230, 0.08),
+        (400, 230, -0.02),
+        (255, 210, 0.02),
+        (320, 210, -0.01),
+    ),
+    "right": face(
+        (370, 240, -0.05),
+        (340, 160, 0.0),
+        (340, 320, 0.0),
+        (240, 230, -0.02),
+        (390, 230, 0.08),
+        (320, 210, -0.01),
+        (385, 210, 0.02),
+    ),
+    "down": face(
+        (350, 280, -0.05),
+        (300, 160, 0.0),
+        (400, 300, 0.0),
+        (270, 250, 0.0),
+        (430, 250, 0.0),
+        (310, 220, 0.0),
+        (390, 220, 0.0),
+    ),
+}
+
+
+def reference_orientation(points):
+    """The per-landmark checks head_orientation replaced, on landmark dicts"""
+    landmarks = [{"x": x, "y": y, "z": z} for x, y, z in points.tolist()]
+
+    nose, left_ear, right_ear = landmarks[1], landmarks[234], landmarks[454]
+    left_eye, right_eye = landmarks[33], landmarks[263]
+    left_dist = np.sqrt(
+        (nose["x"] - left_ear["x"]) ** 2 + (nose["y"] - left_ear["y"]) ** 2
+    )
+    right_dist = np.sqrt(
+        (nose["x"] - right_ear["x"]) ** 2 + (nose["y"] - right_ear["y"]) ** 2
+    )
+    eye_dist = np.sqrt(
+        (left_eye["x"] - right_eye["x"]) ** 2 + (left_eye["y"] - right_eye["y"]) ** 2
+    )
+    ear_ratio = min(left_dist, right_dist) / max(left_dist, right_dist)
+    z_diff = abs(left_ear["z"] - right_ear["z"])
+    looking_sideways = ear_ratio < 0.75 and z_diff > 0.05 and eye_dist < 100
+
+    forehead, chin = landmarks[10], landmarks[152]
+    face_vector = np.array([chin["x"] - forehead["x"], chin["y"] - forehead["y"]])
+    face_vector = face_vector / np.linalg.norm(face_vector)
+    angle = np.degrees(np.arccos(np.clip(np.dot(face_vector, [0, 1]), -1.0, 1.0)))
+    face_length = np.sqrt(
+        (chin["y"] - forehead["y"]) ** 2 + (chin["x"] - forehead["x"]) ** 2
+    )
+    nose_position = (nose["y"] - forehead["y"]) / face_length
+    looking_down = angle > 30 and nose_position > 0.6
+
+    return looking_sideways, looking_down
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("straight", (False, False)),
+        ("left", (True, False)),
+        ("right", (True, False)),
+        ("down", (False, True)),
+    ],
+)
+def test_head_orientation_matches_the_per_landmark_checks(name, expected):
+    points = FACES[name]
+    orientation = head_orientation(points[None], WIDTH)
+
+    result = (
+        bool(orientation["looking_sideways"][0]),
+        bool(orientation["looking_down"][0]),
+    )
+    assert result == expected
+    assert reference_orientation(points) == expected
+
+
+def test_stacked_faces_are_classified_independently():
+    names = list(FACES)
+    orientation = head_orientation(np.stack([FACES[n] for n in names]), WIDTH)
+
+    for i, name in enumerate(names):
+        assert (
+            bool(orientation["looking_sideways"][i]),
+            bool(orientation["looking_down"][i]),
+        ) == reference_orientation(FACES[name])
+    # Turned in opposite directions, so the yaw estimates have opposite signs
+    yaw = dict(zip(names, orientation["yaw"]))
+    assert yaw["left"] * yaw["right"] < 0
+    assert abs(yaw["straight"]) < 1
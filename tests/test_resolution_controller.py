@@ -0,0 +1,58 @@
+from src.utils.resolution_controller import ResolutionController
+
+
+def controller(**kwargs):
+    options = {"target_ms": 100.0, "smoothing": 1.0, "cooldown_frames": 5}
+    options.update(kwargs)
+    return ResolutionController(**options)
+
+
+def feed(resolution, latency_ms, frames):
+    """Record frames of one latency; returns the input sizes it switched to"""
+    changes = [resolution.record(latency_ms / 1000.0) for _ in range(frames)]
+    return [change["imgsz"] for change in changes if change is not None]
+
+
+def test_steps_down_under_load_and_back_up_with_headroom():
+    resolution = controller()
+    assert resolution.current() == {"imgsz": 640, "pose_complexity": 1}
+
+    # One step per cooldown while too slow, stopping at the bottom
+    assert feed(resolution, 200, 30) == [512, 416, 320]
+    assert resolution.current() == {"imgsz": 320, "pose_complexity": 0}
+
+    assert feed(resolution, 40, 30) == [416, 512, 640]
+    stats = resolution.get_stats()
+    assert (stats["steps_down"], stats["steps_up"]) == (3, 3)
+
+
+def test_latency_inside_the_hysteresis_band_keeps_the_level():
+    resolution = controller()
+    feed(resolution, 200, 5)
+    assert resolution.current()["imgsz"] == 512
+
+    # Between headroom (70 ms) and tolerance (110 ms) of the target nothing
+    # changes, however long it lasts
+    for _ in range(20):
+        assert feed(resolution, 75, 3) == []
+        assert feed(resolution, 105, 3) == []
+    assert resolution.current()["imgsz"] == 512
+
+
+def test_cooldown_holds_the_level_right_after_a_change():
+    resolution = controller(cooldown_frames=10)
+    assert feed(resolution, 200, 10) == [512]
+
+    # A quick frame right away does not send it back up
+    assert feed(resolution, 20, 9) == []
+    assert feed(resolution, 20, 1) == [640]
+
+
+def test_smoothing_ignores_a_single_slow_frame():
+    resolution = controller(smoothing=0.2, cooldown_frames=1)
+    assert feed(resolution, 90, 10) == []
+
+    # One 150 ms frame only lifts the average to 102 ms
+    assert feed(resolution, 150, 1) == []
+    # Staying that slow crosses the 110 ms tolerance on the second frame
+    assert feed(resolution, 150, 1) == [512]
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from src.jobs.segments import merge_segments
+
+START = datetime(2024, 5, 1, 9, 0, 0)
+
+
+def episode(behavior, start, end, frames, confidence=0.8, bbox=None, episode_id=None):
+    """An episode detection as workers publish it"""
+    return {
+        "timestamp": (START + timedelta(seconds=start)).isoformat(),
+        "end_time": (START + timedelta(seconds=end)).isoformat(),
+        "behavior_type": behavior,
+        "confidence": confidence,
+        "bbox": bbox,
+        "details": f"{behavior} ({frames} frames over {end - start:.1f}s)",
+        "frame_count": frames,
+        "frame_index": int(start * 30),
+        "media_time": float(start),
+        "track_id": None,
+        "episode_id": episode_id,
+    }
+
+
+def test_episode_cut_by_a_boundary_is_merged():
+    first = episode(
+        "phone_usage", 50, 59.9, 100, 0.7, [10, 10, 50, 50], episode_id="first"
+    )
+    second = episode(
+        "phone_usage", 60.1, 65, 40, 0.9, [12, 10, 52, 50], episode_id="second"
+    )
+
+    (merged,) = merge_segments([[first], [second]], max_gap=2.0)
+
+    assert merged["timestamp"] == first["timestamp"]
+    assert merged["end_time"] == second["end_time"]
+    assert merged["frame_count"] == 140
+    assert merged["details"] == "phone_usage (140 frames over 15.0s)"
+    # Peak confidence and its box come from the stronger half, while its
+    # position and identity stay with the half that opened the episode
+    assert merged["confidence"] == 0.9
+    assert merged["bbox"] == [12, 10, 52, 50]
+    assert merged["media_time"] == 50.0
+    assert merged["episode_id"] == "first"
+
+
+def test_only_matching_episodes_across_the_boundary_are_merged():
+    segments = [
+        [
+            episode("phone_usage", 10, 20, 30, bbox=[0, 0, 10, 10]),
+            episode("looking_down", 55, 59.9, 20),
+            episode("phone_usage", 58, 59.9, 10, bbox=[100, 100, 150, 150]),
+        ],
+        [
+            # Different behavior right at the boundary
+            episode("book_usage", 60.0, 61, 5, bbox=[100, 100, 150, 150]),
+            # Frame-level behavior without boxes continues across it
+            episode("looking_down", 60.1, 62, 10),
+            # Same behavior, but too far from the phone episode that ended
+            episode("phone_usage", 63, 64, 5, bbox=[100, 100, 150, 150]),
+        ],
+    ]
+
+    merged = merge_segments(segments, max_gap=2.0, iou_threshold=0.3)
+
+    assert [(d["behavior_type"], d["frame_count"]) for d in merged] == [
+        ("phone_usage", 30),
+        ("looking_down", 30),
+        ("phone_usage", 10),
+        ("book_usage", 5),
+        ("phone_usage", 5),
+    ]
+    timestamps = [d["timestamp"] for d in merged]
+    assert timestamps == sorted(timestamps)
+
+
+def test_episode_spanning_several_segments_is_merged_into_one():
+    box = [10, 10, 50, 50]
+    segments = [
+        [episode("phone_usage", 50, 59.9, 100, bbox=box)],
+        [episode("phone_usage", 60, 119.9, 600, bbox=box)],
+        [episode("phone_usage", 120, 130, 100, bbox=box)],
+    ]
+
+    (merged,) = merge_segments(segments, max_gap=2.0)
+
+    assert merged["frame_count"] == 800
+    assert merged["end_time"] == segments[2][0]["end_time"]
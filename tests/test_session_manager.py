@@ -0,0 +1,94 @@
+import time
+import cv2
+import numpy as np
+import pytest
+from src.detectors.event_aggregator import EventAggregator
+from src.detectors.session_manager import SessionManager
+
+
+class FakeCamera:
+    """Stands in for cv2.VideoCapture on a camera that never runs out"""
+
+    def __init__(self, source):
+        self.opened = source != "missing"
+
+    def isOpened(self):
+        return self.opened
+
+    def set(self, prop, value):
+        return True
+
+    def read(self):
+        time.sleep(0.005)
+        return True, np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def release(self):
+        self.opened = False
+
+
+class FakeDetector:
+    def __init__(self):
+        self.frames = 0
+        self.shutdowns = 0
+
+    def process_frame(self, frame):
+        self.frames += 1
+        return []
+
+    def shutdown(self):
+        self.shutdowns += 1
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    monkeypatch.setattr(cv2, "VideoCapture", FakeCamera)
+    detectors = {}
+
+    def make_detector(session_id):
+        detectors[session_id] = FakeDetector()
+        return detectors[session_id]
+
+    manager = SessionManager(
+        make_detector,
+        EventAggregator,
+        lambda frame, detections: b"jpeg",
+        lambda session, episode: None,
+    )
+    yield manager, detectors
+    manager.shutdown()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_removing_a_source_shuts_its_detector_down(sessions):
+    manager, detectors = sessions
+    session = manager.add_source(0)
+    detector = detectors[session.id]
+    assert wait_for(lambda: detector.frames > 0)
+    assert detector.shutdowns == 0
+
+    manager.remove(session.id)
+    assert not session.is_running()
+    assert detector.shutdowns == 1
+    assert manager.get(session.id) is None
+
+
+def test_stopped_and_unopened_sources_shut_their_detectors_down(sessions):
+    manager, detectors = sessions
+    stopped = manager.add_source(0)
+    missing = manager.add_source("missing")
+
+    manager.stop(stopped.id)
+    assert stopped.status == "stopped"
+    assert detectors[stopped.id].shutdowns == 1
+
+    assert wait_for(lambda: not missing.is_running())
+    assert missing.status == "error: could not open source"
+    assert detectors[missing.id].shutdowns == 1
@@ -0,0 +1,70 @@
+from src.detectors.student_tracker import StudentTracker
+
+
+def person(x1, y1, x2, y2, confidence=0.9):
+    return {"bbox": [x1, y1, x2, y2], "confidence": confidence}
+
+
+def test_track_ids_stay_stable_while_students_move():
+    tracker = StudentTracker()
+    first = tracker.update([person(0, 0, 100, 200), person(300, 0, 400, 200)])
+    ids = [track.id for track in first]
+    assert ids == [1, 2]
+
+    # Both students drift a little each frame; the input order flips too
+    for step in range(1, 10):
+        seen = tracker.update(
+            [
+                person(300 + 3 * step, 0, 400 + 3 * step, 200),
+                person(2 * step, 0, 100 + 2 * step, 200),
+            ]
+        )
+        by_left = sorted(seen, key=lambda track: track.bbox[0])
+        assert [track.id for track in by_left] == ids
+
+    assert len(tracker.tracks) == 2
+
+
+def test_new_track_when_overlap_is_below_the_threshold():
+    tracker = StudentTracker(iou_threshold=0.3)
+    (first,) = tracker.update([person(0, 0, 100, 100)])
+
+    # Overlaps the track by 20/180 of their union, too little to continue it
+    (second,) = tracker.update([person(80, 0, 180, 100)])
+
+    assert second.id != first.id
+    assert first.missed == 1
+    assert len(tracker.tracks) == 2
+
+
+def test_track_expires_after_max_missed_frames():
+    tracker = StudentTracker(max_missed=3)
+    (track,) = tracker.update([person(0, 0, 100, 100)])
+
+    for _ in range(3):
+        assert tracker.update([]) == []
+    assert tracker.tracks == [track]
+    assert tracker.get_stats()["lost_tracks"] == 1
+
+    tracker.update([])
+    assert tracker.tracks == []
+
+    # A student showing up again afterwards gets a new id
+    (again,) = tracker.update([person(0, 0, 100, 100)])
+    assert again.id != track.id
+
+
+def test_assign_gives_detections_the_id_of_the_student_holding_them():
+    tracker = StudentTracker()
+    left, right = tracker.update([person(0, 0, 200, 300), person(150, 0, 350, 300)])
+
+    # A phone in the left student's hands
+    assert tracker.assign([40, 100, 80, 140]) == left.id
+    # Centered where both boxes overlap: the larger overlap wins
+    assert tracker.assign([150, 50, 210, 250]) == right.id
+    # Not inside any student
+    assert tracker.assign([500, 100, 540, 140]) is None
+
+    # Students missing from the current frame are not assigned anything
+    tracker.update([person(0, 0, 200, 300)])
+    assert tracker.assign([240, 100, 300, 140]) is None
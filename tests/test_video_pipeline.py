@@ -0,0 +1,204 @@
+import random
+import threading
+import time
+import cv2
+import numpy as np
+import pytest
+from src.utils.video_pipeline import VideoPipeline
+
+
+class FakeCapture:
+    """Stands in for cv2.VideoCapture over a constant frame rate video"""
+
+    def __init__(self, frames, fps=30.0):
+        self.frames = frames
+        self.fps = fps
+        self.position = 0
+        self.current = -1
+        self.grabbed = 0
+        self.retrieved = []
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frames
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return max(self.current, 0) * 1000.0 / self.fps
+        return 0.0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.position = int(value)
+        return True
+
+    def isOpened(self):
+        return True
+
+    def grab(self):
+        if self.position >= self.frames:
+            return False
+        self.current = self.position
+        self.position += 1
+        self.grabbed += 1
+        return True
+
+    def retrieve(self):
+        self.retrieved.append(self.current)
+        return True, np.array([self.current])
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def capture(monkeypatch):
+    def open_capture(frames, fps=30.0):
+        cap = FakeCapture(frames, fps)
+        monkeypatch.setattr(cv2, "VideoCapture", lambda path: cap)
+        return cap
+
+    return open_capture
+
+
+def make_pipeline(persisted, **kwargs):
+    """Pipeline whose persist stage collects each frame's position"""
+
+    def persist(frame, detections, jpeg, position):
+        persisted.append(position)
+
+    options = {
+        "infer": lambda frames: [[] for _ in frames],
+        "annotate": lambda frame, detections: b"jpeg",
+        "persist": persist,
+        "frame_size": None,
+    }
+    options.update(kwargs)
+    return VideoPipeline(**options)
+
+
+def run_in_thread(pipeline, timeout=5):
+    """Run the pipeline, failing the test instead of hanging on join"""
+    outcome = {}
+
+    def run():
+        try:
+            outcome["stats"] = pipeline.run("video.mp4")
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "pipeline did not finish"
+    return outcome
+
+
+def test_frames_are_persisted_in_order_with_several_annotate_workers(capture):
+    capture(100)
+    persisted = []
+
+    def slow_annotate(frame, detections):
+        # Workers finish their batches out of order
+        time.sleep(random.uniform(0, 0.005))
+        return b"jpeg"
+
+    pipeline = make_pipeline(
+        persisted, annotate=slow_annotate, annotate_workers=4, batch_size=3
+    )
+    outcome = run_in_thread(pipeline)
+
+    assert "error" not in outcome
+    assert [index for index, _ in persisted] == list(range(100))
+    stages = {stats["stage"]: stats["frames"] for stats in outcome["stats"]}
+    assert stages == {"decode": 100, "infer": 100, "annotate": 100, "persist": 100}
+
+
+def test_bounded_queues_hold_back_the_decoder(capture):
+    cap = capture(1000)
+    persisted = []
+    release = threading.Event()
+
+    def blocked_infer(frames):
+        release.wait(timeout=5)
+        return [[] for _ in frames]
+
+    pipeline = make_pipeline(persisted, infer=blocked_infer, batch_size=4, queue_size=2)
+    thread = threading.Thread(target=pipeline.run, args=("video.mp4",), daemon=True)
+    thread.start()
+    time.sleep(0.3)
+
+    # One batch in inference, queue_size batches queued and one waiting
+    # to be put: nowhere near the whole video
+    assert cap.grabbed <= (2 + 2) * 4
+    release.set()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert len(persisted) == 1000
+
+
+@pytest.mark.parametrize("stage", ["infer", "annotate", "persist"])
+def test_failing_stage_stops_the_pipeline_and_reports_the_error(capture, stage):
+    cap = capture(10000)
+    persisted = []
+    calls = []
+
+    def fail_on_second_call(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise ValueError(f"{stage} failed")
+        if stage == "infer":
+            return [[] for _ in args[0]]
+        if stage == "annotate":
+            return b"jpeg"
+        persisted.append(args[3])
+
+    pipeline = make_pipeline(
+        persisted, batch_size=4, queue_size=2, **{stage: fail_on_second_call}
+    )
+    outcome = run_in_thread(pipeline)
+
+    assert str(outcome["error"]) == f"{stage} failed"
+    # Stopped early rather than running through the whole video
+    assert cap.grabbed < 10000
+
+
+@pytest.mark.parametrize(
+    "start_frame, end_frame, sampled",
+    [
+        (0, None, list(range(0, 60, 6))),
+        # A segment samples from its own first frame
+        (33, 57, [33, 39, 45, 51]),
+    ],
+)
+def test_only_sampled_frames_are_decoded_and_analyzed(
+    capture, start_frame, end_frame, sampled
+):
+    cap = capture(60, fps=30.0)
+    inferred = []
+
+    def infer(frames):
+        inferred.extend(int(frame[0]) for frame in frames)
+        return [[] for _ in frames]
+
+    persisted = []
+    pipeline = make_pipeline(persisted, infer=infer, batch_size=4, analysis_fps=5)
+    thread = threading.Thread(
+        target=pipeline.run, args=("video.mp4", start_frame, end_frame), daemon=True
+    )
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+
+    # Every 6th frame of a 30 fps video at 5 analyzed frames per second
+    assert inferred == sampled
+    assert [index for index, _ in persisted] == sampled
+    assert [media_time for _, media_time in persisted] == pytest.approx(
+        [index / 30.0 for index in sampled]
+    )
+    # Frames in between are grabbed but never retrieved into images
+    assert cap.retrieved == sampled
+    grabbed = (end_frame or 60) - start_frame
+    assert cap.grabbed == grabbed
+    assert pipeline.frames_skipped == grabbed - len(sampled)
+    assert pipeline.total_frames == len(sampled)